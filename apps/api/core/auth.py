@@ -2,10 +2,29 @@ from __future__ import annotations
 
 from typing import Annotated
 
+import logging
+
 from fastapi import Depends, HTTPException, Request, status
 from gotrue.errors import AuthApiError
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from apps.api.core.cache import TTLCache
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import get_async_client
+from apps.api.db.supabase_client import handle_response
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ALGORITHM = "HS256"
 
-from apps.api.db.supabase_client import get_client, handle_response
+_settings = get_settings()
+# La API no modifica usuarios.rol. Un cambio de rol llega al token mediante el trigger
+# sync_user_metadata_role; mientras el token no lo traiga, el valor cacheado vence
+# con ROLE_CACHE_TTL_SECONDS.
+_role_cache: TTLCache[str] = TTLCache(
+    maxsize=_settings.role_cache_max_entries,
+    ttl=_settings.role_cache_ttl_seconds,
+)
 
 
 def _extract_role(user: dict) -> str | None:
@@ -33,33 +52,73 @@ def _is_admin_role(role: str | None) -> bool:
     return role in {"admin", "service_role"}
 
 
+def role_cache_stats() -> dict:
+    return _role_cache.stats()
+
+
 async def _resolve_user_role(user: dict) -> str | None:
+    user_id = str(user.get("id"))
     role = _normalize_role(_extract_role(user))
     if role:
+        # sync_user_metadata_role copia usuarios.rol a los metadatos del token;
+        # si ya viene ahí, cualquier valor cacheado de la tabla quedó obsoleto.
+        _role_cache.invalidate(user_id)
         return role
-    client = get_client()
+    cached = _role_cache.get(user_id)
+    if cached:
+        return cached
+    client = await get_async_client()
     try:
-        response = (
+        response = await (
             client.table("usuarios")
             .select("rol")
-            .eq("id", str(user.get("id")))
+            .eq("id", user_id)
             .single()
             .execute()
         )
         data = handle_response(response)
-        return _normalize_role((data or {}).get("rol"))
     except Exception:  # noqa: BLE001
         return None
+    role = _normalize_role((data or {}).get("rol"))
+    if role:
+        _role_cache.set(user_id, role)
+    return role
 
 
-async def get_current_user(request: Request) -> dict:
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.lower().startswith("bearer "):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token")
-    token = auth_header.split()[1]
-    client = get_client()
+def _decode_access_token(token: str) -> dict | None:
+    """
+    Valida localmente un access token de Supabase firmado con HS256.
+
+    Devuelve ``None`` cuando el token no puede verificarse localmente (firma o
+    claims distintos a los esperados) para que el llamador consulte a GoTrue.
+    Los tokens expirados se rechazan directamente.
+    """
+    settings = get_settings()
     try:
-        response = client.auth.get_user(token)
+        claims = jwt.decode(
+            token,
+            settings.supabase_jwt_secret,
+            algorithms=[TOKEN_ALGORITHM],
+            audience=settings.supabase_jwt_audience,
+        )
+    except ExpiredSignatureError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expirado") from exc
+    except JWTError:
+        return None
+    if not claims.get("sub"):
+        return None
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+    }
+
+
+async def _fetch_user_from_gotrue(token: str) -> dict:
+    client = await get_async_client()
+    try:
+        response = await client.auth.get_user(token)
     except AuthApiError as exc:  # pragma: no cover
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido") from exc
     except Exception as exc:  # noqa: BLE001
@@ -80,6 +139,21 @@ async def get_current_user(request: Request) -> dict:
     }
 
 
+async def get_current_user(request: Request) -> dict:
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.lower().startswith("bearer "):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token")
+    token = auth_header.split()[1]
+    settings = get_settings()
+    if settings.auth_local_verification:
+        user = _decode_access_token(token)
+        if user is not None and not settings.auth_revocation_check:
+            return user
+        if user is None:
+            logger.debug("Token no verificable localmente; se consulta a GoTrue.")
+    return await _fetch_user_from_gotrue(token)
+
+
 async def require_admin(user: Annotated[dict, Depends(get_current_user)]) -> dict:
     role = await _resolve_user_role(user)
     if not _is_admin_role(role):
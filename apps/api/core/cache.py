@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    Caché en memoria acotada por número de entradas y tiempo de vida.
+
+    Las entradas más antiguas se descartan primero cuando se alcanza ``maxsize``.
+    Es segura entre hilos para el servidor ASGI y el adaptador WSGI.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry  # type: ignore[misc]
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        if self.maxsize == 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+class DiskCacheWriter:
+    """Escritura en curso de una entrada; solo se publica en la caché al llamar ``commit``."""
+
+    def __init__(self, cache: DiskLRUCache, key: Hashable, generation: int) -> None:
+        self._cache = cache
+        self._key = key
+        self._generation = generation
+        self._size = 0
+        self._hash = hashlib.sha256()
+        self._file: Optional[BinaryIO] = tempfile.NamedTemporaryFile(dir=cache.directory, prefix=".tmp-", delete=False)
+
+    def write(self, chunk: bytes) -> None:
+        if self._file is None:
+            return
+        self._size += len(chunk)
+        if self._size > self._cache.max_entry_bytes:
+            self.discard()
+            return
+        self._file.write(chunk)
+        self._hash.update(chunk)
+
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def commit(self, metadata: Optional[Dict[str, Any]] = None) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        temp_path = Path(self._file.name)
+        self._file = None
+        self._cache._publish(self._key, temp_path, self._size, self._generation, metadata)
+
+    def discard(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        Path(self._file.name).unlink(missing_ok=True)
+        self._file = None
+
+
+@dataclass
+class DiskCacheEntry:
+    file: BinaryIO
+    metadata: Dict[str, Any]
+
+
+class DiskLRUCache:
+    """
+    Caché de archivos en disco acotada por bytes totales con desalojo LRU.
+
+    El índice vive en memoria y se reconstruye desde el directorio (por fecha de
+    acceso) la primera vez que se usa. Las entradas se escriben en un temporal y se
+    publican con ``os.replace``, así que varios procesos pueden compartir el
+    directorio; cada uno aplica el límite de bytes con su propio índice. Cada
+    entrada puede llevar metadatos JSON (p. ej. su ETag) en un archivo ``.json``.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int, max_entry_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max(0, max_bytes)
+        self.max_entry_bytes = min(max(0, max_entry_bytes), self.max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._generation = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _name(key: Hashable) -> str:
+        return hashlib.sha256(str(key).encode()).hexdigest()
+
+    def _ensure_loaded(self) -> None:
+        # Se llama con el lock tomado.
+        if self._loaded:
+            return
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.startswith(".tmp-"):
+                Path(entry.path).unlink(missing_ok=True)
+                continue
+            if entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_atime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._loaded = True
+        self._evict()
+
+    def _remove_files(self, name: str) -> None:
+        (self.directory / name).unlink(missing_ok=True)
+        (self.directory / f"{name}.json").unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._remove_files(name)
+
+    def _read_metadata(self, name: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self.directory / f"{name}.json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _drop(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def open(self, key: Hashable) -> Optional[DiskCacheEntry]:
+        """Abre la entrada para lectura (cuenta como acierto) o devuelve None."""
+        if not self.enabled:
+            return None
+        name = self._name(key)
+        with self._lock:
+            self._ensure_loaded()
+            if name in self._entries:
+                try:
+                    handle = open(self.directory / name, "rb")
+                except FileNotFoundError:
+                    # Otro proceso la desalojó.
+                    self._drop(name)
+                else:
+                    self._entries.move_to_end(name)
+                    self.hits += 1
+                    return DiskCacheEntry(handle, self._read_metadata(name))
+            self.misses += 1
+            return None
+
+    def writer(self, key: Hashable) -> Optional[DiskCacheWriter]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            generation = self._generation
+        return DiskCacheWriter(self, key, generation)
+
+    def _publish(
+        self,
+        key: Hashable,
+        temp_path: Path,
+        size: int,
+        generation: int,
+        metadata: Optional[Dict[str, Any]],
+    ) -> None:
+        name = self._name(key)
+        with self._lock:
+            if generation != self._generation:
+                # Hubo una invalidación mientras se escribía: el contenido puede estar viejo.
+                temp_path.unlink(missing_ok=True)
+                return
+            if metadata:
+                meta_temp = self.directory / f".tmp-{name}.json"
+                meta_temp.write_text(json.dumps(metadata))
+                os.replace(meta_temp, self.directory / f"{name}.json")
+            else:
+                (self.directory / f"{name}.json").unlink(missing_ok=True)
+            os.replace(temp_path, self.directory / name)
+            self._drop(name)
+            self._entries[name] = size
+            self._total_bytes += size
+            self._evict()
+
+    def invalidate(self, key: Hashable) -> None:
+        name = self._name(key)
+        with self._lock:
+            self._generation += 1
+            self._drop(name)
+            self._remove_files(name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            for name in self._entries:
+                self._remove_files(name)
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def record_served(self, size: int) -> None:
+        with self._lock:
+            self.bytes_served += size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "bytes_served": self.bytes_served,
+            }
@@ -7,6 +7,58 @@ class Settings(BaseSettings):
     supabase_service_role_key: str
     api_base_url: str = "http://localhost:8000"
     supabase_jwt_secret: str
+    supabase_jwt_audience: str = "authenticated"
+    # Verifica los access tokens de Supabase localmente (HS256) en lugar de
+    # consultar GoTrue en cada petición.
+    auth_local_verification: bool = True
+    # Si está activo, cada token validado localmente se confirma con GoTrue para
+    # detectar sesiones revocadas antes de su expiración.
+    auth_revocation_check: bool = False
+    # Pool HTTP del cliente asíncrono de Supabase.
+    supabase_http_timeout: float = 30
+    supabase_http_max_connections: int = 50
+    supabase_http_max_keepalive: int = 20
+    supabase_http_keepalive_expiry: float = 30
+    # Caché de roles resueltos desde la tabla usuarios.
+    role_cache_ttl_seconds: float = 300
+    role_cache_max_entries: int = 2048
+    # Paginación por cursor de los listados.
+    pagination_default_limit: int = 100
+    pagination_max_limit: int = 500
+    # Filas por lote que leen los endpoints /export.
+    export_batch_size: int = 1000
+    # Ventana (segundos) durante la que se reutiliza la resolución del aval en turno.
+    aval_en_turno_cache_seconds: float = 60
+    # Proxy de Storage: transmite por bloques; desactívalo donde el servidor no
+    # soporte respuestas en streaming (adaptador WSGI de PythonAnywhere).
+    storage_proxy_streaming: bool = True
+    storage_proxy_chunk_size: int = 64 * 1024
+    # Los tokens del proxy se emiten alineados a ventanas de este tamaño (segundos),
+    # así la URL de un archivo no cambia dentro de la ventana; 0 los emite al segundo.
+    storage_token_window_seconds: int = 3600
+    # Tamaño máximo (bytes) de los documentos subidos a la API.
+    upload_max_bytes: int = 25 * 1024 * 1024
+    # Procesos simultáneos para descifrar/reescribir PDFs subidos (0 usa el threadpool).
+    pdf_process_workers: int = 2
+    pdf_task_timeout_seconds: float = 60
+    # Comprime streams de contenido, une imágenes repetidas y quita recursos sin uso
+    # de los PDFs subidos antes de guardarlos.
+    pdf_optimize_uploads: bool = True
+    # Workers de la cola de trabajos en segundo plano (cortes); 0 ejecuta el trabajo
+    # dentro de la petición. Tiempo máximo por trabajo, en segundos.
+    background_job_workers: int = 1
+    background_job_timeout_seconds: float = 600
+    # Espera antes del primer reintento de un trabajo fallido; se duplica en cada intento.
+    background_job_retry_seconds: float = 30
+    # Filas por lote al leer los pagos de un corte para su PDF.
+    corte_report_batch_size: int = 2000
+    # Descargas simultáneas desde Storage al armar un ZIP de expediente.
+    bundle_concurrency: int = 4
+    # Caché en disco de los objetos servidos por el proxy (0 bytes la desactiva).
+    # Sin directorio se usa <tmp>/aval-manager-storage.
+    storage_cache_dir: str = ""
+    storage_cache_max_bytes: int = 512 * 1024 * 1024
+    storage_cache_max_object_bytes: int = 50 * 1024 * 1024
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,131 @@
+"""
+Cliente asíncrono de Supabase para los handlers de FastAPI.
+
+Cada event loop obtiene su propio cliente con pools ``httpx.AsyncClient``
+persistentes (keep-alive) para PostgREST, Storage y GoTrue, instrumentados con
+``InstrumentedTransport``. Bajo uvicorn hay un
+solo loop, así que el pool se comparte entre todas las peticiones; el adaptador
+de PythonAnywhere crea un loop por petición y cierra su cliente al terminar.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import Any, Dict, Union
+
+import httpx
+from gotrue import AsyncGoTrueClient
+from postgrest import AsyncPostgrestClient, AsyncRequestBuilder
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from postgrest._async.request_builder import AsyncRPCFilterRequestBuilder
+from storage3 import AsyncStorageClient
+
+from apps.api.core.config import get_settings
+from apps.api.db.instrumentation import InstrumentedTransport
+
+
+def _build_limits() -> httpx.Limits:
+    settings = get_settings()
+    return httpx.Limits(
+        max_connections=settings.supabase_http_max_connections,
+        max_keepalive_connections=settings.supabase_http_max_keepalive,
+        keepalive_expiry=settings.supabase_http_keepalive_expiry,
+    )
+
+
+def _base_transport() -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(limits=_build_limits())
+
+
+def _build_transport() -> httpx.AsyncBaseTransport:
+    return InstrumentedTransport(_base_transport())
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, httpx.Timeout],
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=_build_transport(),
+        )
+
+
+class _PooledStorageClient(AsyncStorageClient):
+    def _create_session(
+        self, base_url: str, headers: Dict[str, str], timeout: int, verify: bool = True
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=bool(verify),
+            follow_redirects=True,
+            transport=_build_transport(),
+        )
+
+
+class AsyncSupabaseClient:
+    """Subconjunto asíncrono del cliente de Supabase usado por la API."""
+
+    def __init__(self, supabase_url: str, supabase_key: str) -> None:
+        settings = get_settings()
+        base_url = supabase_url.rstrip("/")
+        timeout = settings.supabase_http_timeout
+        auth_headers = {"apiKey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+
+        self.storage_url = f"{base_url}/storage/v1"
+        self.postgrest = _PooledPostgrestClient(
+            f"{base_url}/rest/v1",
+            headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, **auth_headers},
+            timeout=timeout,
+        )
+        self.storage = _PooledStorageClient(self.storage_url, auth_headers, timeout)
+        self.auth = AsyncGoTrueClient(
+            url=f"{base_url}/auth/v1",
+            headers=auth_headers,
+            http_client=httpx.AsyncClient(timeout=timeout, transport=_build_transport()),
+            auto_refresh_token=False,
+            persist_session=False,
+        )
+
+    def table(self, table_name: str) -> AsyncRequestBuilder:
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str) -> AsyncRequestBuilder:
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: Dict[Any, Any]) -> AsyncRPCFilterRequestBuilder:
+        return self.postgrest.rpc(fn, params)
+
+    async def aclose(self) -> None:
+        await self.postgrest.aclose()
+        await self.storage.aclose()
+        await self.auth.close()
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSupabaseClient]" = weakref.WeakKeyDictionary()
+
+
+async def get_async_client() -> AsyncSupabaseClient:
+    """Dependencia de FastAPI que devuelve el cliente del event loop actual."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        settings = get_settings()
+        client = AsyncSupabaseClient(settings.supabase_url, settings.supabase_service_role_key)
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,90 @@
+"""
+GET condicional (``ETag`` / ``If-None-Match``) para listados.
+
+La versión de un listado sale de ``table_versions``: un contador por tabla que los
+triggers incrementan en cada escritura, leído por llave primaria. El ETag combina
+la URL pedida (filtros y columnas) con la versión de las tablas de origen; si el
+cliente ya tiene esa versión se responde ``304`` sin leer ni serializar las filas.
+Sin la migración de ``table_versions`` se usa una consulta mínima sobre los
+mismos filtros: el ``max(updated_at)`` (o la columna indicada) y el conteo.
+"""
+
+import copy
+import hashlib
+from typing import Any, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from apps.api.db.async_client import get_async_client
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
+
+CACHE_CONTROL = "no-cache"
+VERSION_TABLE = "table_versions"
+# Vistas de listado y las tablas cuyas escrituras las modifican.
+VIEW_SOURCES = {"vw_firmas_publicas": ("firmas", "avales")}
+
+
+def _source_tables(query: Any) -> Tuple[str, ...]:
+    name = query.path.rstrip("/").rsplit("/", 1)[-1]
+    return VIEW_SOURCES.get(name, (name,))
+
+
+def _version_query(query: Any, column: str) -> Any:
+    # Copia del builder con los mismos filtros; solo cambia select/orden/límite.
+    version = copy.copy(query)
+    version.headers = query.headers.copy()
+    version.headers["Prefer"] = "count=exact"
+    version.params = query.params.set("select", column).set("order", f"{column}.desc.nullslast").set("limit", 1)
+    return version
+
+
+async def _list_version(query: Any, column: str) -> str:
+    client = await get_async_client()
+    if await has_column(client, VERSION_TABLE, "version"):
+        tables = _source_tables(query)
+        result = await (
+            client.table(VERSION_TABLE).select("table_name,version").in_("table_name", list(tables)).execute()
+        )
+        versions = {row["table_name"]: row["version"] for row in handle_response(result) or []}
+        return "|".join(f"{table}:{versions.get(table, 0)}" for table in tables)
+    version = _version_query(query, column)
+    result = await version.execute()
+    rows = handle_response(result) or []
+    latest = rows[0].get(column) if rows else None
+    return "|".join((str(version.params), str(latest), str(result.count)))
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip() for value in header.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+async def resource_etag(request: Request, query: Any, column: str = "updated_at") -> str:
+    """ETag débil derivado de la URL pedida, los filtros y la versión de las tablas de origen."""
+    version = await _list_version(query, column)
+    digest = hashlib.sha1(
+        "|".join((request.url.path, request.url.query, str(query.params), version)).encode()
+    ).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    query: Any,
+    column: str = "updated_at",
+) -> Optional[Response]:
+    """Devuelve un 304 si ``If-None-Match`` coincide; si no, fija ``ETag`` en ``response`` y devuelve None.
+
+    ``query`` es el builder del listado con sus filtros, antes de paginar.
+    """
+    etag = await resource_etag(request, query, column)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
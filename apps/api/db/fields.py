@@ -0,0 +1,71 @@
+"""
+Sparse fieldsets (``?fields=a,b,c``) para listados y detalles.
+
+Los campos pedidos se validan contra el modelo de ``models/schemas.py`` y se
+traducen a la proyección ``select=`` de PostgREST. La respuesta se serializa con
+una versión parcial del modelo (todos los campos opcionales) que solo incluye
+los campos solicitados.
+"""
+
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Type, Union
+
+from fastapi import HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+
+
+def field_selector(model: Type[BaseModel]) -> Callable[..., Optional[List[str]]]:
+    """Crea la dependencia ``fields`` restringida a los campos de ``model``."""
+    allowed = tuple(model.__fields__)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            default=None,
+            description=f"Campos separados por coma. Disponibles: {', '.join(allowed)}",
+        ),
+    ) -> Optional[List[str]]:
+        if not fields:
+            return None
+        requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos no válidos para {model.__name__}: {', '.join(unknown)}",
+            )
+        return requested or None
+
+    return dependency
+
+
+def projection(fields: Optional[List[str]], required: Iterable[str] = ()) -> str:
+    """Columnas para ``select()``; ``required`` agrega las que el servidor necesita (p. ej. el keyset)."""
+    if not fields:
+        return "*"
+    return ",".join(dict.fromkeys([*fields, *required]))
+
+
+@lru_cache
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    definitions = {name: (Optional[field.outer_type_], None) for name, field in model.__fields__.items()}
+    return create_model(f"{model.__name__}Parcial", **definitions)
+
+
+def sparse_response(
+    data: Union[dict, List[dict]],
+    model: Type[BaseModel],
+    fields: List[str],
+    response: Optional[Response] = None,
+) -> JSONResponse:
+    """Serializa solo ``fields`` y conserva los headers ya fijados (cursor, totales)."""
+    partial = partial_model(model)
+    include = set(fields)
+
+    def render(row: dict) -> dict:
+        return jsonable_encoder(partial(**row), include=include)
+
+    content = [render(row) for row in data] if isinstance(data, list) else render(data)
+    headers = dict(response.headers) if response is not None else None
+    return JSONResponse(content=content, headers=headers)
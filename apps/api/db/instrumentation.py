@@ -0,0 +1,177 @@
+"""
+Instrumentación de las llamadas a Supabase (PostgREST, Storage y GoTrue).
+
+Cada petición HTTP de la API abre un ``RequestQueryStats`` en un ContextVar; el
+transporte de los clientes asíncronos registra ahí cada round trip con su
+duración. El middleware agrega un header ``Server-Timing`` con las consultas
+hechas hasta que empieza la respuesta y, cuando termina de enviarse el cuerpo,
+una línea de log con el total por ruta: las consultas que hace el cuerpo de un
+``StreamingResponse`` (p. ej. el proxy de Storage) solo aparecen en el log.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+from fastapi import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_METRIC = "db"
+_SERVER_TIMING_PATTERN = re.compile(rf'(?:^|,)\s*{SERVER_TIMING_METRIC};dur=([\d.]+);desc="(\d+) queries"')
+
+
+@dataclass
+class QueryRecord:
+    kind: str
+    target: str
+    method: str
+    status_code: int | None
+    duration_ms: float
+
+
+@dataclass
+class RequestQueryStats:
+    route: str = ""
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(record.duration_ms for record in self.queries)
+
+    def server_timing(self) -> str:
+        return f'{SERVER_TIMING_METRIC};dur={self.total_ms:.2f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("supabase_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def _classify(url: httpx.URL) -> Tuple[str, str]:
+    path = url.path
+    for prefix, kind in (("/rest/v1/rpc/", "rpc"), ("/rest/v1/", "table"), ("/storage/v1/", "storage"), ("/auth/v1/", "auth")):
+        if prefix in path:
+            target = path.split(prefix, 1)[1]
+            if kind == "storage":
+                # object/<bucket>/<ruta...> -> object/<bucket>
+                target = "/".join(target.split("/")[:2])
+            return kind, target
+    return "http", path
+
+
+class _TimedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transporte httpx que mide cada round trip hasta que se consume la respuesta."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = _current_stats.get()
+        kind, target = _classify(request.url)
+        started = time.perf_counter()
+
+        def record(status_code: int | None) -> None:
+            duration_ms = (time.perf_counter() - started) * 1000
+            logger.debug("supabase %s %s %s -> %s (%.1f ms)", kind, request.method, target, status_code, duration_ms)
+            if stats is not None:
+                stats.queries.append(QueryRecord(kind, target, request.method, status_code, duration_ms))
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            record(None)
+            raise
+        if response.is_closed:
+            # Respuestas ya materializadas (p. ej. transportes de prueba).
+            record(response.status_code)
+        else:
+            response.stream = _TimedStream(response.stream, lambda: record(response.status_code))  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+async def query_stats_middleware(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    stats = RequestQueryStats()
+    token = _current_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+    route = request.scope.get("route")
+    stats.route = getattr(route, "path", request.url.path)
+    response.headers.append("Server-Timing", stats.server_timing())
+    # call_next siempre devuelve un StreamingResponse; el cuerpo corre en la tarea de la
+    # app, que conserva el mismo ``stats``, así que el log espera a que termine de enviarse.
+    response.body_iterator = _log_after_body(response.body_iterator, request.method, stats)  # type: ignore[attr-defined]
+    return response
+
+
+async def _log_after_body(body: AsyncIterator[bytes], method: str, stats: RequestQueryStats) -> AsyncIterator[bytes]:
+    in_header = stats.count
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        if stats.count:
+            logger.info(
+                "%s %s -> %d consultas a Supabase en %.1f ms (%d durante el cuerpo)",
+                method,
+                stats.route,
+                stats.count,
+                stats.total_ms,
+                stats.count - in_header,
+            )
+
+
+def query_count_from_response(response: httpx.Response) -> int:
+    """Extrae el número de consultas del header ``Server-Timing`` de una respuesta."""
+    match = _SERVER_TIMING_PATTERN.search(response.headers.get("server-timing", ""))
+    if match is None:
+        raise AssertionError("La respuesta no incluye la métrica db de Server-Timing.")
+    return int(match.group(2))
+
+
+def assert_query_budget(response: httpx.Response, max_queries: int) -> None:
+    """Helper para tests: falla si el endpoint excedió su presupuesto de consultas.
+
+    Solo cuenta lo que reporta ``Server-Timing``: las consultas hechas mientras se genera
+    el cuerpo de un ``StreamingResponse`` quedan fuera (se registran en el log).
+    """
+    count = query_count_from_response(response)
+    if count > max_queries:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} hizo {count} consultas a Supabase "
+            f"(presupuesto: {max_queries})."
+        )
@@ -0,0 +1,161 @@
+"""
+Paginación por keyset (cursor) para los endpoints de listado.
+
+El cuerpo de la respuesta sigue siendo la lista de filas, así que los clientes
+existentes no cambian. Cuando se pide ``limit`` o ``cursor`` la consulta se corta
+en ``limit`` filas ordenadas por ``(columna, id)`` y el cursor de la siguiente
+página viaja en el header ``X-Next-Cursor``. ``count=exact|planned|estimated``
+agrega ``X-Total-Count`` usando ``Prefer: count`` de PostgREST.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, List, Literal, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+
+from apps.api.core.config import get_settings
+from apps.api.db.supabase_client import handle_response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+CountMode = Literal["exact", "planned", "estimated"]
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """Orden estable de un listado: columna principal + desempate por ``id``."""
+
+    column: str
+    desc: bool = True
+    tiebreaker: str = "id"
+
+    @property
+    def columns(self) -> Tuple[str, str]:
+        return (self.column, self.tiebreaker)
+
+    def order_param(self) -> str:
+        direction = "desc" if self.desc else "asc"
+        # nullslast en ambos sentidos para que el filtro del cursor sea uniforme.
+        return f"{self.column}.{direction}.nullslast,{self.tiebreaker}.{direction}"
+
+
+CREATED_AT = Keyset("created_at")
+
+
+class PageParams:
+    """Dependencia con los parámetros de paginación comunes a todos los listados."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(
+            default=None,
+            ge=1,
+            le=get_settings().pagination_max_limit,
+            description="Máximo de filas por página. Sin limit ni cursor se devuelve el listado completo.",
+        ),
+        cursor: Optional[str] = Query(default=None, description="Valor de X-Next-Cursor de la página anterior"),
+        count: Optional[CountMode] = Query(default=None, description="Incluye X-Total-Count (exact, planned o estimated)"),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+        self.count = count
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+    @property
+    def page_size(self) -> int:
+        return self.limit or get_settings().pagination_default_limit
+
+
+def encode_cursor(keyset: Keyset, row: dict) -> str:
+    payload = [row.get(keyset.column), row.get(keyset.tiebreaker)]
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido") from exc
+    if last_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    return value, last_id
+
+
+def _quote(value: Any) -> str:
+    # Los valores dentro de or=(...) se citan para admitir ',', '.', ':' y paréntesis.
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(keyset: Keyset, value: Any, last_id: Any) -> str:
+    op = "lt" if keyset.desc else "gt"
+    column, tiebreaker = keyset.columns
+    if value is None:
+        # Las filas con NULL van al final: solo quedan las de NULL con id posterior.
+        return f"and({column}.is.null,{tiebreaker}.{op}.{_quote(last_id)})"
+    return (
+        f"{column}.{op}.{_quote(value)},"
+        f"and({column}.eq.{_quote(value)},{tiebreaker}.{op}.{_quote(last_id)}),"
+        f"{column}.is.null"
+    )
+
+
+def apply_keyset(query: Any, keyset: Keyset, cursor: Optional[str] = None, limit: Optional[int] = None) -> Any:
+    """Ordena ``query`` por el keyset y, si hay cursor, la posiciona tras la última fila vista."""
+    query.params = query.params.set("order", keyset.order_param())
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        # Se envía como and=(or(...)) para no chocar con otros filtros or= del router.
+        query.params = query.params.add("and", f"(or({_keyset_filter(keyset, value, last_id)}))")
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+async def paginate(query: Any, page: PageParams, keyset: Keyset, response: Response) -> List[dict]:
+    """Ejecuta ``query`` paginada y publica los headers de cursor y total."""
+    if page.count:
+        query.headers["Prefer"] = f"count={page.count}"
+    if not page.paginated:
+        result = await apply_keyset(query, keyset).execute()
+        rows = handle_response(result) or []
+    else:
+        size = page.page_size
+        # Pedimos una fila extra para saber si existe otra página sin contar la tabla.
+        result = await apply_keyset(query, keyset, page.cursor, size + 1).execute()
+        rows = handle_response(result) or []
+        if len(rows) > size:
+            rows = rows[:size]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(keyset, rows[-1])
+    if page.count and getattr(result, "count", None) is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(result.count)
+    return rows
+
+
+async def iter_keyset(
+    make_query: Callable[[], Any],
+    keyset: Keyset,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[List[dict]]:
+    """Recorre toda la consulta en lotes por cursor; ``make_query`` crea un builder nuevo por lote.
+
+    Termina solo con un lote vacío: PostgREST puede devolver menos filas que ``limit``
+    (``max-rows`` del servidor) sin que la consulta se haya agotado.
+    """
+    size = batch_size or get_settings().export_batch_size
+    cursor: Optional[str] = None
+    while True:
+        result = await apply_keyset(make_query(), keyset, cursor, size).execute()
+        rows = handle_response(result) or []
+        if not rows:
+            return
+        yield rows
+        cursor = encode_cursor(keyset, rows[-1])
@@ -0,0 +1,79 @@
+"""
+Registro de capacidades del esquema de Supabase.
+
+Algunos tenants todavía no tienen columnas agregadas por migraciones recientes
+(``creado_por``, ``motivo_tipo``). En lugar de intentar la consulta y repetirla
+sin la columna cuando PostgREST falla, sondeamos una vez qué columnas existen y
+los routers construyen la consulta correcta desde el primer intento.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, Tuple
+
+from postgrest.exceptions import APIError
+
+from apps.api.db.async_client import AsyncSupabaseClient
+from apps.api.db.supabase_client import handle_response
+
+logger = logging.getLogger(__name__)
+
+# Columnas opcionales que dependen de la versión del esquema.
+OPTIONAL_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("clientes", "creado_por"),
+    ("firmas", "creado_por"),
+    ("clientes_morosidad", "motivo_tipo"),
+    ("vw_firmas_publicas", "updated_at"),
+    ("storage_objects", "sha256"),
+    ("table_versions", "version"),
+)
+
+# 42703: undefined_column (Postgres). PGRST204: columna ausente en el schema cache.
+# 42P01 / PGRST205: la tabla completa no existe todavía.
+_MISSING_COLUMN_CODES = {"42703", "PGRST204", "42P01", "PGRST205"}
+
+
+class SchemaCapabilities:
+    def __init__(self) -> None:
+        self._columns: Dict[Tuple[str, str], bool] = {}
+
+    async def _probe_column(self, client: AsyncSupabaseClient, table: str, column: str) -> None:
+        try:
+            handle_response(await client.table(table).select(column).limit(1).execute())
+        except APIError as exc:
+            if exc.code in _MISSING_COLUMN_CODES or column in str(exc).lower():
+                logger.warning("Columna %s ausente en %s; se omitirá en las consultas.", column, table)
+                self._columns[(table, column)] = False
+                return
+            raise
+        self._columns[(table, column)] = True
+
+    async def probe(self, client: AsyncSupabaseClient, columns: Iterable[Tuple[str, str]] = OPTIONAL_COLUMNS) -> None:
+        for table, column in columns:
+            try:
+                await self._probe_column(client, table, column)
+            except Exception:  # noqa: BLE001
+                # Sin respuesta concluyente no se cachea; se volverá a sondear en el primer uso.
+                logger.exception("No se pudo sondear la columna %s.%s", table, column)
+
+    async def refresh(self, client: AsyncSupabaseClient) -> None:
+        self._columns.clear()
+        await self.probe(client)
+
+    async def has_column(self, client: AsyncSupabaseClient, table: str, column: str) -> bool:
+        key = (table, column)
+        if key not in self._columns:
+            await self.probe(client, [key])
+        # Si el sondeo falló asumimos el esquema actual.
+        return self._columns.get(key, True)
+
+    def snapshot(self) -> Dict[str, bool]:
+        return {f"{table}.{column}": present for (table, column), present in self._columns.items()}
+
+
+schema_capabilities = SchemaCapabilities()
+
+
+async def has_column(client: AsyncSupabaseClient, table: str, column: str) -> bool:
+    return await schema_capabilities.has_column(client, table, column)
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from apps.api.core.auth import require_admin, role_cache_stats
 from apps.api.core.config import get_settings
+from apps.api.db.async_client import close_async_client, get_async_client
+from apps.api.db.instrumentation import query_stats_middleware
+from apps.api.db.schema import schema_capabilities
+from apps.api.services.cortes import corte_jobs, corte_pdf_jobs
+from apps.api.services.pdf import shutdown_pdf_pool
+from apps.api.services.storage import storage_cache_stats
 from apps.api.routers import (
     asesores,
     avales,
@@ -26,7 +35,23 @@ from apps.api.routers import (
 
 settings = get_settings()
 
-app = FastAPI(title="Aval-manager API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Sondeamos las columnas opcionales una sola vez; los fallos se reintentan en el primer uso.
+    client = await get_async_client()
+    await schema_capabilities.probe(client)
+    # Retoma los cortes que quedaron pendientes si el proceso se reinició a media ejecución.
+    await corte_jobs.start(client)
+    await corte_pdf_jobs.start(client)
+    yield
+    await corte_jobs.stop()
+    await corte_pdf_jobs.stop()
+    await close_async_client()
+    shutdown_pdf_pool()
+
+
+app = FastAPI(title="Aval-manager API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,8 +59,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"]
     ,
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "X-Total-Count", "ETag", "Accept-Ranges", "Content-Range"],
 )
+app.middleware("http")(query_stats_middleware)
 
 app.include_router(public.router)
 app.include_router(avales.router)
@@ -59,3 +86,13 @@ app.include_router(clientes_morosidad.router)
 @app.get("/health", tags=["health"])
 async def health_check() -> dict:
     return {"status": "ok"}
+
+
+@app.get("/health/diagnostics", tags=["health"])
+async def health_diagnostics(_: dict = Depends(require_admin)) -> dict:
+    """Contadores de las cachés en proceso y columnas opcionales detectadas."""
+    return {
+        "role_cache": role_cache_stats(),
+        "storage_cache": storage_cache_stats(),
+        "schema": schema_capabilities.snapshot(),
+    }
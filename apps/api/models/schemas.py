@@ -57,6 +57,15 @@ class Aval(AvalBase):
 
 class AvalBuroCreditoUploadResponse(BaseModel):
     buro_credito_url: str
+    original_bytes: int | None = None
+    stored_bytes: int | None = None
+    reused: bool = False
+
+
+class DocumentoUploadResponse(BaseModel):
+    path: str
+    stored_bytes: int
+    reused: bool = False
 
 
 class ClienteReferenciaFamiliar(BaseModel):
@@ -507,6 +516,12 @@ class PublicAval(BaseModel):
     telefono: str | None = None
 
 
+class PublicEnTurno(BaseModel):
+    aval: PublicAval | None = None
+    documentos: list[PublicDocumento] = Field(default_factory=list)
+    disponibilidades: list[Disponibilidad] = Field(default_factory=list)
+
+
 class PagoServicioBase(BaseModel):
     firma_id: UUID
     monto_efectivo: Decimal = Field(default=0, ge=0)
@@ -603,3 +618,51 @@ class PagoCorte(PagoCorteBase):
     pdf_path: str | None = None
     pdf_url: str | None = None
     created_at: datetime
+
+
+class CortePreviewGrupo(BaseModel):
+    tipo: Literal["servicio", "comision"]
+    beneficiario_tipo: Literal["aval", "asesor"] | None = None
+    beneficiario_id: UUID | None = None
+    beneficiario_nombre: str | None = None
+    pagos: int
+    monto_efectivo: Decimal = Decimal("0")
+    monto_transferencia: Decimal = Decimal("0")
+    monto: Decimal
+
+
+class CortePreview(PagoCorteBase):
+    total_servicio: Decimal
+    total_comisiones: Decimal
+    pagos_servicio: int
+    pagos_comisiones: int
+    grupos: list[CortePreviewGrupo]
+
+
+class PagosLedgerDiferencia(BaseModel):
+    fecha: date
+    tipo: Literal["servicio", "comision"]
+    beneficiario_tipo: Literal["aval", "asesor"] | None = None
+    beneficiario_id: UUID | None = None
+    ledger_pagos: int
+    real_pagos: int
+    ledger_monto: Decimal
+    real_monto: Decimal
+
+
+class PagosLedgerConciliacion(BaseModel):
+    cuadra: bool
+    diferencias: list[PagosLedgerDiferencia]
+    renglones_reconstruidos: int | None = None
+
+
+class CorteJob(BaseModel):
+    id: UUID
+    status: Literal["queued", "running", "succeeded", "failed"]
+    corte_id: UUID | None = None
+    error: str | None = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    corte: PagoCorte | None = None
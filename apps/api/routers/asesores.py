@@ -8,25 +8,36 @@ from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.encoders import jsonable_encoder
 
 from apps.api.core.auth import require_admin, require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.pagination import Keyset, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Asesor, AsesorCreate, AsesorUpdate
 
+POR_NOMBRE = Keyset("nombre", desc=False)
+
 router = APIRouter(prefix="/asesores", tags=["asesores"])
 
 
 @router.get("", response_model=List[Asesor])
-async def list_asesores(user: dict = Depends(require_admin_or_asesor)) -> List[Asesor]:
-    client = get_client()
-    query = client.table("asesores").select("*").order("nombre", desc=False)
+async def list_asesores(
+    response: Response,
+    page: PageParams = Depends(),
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Asesor]:
+    query = client.table("asesores").select("*")
     if user.get("role") == "asesor":
         query = query.eq("user_id", str(user.get("id")))
-    asesores_resp = query.execute()
-    asesores_data = handle_response(asesores_resp) or []
+    asesores_data = await paginate(query, page, POR_NOMBRE, response)
+    if not asesores_data:
+        return []
 
-    comisiones_resp = (
+    # Solo se cuentan las comisiones de los asesores de la página.
+    comisiones_resp = await (
         client.table("pagos_comisiones")
         .select("beneficiario_id")
         .eq("beneficiario_tipo", "asesor")
+        .in_("beneficiario_id", [str(row["id"]) for row in asesores_data])
         .execute()
     )
     comisiones = handle_response(comisiones_resp) or []
@@ -42,12 +53,14 @@ async def list_asesores(user: dict = Depends(require_admin_or_asesor)) -> List[A
 
 
 @router.get("/me", response_model=Asesor)
-async def get_current_asesor(user: dict = Depends(require_admin_or_asesor)) -> Asesor:
-    client = get_client()
+async def get_current_asesor(
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Asesor:
     user_id = user.get("id")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
-    response = (
+    response = await (
         client.table("asesores")
         .select("*")
         .eq("user_id", str(user_id))
@@ -59,7 +72,7 @@ async def get_current_asesor(user: dict = Depends(require_admin_or_asesor)) -> A
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
     asesor_row = data[0] or {}
     asesor_id = str(asesor_row.get("id"))
-    comisiones_resp = (
+    comisiones_resp = await (
         client.table("pagos_comisiones")
         .select("beneficiario_id")
         .eq("beneficiario_tipo", "asesor")
@@ -72,10 +85,13 @@ async def get_current_asesor(user: dict = Depends(require_admin_or_asesor)) -> A
 
 
 @router.post("", response_model=Asesor, status_code=status.HTTP_201_CREATED)
-async def create_asesor(payload: AsesorCreate, _: dict = Depends(require_admin)) -> Asesor:
-    client = get_client()
+async def create_asesor(
+    payload: AsesorCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Asesor:
     serialized = jsonable_encoder(payload)
-    response = client.table("asesores").insert(serialized).execute()
+    response = await client.table("asesores").insert(serialized).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear el asesor")
@@ -83,10 +99,14 @@ async def create_asesor(payload: AsesorCreate, _: dict = Depends(require_admin))
 
 
 @router.put("/{asesor_id}", response_model=Asesor)
-async def update_asesor(asesor_id: UUID, payload: AsesorUpdate, _: dict = Depends(require_admin)) -> Asesor:
-    client = get_client()
+async def update_asesor(
+    asesor_id: UUID,
+    payload: AsesorUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Asesor:
     data_payload = {k: v for k, v in jsonable_encoder(payload).items() if v is not None}
-    response = client.table("asesores").update(data_payload).eq("id", str(asesor_id)).execute()
+    response = await client.table("asesores").update(data_payload).eq("id", str(asesor_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
@@ -94,7 +114,10 @@ async def update_asesor(asesor_id: UUID, payload: AsesorUpdate, _: dict = Depend
 
 
 @router.delete("/{asesor_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_asesor(asesor_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("asesores").delete().eq("id", str(asesor_id)).execute()
+async def delete_asesor(
+    asesor_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("asesores").delete().eq("id", str(asesor_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import logging
 import re
 import time
 import unicodedata
 from datetime import datetime, timezone
-from io import BytesIO
 from typing import List
 from uuid import UUID
-from zipfile import BadZipFile, ZipFile
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
-from pypdf import PdfReader, PdfWriter
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile, status
 from supabase import StorageException
 
 from apps.api.core.auth import require_admin, require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
-from apps.api.models.schemas import Aval, AvalBuroCreditoUploadResponse, AvalCreate, AvalDisponibilidadInput, AvalUpdate
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
+from apps.api.models.schemas import (
+    Aval,
+    AvalBuroCreditoUploadResponse,
+    AvalCreate,
+    AvalDisponibilidadInput,
+    AvalUpdate,
+    DocumentoUploadResponse,
+)
+from apps.api.services.aval_en_turno import invalidate_aval_en_turno
+from apps.api.services.content_store import (
+    ObjectOwner,
+    content_store_enabled,
+    drop_owner_references,
+    store_content_addressed,
+)
+from apps.api.services.pdf import prepare_uploaded_pdf, run_pdf_task
+from apps.api.services.record_documents import discard_stored_file, document_field, store_record_document
+from apps.api.services.uploads import spool_upload, upload_workspace
+from apps.api.services.storage import invalidate_storage_object
 
 router = APIRouter(prefix="/avales", tags=["avales"])
 STORAGE_BUCKET = "documentos-aval"
 
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
 
 def _sanitize_filename(filename: str) -> str:
     base = filename or "buro-credito.pdf"
@@ -35,69 +59,34 @@ def _sanitize_filename(filename: str) -> str:
     return base
 
 
-def _extract_pdf_bytes(upload_bytes: bytes, filename: str) -> tuple[bytes, str]:
-    lower_name = (filename or "").lower()
-    if lower_name.endswith(".zip"):
-        try:
-            with ZipFile(BytesIO(upload_bytes)) as archive:
-                pdf_members = [info for info in archive.infolist() if info.filename.lower().endswith(".pdf")]
-                if not pdf_members:
-                    raise HTTPException(status_code=400, detail="El ZIP no contiene ningún archivo PDF.")
-                member = pdf_members[0]
-                if member.flag_bits & 0x1:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="El ZIP está protegido con contraseña. Descomprime el archivo antes de subirlo.",
-                    )
-                return archive.read(member), member.filename
-        except BadZipFile as exc:
-            raise HTTPException(status_code=400, detail="El archivo comprimido está dañado o no es válido.") from exc
-    if lower_name.endswith(".pdf"):
-        return upload_bytes, filename
-    raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF o ZIP que contengan un PDF.")
-
-
-def _unlock_pdf_if_needed(pdf_bytes: bytes, password: str | None) -> bytes:
-    try:
-        reader = PdfReader(BytesIO(pdf_bytes))
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=400, detail="El PDF está dañado o tiene un formato no válido.") from exc
-    if not reader.is_encrypted:
-        return pdf_bytes
-    if not password:
-        raise HTTPException(status_code=400, detail="El PDF está protegido. Ingresa la clave para desbloquearlo.")
-    try:
-        result = reader.decrypt(password)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=400, detail="No se pudo desbloquear el PDF. Verifica la clave proporcionada.") from exc
-    if result == 0:
-        raise HTTPException(status_code=400, detail="La clave del PDF es incorrecta.")
-    writer = PdfWriter()
-    for page in reader.pages:
-        writer.add_page(page)
-    if reader.metadata:
-        writer.add_metadata({k: v for k, v in reader.metadata.items() if v is not None})
-    output = BytesIO()
-    writer.write(output)
-    writer.close()
-    return output.getvalue()
-
-
 def _build_storage_path(aval_id: UUID, filename: str) -> str:
     timestamp = int(time.time() * 1000)
     return f"avales/{aval_id}/buro_credito/{timestamp}-{filename}"
 
 
 @router.get("", response_model=List[Aval])
-async def list_avales(_: dict = Depends(require_admin_or_asesor)) -> List[Aval]:
-    client = get_client()
-    response = client.table("avales").select("*").order("created_at", desc=True).execute()
-    return [Aval(**row) for row in handle_response(response)]
-
-
-def _sync_disponibilidades(client, aval_id: UUID, blocks: list[AvalDisponibilidadInput], replace_existing: bool) -> None:
+async def list_avales(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Aval)),
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Aval]:
+    query = client.table("avales").select(projection(fields, CREATED_AT.columns))
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, Aval, fields, response)
+    return [Aval(**row) for row in rows]
+
+
+async def _sync_disponibilidades(client: AsyncSupabaseClient, aval_id: UUID, blocks: list[AvalDisponibilidadInput], replace_existing: bool) -> None:
     if replace_existing:
-        client.table("disponibilidades_avales").delete().eq("aval_id", str(aval_id)).execute()
+        await client.table("disponibilidades_avales").delete().eq("aval_id", str(aval_id)).execute()
+        invalidate_aval_en_turno()
     if not blocks:
         return
     rows = []
@@ -112,47 +101,64 @@ def _sync_disponibilidades(client, aval_id: UUID, blocks: list[AvalDisponibilida
                 "recurrente": block.recurrente,
             }
         )
-    client.table("disponibilidades_avales").insert(rows).execute()
+    await client.table("disponibilidades_avales").insert(rows).execute()
+    invalidate_aval_en_turno()
 
 
 @router.post("", response_model=Aval, status_code=status.HTTP_201_CREATED)
-async def create_aval(payload: AvalCreate, _: dict = Depends(require_admin)) -> Aval:
-    client = get_client()
+async def create_aval(
+    payload: AvalCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Aval:
     disponibilidades = payload.disponibilidades or []
     aval_payload = payload.dict(exclude={"disponibilidades"})
-    response = client.table("avales").insert(aval_payload).execute()
+    response = await client.table("avales").insert(aval_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear el aval")
+    invalidate_aval_en_turno()
     aval = Aval(**data[0])
     if disponibilidades:
-        _sync_disponibilidades(client, aval.id, disponibilidades, replace_existing=False)
+        await _sync_disponibilidades(client, aval.id, disponibilidades, replace_existing=False)
     return aval
 
 
 @router.get("/{aval_id}", response_model=Aval)
-async def get_aval(aval_id: UUID, _: dict = Depends(require_admin)) -> Aval:
-    client = get_client()
-    response = client.table("avales").select("*").eq("id", str(aval_id)).single().execute()
+async def get_aval(
+    aval_id: UUID,
+    fields: List[str] | None = Depends(field_selector(Aval)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Aval:
+    response = await client.table("avales").select(projection(fields)).eq("id", str(aval_id)).single().execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aval no encontrado")
+    if fields:
+        return sparse_response(data, Aval, fields)
     return Aval(**data)
 
 
 @router.put("/{aval_id}", response_model=Aval)
-async def update_aval(aval_id: UUID, payload: AvalUpdate, _: dict = Depends(require_admin)) -> Aval:
-    client = get_client()
+async def update_aval(
+    aval_id: UUID,
+    payload: AvalUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Aval:
     disponibilidades = payload.disponibilidades
     data_payload = {k: v for k, v in payload.dict(exclude={"disponibilidades"}).items() if v is not None}
     data_payload["updated_at"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("avales").update(data_payload).eq("id", str(aval_id)).execute()
+    response = await client.table("avales").update(data_payload).eq("id", str(aval_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aval no encontrado")
+    if "activo" in data_payload:
+        invalidate_aval_en_turno()
     aval = Aval(**data[0])
     if disponibilidades is not None:
-        _sync_disponibilidades(client, aval.id, disponibilidades, replace_existing=True)
+        await _sync_disponibilidades(client, aval.id, disponibilidades, replace_existing=True)
     return aval
 
 
@@ -162,56 +168,100 @@ async def upload_buro_credito(
     file: UploadFile = File(...),
     password: str = Form(default=""),
     _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> AvalBuroCreditoUploadResponse:
-    client = get_client()
-    response = client.table("avales").select("buro_credito_url").eq("id", str(aval_id)).single().execute()
+    response = await client.table("avales").select("buro_credito_url").eq("id", str(aval_id)).single().execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aval no encontrado")
 
-    file_bytes = await file.read()
-    if not file_bytes:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo recibido está vacío.")
-
-    pdf_bytes, inner_filename = _extract_pdf_bytes(file_bytes, file.filename or "")
-    unlocked_bytes = _unlock_pdf_if_needed(pdf_bytes, password or None)
-    sanitized_name = _sanitize_filename(inner_filename or file.filename or "")
-    storage_path = _build_storage_path(aval_id, sanitized_name)
-
-    bucket = client.storage.from_(STORAGE_BUCKET)
-    previous_path = data.get("buro_credito_url")
-    if previous_path:
-        try:
-            bucket.remove([previous_path])
-        except Exception:
-            # No es crítico si la eliminación falla; continuamos con el reemplazo
-            pass
-
-    try:
-        bucket.upload(
-            storage_path,
-            BytesIO(unlocked_bytes),
-            {
-                "content-type": "application/pdf",
-                "x-upsert": "true",
-                "cache-control": "3600",
-            },
+    async with upload_workspace() as workspace:
+        source = await spool_upload(file, workspace)
+        prepared = await run_pdf_task(
+            prepare_uploaded_pdf,
+            str(source),
+            file.filename or "",
+            password or None,
+            str(workspace),
+            settings.upload_max_bytes,
+            settings.pdf_optimize_uploads,
         )
-    except StorageException as exc:
-        raise HTTPException(status_code=500, detail="No se pudo guardar el Buró de crédito.") from exc
+        logger.info(
+            "Buró de crédito del aval %s: %d bytes recibidos, %d bytes guardados",
+            aval_id,
+            prepared.original_bytes,
+            prepared.stored_bytes,
+        )
+        sanitized_name = _sanitize_filename(prepared.filename or file.filename or "")
+        bucket = client.storage.from_(STORAGE_BUCKET)
+        previous_path = data.get("buro_credito_url")
+        reused = False
+        try:
+            if await content_store_enabled(client):
+                storage_path, reused = await store_content_addressed(
+                    client,
+                    STORAGE_BUCKET,
+                    prepared.path,
+                    prepared.sha256,
+                    prepared.stored_bytes,
+                    sanitized_name,
+                    "application/pdf",
+                    ObjectOwner("avales", aval_id, "buro_credito_url"),
+                )
+            else:
+                storage_path = _build_storage_path(aval_id, sanitized_name)
+                with open(prepared.path, "rb") as pdf_file:
+                    await bucket.upload(
+                        storage_path,
+                        pdf_file,
+                        {
+                            "content-type": "application/pdf",
+                            "x-upsert": "true",
+                            "cache-control": "3600",
+                        },
+                    )
+        except StorageException as exc:
+            raise HTTPException(status_code=500, detail="No se pudo guardar el Buró de crédito.") from exc
+    invalidate_storage_object(STORAGE_BUCKET, storage_path)
 
-    client.table("avales").update(
+    await client.table("avales").update(
         {
             "buro_credito_url": storage_path,
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }
     ).eq("id", str(aval_id)).execute()
 
-    return AvalBuroCreditoUploadResponse(buro_credito_url=storage_path)
+    if previous_path and previous_path != storage_path:
+        await discard_stored_file(client, STORAGE_BUCKET, previous_path)
+
+    return AvalBuroCreditoUploadResponse(
+        buro_credito_url=storage_path,
+        original_bytes=prepared.original_bytes,
+        stored_bytes=prepared.stored_bytes,
+        reused=reused,
+    )
+
+
+@router.post("/{aval_id}/documentos/{field}", response_model=DocumentoUploadResponse)
+async def upload_aval_documento(
+    aval_id: UUID,
+    field: str,
+    file: UploadFile = File(...),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> DocumentoUploadResponse:
+    owner = ObjectOwner("avales", aval_id, document_field("avales", field))
+    return await store_record_document(client, owner, file, "Aval no encontrado")
 
 
 @router.delete("/{aval_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_aval(aval_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("avales").delete().eq("id", str(aval_id)).execute()
+async def delete_aval(
+    aval_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("avales").delete().eq("id", str(aval_id)).execute()
+    invalidate_aval_en_turno()
+    if await content_store_enabled(client):
+        await drop_owner_references(client, STORAGE_BUCKET, "avales", aval_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
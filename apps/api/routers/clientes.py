@@ -1,54 +1,80 @@
 from __future__ import annotations
 
-import logging
 from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
-from postgrest.exceptions import APIError
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 
 from apps.api.core.auth import require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
-from apps.api.models.schemas import Cliente, ClienteCreate, ClienteUpdate
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, iter_keyset, paginate
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
+from apps.api.models.schemas import Cliente, ClienteCreate, ClienteUpdate, DocumentoUploadResponse
+from apps.api.services.content_store import ObjectOwner, content_store_enabled, drop_owner_references
+from apps.api.services.export import ExportFormat, export_response
+from apps.api.services.record_documents import STORAGE_BUCKET, document_field, store_record_document
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
-logger = logging.getLogger(__name__)
 
 
-def _column_missing(exc: Exception, column: str) -> bool:
-    return isinstance(exc, APIError) and column in str(exc).lower()
+def _query(client: AsyncSupabaseClient, columns: str, search: str | None):
+    query = client.table("clientes").select(columns)
+    if search:
+        pattern = f"%{search}%"
+        query = query.or_(f"nombre_completo.ilike.{pattern}")
+    return query
 
 
 @router.get("", response_model=List[Cliente])
 async def list_clientes(
+    request: Request,
+    response: Response,
     search: str | None = Query(default=None, description="Coincidencia por nombre"),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Cliente)),
     _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[Cliente]:
-    client = get_client()
-    query = client.table("clientes").select("*")
-    if search:
-        pattern = f"%{search}%"
-        query = query.or_(f"nombre_completo.ilike.{pattern}")
-    response = query.order("created_at", desc=True).execute()
-    return [Cliente(**row) for row in handle_response(response)]
+    query = _query(client, projection(fields, CREATED_AT.columns), search)
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, Cliente, fields, response)
+    return [Cliente(**row) for row in rows]
+
+
+@router.get("/export")
+async def export_clientes(
+    fmt: ExportFormat = Query(default="ndjson", alias="format"),
+    search: str | None = Query(default=None, description="Coincidencia por nombre"),
+    fields: List[str] | None = Depends(field_selector(Cliente)),
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    columns = projection(fields, CREATED_AT.columns)
+    pages = iter_keyset(lambda: _query(client, columns, search), CREATED_AT)
+    return export_response(pages, Cliente, fmt, "clientes", fields)
 
 
 @router.post("", response_model=Cliente, status_code=status.HTTP_201_CREATED)
-async def create_cliente(payload: ClienteCreate, user: dict = Depends(require_admin_or_asesor)) -> Cliente:
-    client = get_client()
+async def create_cliente(
+    payload: ClienteCreate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Cliente:
     data_payload = payload.dict()
-    if user.get("id"):
+    if not await has_column(client, "clientes", "creado_por"):
+        data_payload.pop("creado_por", None)
+    elif user.get("id"):
         data_payload["creado_por"] = str(user["id"])
-    try:
-        response = client.table("clientes").insert(data_payload).execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en clientes; reintentando inserción sin el campo.")
-            data_payload.pop("creado_por", None)
-            response = client.table("clientes").insert(data_payload).execute()
-        else:
-            raise
+    response = await client.table("clientes").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear el cliente")
@@ -56,49 +82,69 @@ async def create_cliente(payload: ClienteCreate, user: dict = Depends(require_ad
 
 
 @router.get("/{cliente_id}", response_model=Cliente)
-async def get_cliente(cliente_id: UUID, _: dict = Depends(require_admin_or_asesor)) -> Cliente:
-    client = get_client()
-    response = client.table("clientes").select("*").eq("id", str(cliente_id)).single().execute()
+async def get_cliente(
+    cliente_id: UUID,
+    fields: List[str] | None = Depends(field_selector(Cliente)),
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Cliente:
+    response = await client.table("clientes").select(projection(fields)).eq("id", str(cliente_id)).single().execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
+    if fields:
+        return sparse_response(data, Cliente, fields)
     return Cliente(**data)
 
 
 @router.put("/{cliente_id}", response_model=Cliente)
-async def update_cliente(cliente_id: UUID, payload: ClienteUpdate, user: dict = Depends(require_admin_or_asesor)) -> Cliente:
-    client = get_client()
+async def update_cliente(
+    cliente_id: UUID,
+    payload: ClienteUpdate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Cliente:
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
     data_payload["updated_at"] = datetime.now(timezone.utc).isoformat()
+    tracks_owner = await has_column(client, "clientes", "creado_por")
+    if not tracks_owner:
+        data_payload.pop("creado_por", None)
     query = client.table("clientes").update(data_payload).eq("id", str(cliente_id))
-    if user.get("role") != "admin" and user.get("id"):
+    if tracks_owner and user.get("role") != "admin" and user.get("id"):
         query = query.eq("creado_por", str(user["id"]))
-    try:
-        response = query.execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en clientes; se actualiza sin filtro por asesor.")
-            response = client.table("clientes").update(data_payload).eq("id", str(cliente_id)).execute()
-        else:
-            raise
+    response = await query.execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
     return Cliente(**data[0])
 
 
+@router.post("/{cliente_id}/documentos/{field}", response_model=DocumentoUploadResponse)
+async def upload_cliente_documento(
+    cliente_id: UUID,
+    field: str,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> DocumentoUploadResponse:
+    owner = ObjectOwner("clientes", cliente_id, document_field("clientes", field))
+    if user.get("role") != "admin" and user.get("id") and await has_column(client, "clientes", "creado_por"):
+        return await store_record_document(
+            client, owner, file, "Cliente no encontrado", scope=lambda query: query.eq("creado_por", str(user["id"]))
+        )
+    return await store_record_document(client, owner, file, "Cliente no encontrado")
+
+
 @router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_cliente(cliente_id: UUID, user: dict = Depends(require_admin_or_asesor)) -> Response:
-    client = get_client()
+async def delete_cliente(
+    cliente_id: UUID,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
     query = client.table("clientes").delete().eq("id", str(cliente_id))
-    if user.get("role") != "admin" and user.get("id"):
+    if user.get("role") != "admin" and user.get("id") and await has_column(client, "clientes", "creado_por"):
         query = query.eq("creado_por", str(user["id"]))
-    try:
-        query.execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en clientes; se elimina sin filtro por asesor.")
-            client.table("clientes").delete().eq("id", str(cliente_id)).execute()
-        else:
-            raise
+    deleted = handle_response(await query.execute())
+    if deleted and await content_store_enabled(client):
+        await drop_owner_references(client, STORAGE_BUCKET, "clientes", cliente_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -4,44 +4,52 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.encoders import jsonable_encoder
 
-import logging
-
-from postgrest.exceptions import APIError
-
 from apps.api.core.auth import require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import ClienteVetado, ClienteVetadoCreate, ClienteVetadoUpdate
 
 router = APIRouter(prefix="/clientes-morosidad", tags=["clientes-morosidad"])
-logger = logging.getLogger(__name__)
-
-
-def _column_missing(exc: Exception, column: str) -> bool:
-    return isinstance(exc, APIError) and column in str(exc).lower()
 
 
 @router.get("", response_model=List[ClienteVetado])
 async def list_clientes_morosidad(
+    request: Request,
+    response: Response,
     cliente_id: UUID | None = Query(default=None),
     estatus: str | None = Query(default=None),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(ClienteVetado)),
     _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[ClienteVetado]:
-    client = get_client()
-    query = client.table("clientes_morosidad").select("*")
+    query = client.table("clientes_morosidad").select(projection(fields, CREATED_AT.columns))
     if cliente_id:
         query = query.eq("cliente_id", str(cliente_id))
     if estatus:
         query = query.eq("estatus", estatus)
-    response = query.order("created_at", desc=True).execute()
-    return [ClienteVetado(**row) for row in handle_response(response) or []]
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, ClienteVetado, fields, response)
+    return [ClienteVetado(**row) for row in rows]
 
 
 @router.post("", response_model=ClienteVetado, status_code=status.HTTP_201_CREATED)
-async def create_cliente_morosidad(payload: ClienteVetadoCreate, user: dict = Depends(require_admin_or_asesor)) -> ClienteVetado:
-    client = get_client()
+async def create_cliente_morosidad(
+    payload: ClienteVetadoCreate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> ClienteVetado:
     data_payload = jsonable_encoder(payload, exclude_none=True)
     estatus_value = data_payload.get("estatus")
     if estatus_value:
@@ -53,15 +61,9 @@ async def create_cliente_morosidad(payload: ClienteVetadoCreate, user: dict = De
         data_payload["registrado_por"] = str(user["id"])
     if data_payload.get("estatus") == "limpio" and not data_payload.get("limpio_at"):
         data_payload["limpio_at"] = datetime.now(timezone.utc).isoformat()
-    try:
-        response = client.table("clientes_morosidad").insert(data_payload).execute()
-    except APIError as exc:
-        if _column_missing(exc, "motivo_tipo"):
-            logger.warning("Columna motivo_tipo ausente en clientes_morosidad; usando valor por defecto.")
-            data_payload.pop("motivo_tipo", None)
-            response = client.table("clientes_morosidad").insert(data_payload).execute()
-        else:
-            raise
+    if not await has_column(client, "clientes_morosidad", "motivo_tipo"):
+        data_payload.pop("motivo_tipo", None)
+    response = await client.table("clientes_morosidad").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar el veto del cliente")
@@ -70,9 +72,11 @@ async def create_cliente_morosidad(payload: ClienteVetadoCreate, user: dict = De
 
 @router.put("/{registro_id}", response_model=ClienteVetado)
 async def update_cliente_morosidad(
-    registro_id: UUID, payload: ClienteVetadoUpdate, _: dict = Depends(require_admin_or_asesor)
+    registro_id: UUID,
+    payload: ClienteVetadoUpdate,
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> ClienteVetado:
-    client = get_client()
     data_payload = {k: v for k, v in jsonable_encoder(payload, exclude_none=True).items() if v is not None}
     estatus_value = data_payload.get("estatus")
     if estatus_value:
@@ -83,7 +87,7 @@ async def update_cliente_morosidad(
     if data_payload.get("estatus") == "limpio" and not data_payload.get("limpio_at"):
         data_payload["limpio_at"] = datetime.now(timezone.utc).isoformat()
     data_payload["updated_at"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("clientes_morosidad").update(data_payload).eq("id", str(registro_id)).execute()
+    response = await client.table("clientes_morosidad").update(data_payload).eq("id", str(registro_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Registro de cliente vetado no encontrado")
@@ -91,7 +95,10 @@ async def update_cliente_morosidad(
 
 
 @router.delete("/{registro_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_cliente_morosidad(registro_id: UUID, _: dict = Depends(require_admin_or_asesor)) -> Response:
-    client = get_client()
-    client.table("clientes_morosidad").delete().eq("id", str(registro_id)).execute()
+async def delete_cliente_morosidad(
+    registro_id: UUID,
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("clientes_morosidad").delete().eq("id", str(registro_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
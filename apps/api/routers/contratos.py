@@ -4,27 +4,46 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Contrato, ContratoCreate, ContratoUpdate
 
 router = APIRouter(prefix="/contratos", tags=["contratos"])
 
 
 @router.get("", response_model=List[Contrato])
-async def list_contratos(_: dict = Depends(require_admin)) -> List[Contrato]:
-    client = get_client()
-    response = client.table("contratos").select("*").order("created_at", desc=True).execute()
-    return [Contrato(**row) for row in handle_response(response)]
+async def list_contratos(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Contrato)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Contrato]:
+    query = client.table("contratos").select(projection(fields, CREATED_AT.columns))
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, Contrato, fields, response)
+    return [Contrato(**row) for row in rows]
 
 
 @router.post("", response_model=Contrato, status_code=status.HTTP_201_CREATED)
-async def create_contrato(payload: ContratoCreate, _: dict = Depends(require_admin)) -> Contrato:
-    client = get_client()
+async def create_contrato(
+    payload: ContratoCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Contrato:
     payload_dict = payload.dict()
-    response = client.table("contratos").insert(payload_dict).execute()
+    response = await client.table("contratos").insert(payload_dict).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear el contrato")
@@ -32,21 +51,31 @@ async def create_contrato(payload: ContratoCreate, _: dict = Depends(require_adm
 
 
 @router.get("/{contrato_id}", response_model=Contrato)
-async def get_contrato(contrato_id: UUID, _: dict = Depends(require_admin)) -> Contrato:
-    client = get_client()
-    response = client.table("contratos").select("*").eq("id", str(contrato_id)).single().execute()
+async def get_contrato(
+    contrato_id: UUID,
+    fields: List[str] | None = Depends(field_selector(Contrato)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Contrato:
+    response = await client.table("contratos").select(projection(fields)).eq("id", str(contrato_id)).single().execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contrato no encontrado")
+    if fields:
+        return sparse_response(data, Contrato, fields)
     return Contrato(**data)
 
 
 @router.put("/{contrato_id}", response_model=Contrato)
-async def update_contrato(contrato_id: UUID, payload: ContratoUpdate, _: dict = Depends(require_admin)) -> Contrato:
-    client = get_client()
+async def update_contrato(
+    contrato_id: UUID,
+    payload: ContratoUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Contrato:
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
     data_payload["updated_at"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("contratos").update(data_payload).eq("id", str(contrato_id)).execute()
+    response = await client.table("contratos").update(data_payload).eq("id", str(contrato_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contrato no encontrado")
@@ -54,7 +83,10 @@ async def update_contrato(contrato_id: UUID, payload: ContratoUpdate, _: dict =
 
 
 @router.delete("/{contrato_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_contrato(contrato_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("contratos").delete().eq("id", str(contrato_id)).execute()
+async def delete_contrato(
+    contrato_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("contratos").delete().eq("id", str(contrato_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
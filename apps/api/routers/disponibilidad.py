@@ -6,29 +6,44 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import Keyset, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Disponibilidad, DisponibilidadCreate, DisponibilidadUpdate
+from apps.api.services.aval_en_turno import invalidate_aval_en_turno
+
+POR_FECHA_INICIO = Keyset("fecha_inicio")
 
 router = APIRouter(prefix="/disponibilidades", tags=["disponibilidades"])
 
 
 @router.get("", response_model=List[Disponibilidad])
 async def list_disponibilidades(
+    response: Response,
     aval_id: UUID | None = Query(default=None),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Disponibilidad)),
     _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[Disponibilidad]:
-    client = get_client()
-    query = client.table("disponibilidades_avales").select("*")
+    query = client.table("disponibilidades_avales").select(projection(fields, POR_FECHA_INICIO.columns))
     if aval_id:
         query = query.eq("aval_id", str(aval_id))
-    response = query.order("fecha_inicio", desc=True).execute()
-    return [Disponibilidad(**row) for row in handle_response(response)]
+    rows = await paginate(query, page, POR_FECHA_INICIO, response)
+    if fields:
+        return sparse_response(rows, Disponibilidad, fields, response)
+    return [Disponibilidad(**row) for row in rows]
 
 
 @router.post("", response_model=Disponibilidad, status_code=status.HTTP_201_CREATED)
-async def create_disponibilidad(payload: DisponibilidadCreate, _: dict = Depends(require_admin)) -> Disponibilidad:
-    client = get_client()
-    response = client.table("disponibilidades_avales").insert(payload.dict()).execute()
+async def create_disponibilidad(
+    payload: DisponibilidadCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Disponibilidad:
+    response = await client.table("disponibilidades_avales").insert(payload.dict()).execute()
+    invalidate_aval_en_turno()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar la disponibilidad")
@@ -40,10 +55,11 @@ async def update_disponibilidad(
     disponibilidad_id: UUID,
     payload: DisponibilidadUpdate,
     _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> Disponibilidad:
-    client = get_client()
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
-    response = client.table("disponibilidades_avales").update(data_payload).eq("id", str(disponibilidad_id)).execute()
+    response = await client.table("disponibilidades_avales").update(data_payload).eq("id", str(disponibilidad_id)).execute()
+    invalidate_aval_en_turno()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Disponibilidad no encontrada")
@@ -51,7 +67,11 @@ async def update_disponibilidad(
 
 
 @router.delete("/{disponibilidad_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_disponibilidad(disponibilidad_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("disponibilidades_avales").delete().eq("id", str(disponibilidad_id)).execute()
+async def delete_disponibilidad(
+    disponibilidad_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("disponibilidades_avales").delete().eq("id", str(disponibilidad_id)).execute()
+    invalidate_aval_en_turno()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
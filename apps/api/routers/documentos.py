@@ -4,13 +4,18 @@ from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from apps.api.core.auth import require_admin, require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Documento, DocumentoCreate, DocumentoUpdate
-from apps.api.services.documentos import fetch_documentos
+from apps.api.services.bundles import aval_entries, documento_entries, stream_zip
+from apps.api.services.documentos import AVAL_DOCUMENT_LABELS, fetch_documentos
 
 router = APIRouter(prefix="/documentos", tags=["documentos"])
+settings = get_settings()
 
 
 @router.get("", response_model=List[Documento])
@@ -19,23 +24,92 @@ async def list_documentos(
     aval_id: Optional[UUID] = Query(default=None),
     cliente_id: Optional[UUID] = Query(default=None),
     _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[Documento]:
-    client = get_client()
-    data = fetch_documentos(client, contrato_id=contrato_id, aval_id=aval_id, cliente_id=cliente_id)
+    data = await fetch_documentos(client, contrato_id=contrato_id, aval_id=aval_id, cliente_id=cliente_id)
     return [Documento(**row) for row in data]
 
 
 @router.get("/aval/{aval_id}", response_model=List[Documento])
-async def list_documentos_por_aval(aval_id: UUID, _: dict = Depends(require_admin_or_asesor)) -> List[Documento]:
-    client = get_client()
-    data = fetch_documentos(client, aval_id=aval_id)
+async def list_documentos_por_aval(
+    aval_id: UUID,
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Documento]:
+    data = await fetch_documentos(client, aval_id=aval_id)
     return [Documento(**row) for row in data]
 
 
+AVAL_BUNDLE_COLUMNS = ",".join(["id", "nombre_completo", "buro_credito_url", *AVAL_DOCUMENT_LABELS])
+
+
+async def _fetch_aval(client: AsyncSupabaseClient, aval_id: UUID) -> dict:
+    response = await client.table("avales").select(AVAL_BUNDLE_COLUMNS).eq("id", str(aval_id)).limit(1).execute()
+    data = handle_response(response)
+    if not data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aval no encontrado")
+    return data[0]
+
+
+def _require_streaming() -> None:
+    # Con STORAGE_PROXY_STREAMING=false (PythonAnywhere) el servidor acumula el cuerpo
+    # completo antes de responder: el ZIP quedaría entero en memoria.
+    if not settings.storage_proxy_streaming:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="La descarga del expediente en ZIP no está disponible en este servidor.",
+        )
+
+
+def _zip_response(entries: list, filename: str) -> StreamingResponse:
+    if not entries:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay documentos para descargar")
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@router.get("/aval/{aval_id}/zip")
+async def download_documentos_aval(
+    aval_id: UUID,
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    _require_streaming()
+    aval = await _fetch_aval(client, aval_id)
+    documentos = await fetch_documentos(client, aval_id=aval_id, columns="tipo,archivo_path,created_at")
+    entries = aval_entries(aval) + documento_entries(documentos)
+    return _zip_response(entries, f"aval-{aval_id}.zip")
+
+
+@router.get("/contrato/{contrato_id}/zip")
+async def download_documentos_contrato(
+    contrato_id: UUID,
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    _require_streaming()
+    response = await client.table("contratos").select("id,aval_id").eq("id", str(contrato_id)).limit(1).execute()
+    contratos = handle_response(response)
+    if not contratos:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contrato no encontrado")
+    documentos = await fetch_documentos(client, contrato_id=contrato_id, columns="tipo,archivo_path,created_at")
+    entries = documento_entries(documentos)
+    aval_id = contratos[0].get("aval_id")
+    if aval_id:
+        entries = aval_entries(await _fetch_aval(client, aval_id)) + entries
+    return _zip_response(entries, f"contrato-{contrato_id}.zip")
+
+
 @router.post("", response_model=Documento, status_code=status.HTTP_201_CREATED)
-async def create_documento(payload: DocumentoCreate, _: dict = Depends(require_admin)) -> Documento:
-    client = get_client()
-    response = client.table("documentos").insert(payload.dict()).execute()
+async def create_documento(
+    payload: DocumentoCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Documento:
+    response = await client.table("documentos").insert(payload.dict()).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear el documento")
@@ -43,10 +117,14 @@ async def create_documento(payload: DocumentoCreate, _: dict = Depends(require_a
 
 
 @router.put("/{documento_id}", response_model=Documento)
-async def update_documento(documento_id: UUID, payload: DocumentoUpdate, _: dict = Depends(require_admin)) -> Documento:
-    client = get_client()
+async def update_documento(
+    documento_id: UUID,
+    payload: DocumentoUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Documento:
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
-    response = client.table("documentos").update(data_payload).eq("id", str(documento_id)).execute()
+    response = await client.table("documentos").update(data_payload).eq("id", str(documento_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Documento no encontrado")
@@ -54,7 +132,10 @@ async def update_documento(documento_id: UUID, payload: DocumentoUpdate, _: dict
 
 
 @router.delete("/{documento_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_documento(documento_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("documentos").delete().eq("id", str(documento_id)).execute()
+async def delete_documento(
+    documento_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("documentos").delete().eq("id", str(documento_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
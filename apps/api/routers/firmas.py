@@ -1,27 +1,36 @@
 from __future__ import annotations
 
-import logging
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.encoders import jsonable_encoder
-
-from postgrest.exceptions import APIError
+from fastapi.responses import StreamingResponse
 
 from apps.api.core.auth import require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
-from apps.api.models.schemas import Firma, FirmaCreate, FirmaUpdate
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import Keyset, PageParams, iter_keyset, paginate
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
+from apps.api.models.schemas import DocumentoUploadResponse, Firma, FirmaCreate, FirmaUpdate
+from apps.api.services.content_store import ObjectOwner, content_store_enabled, drop_owner_references
+from apps.api.services.export import ExportFormat, export_response
+from apps.api.services.record_documents import STORAGE_BUCKET, document_field, store_record_document
+
+POR_FECHA_INICIO = Keyset("fecha_inicio")
 
 router = APIRouter(prefix="/firmas", tags=["firmas"])
-logger = logging.getLogger(__name__)
 
 
-def _column_missing(exc: Exception, column: str) -> bool:
-    return isinstance(exc, APIError) and column in str(exc).lower()
+async def _owner_filter_enabled(client: AsyncSupabaseClient, user: dict) -> bool:
+    if user.get("role") == "admin" or not user.get("id"):
+        return False
+    return await has_column(client, "firmas", "creado_por")
 
 
-def _ensure_entities_habilitated(client, data_payload: dict) -> None:
+async def _ensure_entities_habilitated(client: AsyncSupabaseClient, data_payload: dict) -> None:
     aval_id = data_payload.get("aval_id")
     cliente_id = data_payload.get("cliente_id")
     inmobiliaria_id = data_payload.get("inmobiliaria_id")
@@ -33,7 +42,7 @@ def _ensure_entities_habilitated(client, data_payload: dict) -> None:
             .eq("aval_id", str(aval_id))
             .eq("estatus", "activo")
         )
-        vetos = handle_response(query.execute()) or []
+        vetos = handle_response(await query.execute()) or []
         if vetos:
             for veto in vetos:
                 target = veto.get("inmobiliaria_id")
@@ -58,7 +67,7 @@ def _ensure_entities_habilitated(client, data_payload: dict) -> None:
             .eq("cliente_id", str(cliente_id))
             .eq("estatus", "vetado")
         )
-        registros = handle_response(query.execute()) or []
+        registros = handle_response(await query.execute()) or []
         if registros:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -67,39 +76,58 @@ def _ensure_entities_habilitated(client, data_payload: dict) -> None:
 
 
 @router.get("", response_model=List[Firma])
-async def list_firmas(user: dict = Depends(require_admin_or_asesor)) -> List[Firma]:
-    client = get_client()
-    query = client.table("firmas").select("*").order("fecha_inicio", desc=True)
-    if user.get("role") != "admin" and user.get("id"):
+async def list_firmas(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Firma)),
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Firma]:
+    query = client.table("firmas").select(projection(fields, POR_FECHA_INICIO.columns))
+    if await _owner_filter_enabled(client, user):
         query = query.eq("creado_por", str(user["id"]))
-    try:
-        response = query.execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en firmas; se omite filtro temporalmente.")
-            response = client.table("firmas").select("*").order("fecha_inicio", desc=True).execute()
-        else:
-            raise
-    return [Firma(**row) for row in handle_response(response)]
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, POR_FECHA_INICIO, response)
+    if fields:
+        return sparse_response(rows, Firma, fields, response)
+    return [Firma(**row) for row in rows]
+
+
+@router.get("/export")
+async def export_firmas(
+    fmt: ExportFormat = Query(default="ndjson", alias="format"),
+    fields: List[str] | None = Depends(field_selector(Firma)),
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    columns = projection(fields, POR_FECHA_INICIO.columns)
+    owner_id = str(user["id"]) if await _owner_filter_enabled(client, user) else None
+
+    def make_query():
+        query = client.table("firmas").select(columns)
+        return query.eq("creado_por", owner_id) if owner_id else query
+
+    pages = iter_keyset(make_query, POR_FECHA_INICIO)
+    return export_response(pages, Firma, fmt, "firmas", fields)
 
 
 @router.post("", response_model=Firma, status_code=status.HTTP_201_CREATED)
-async def create_firma(payload: FirmaCreate, user: dict = Depends(require_admin_or_asesor)) -> Firma:
-    client = get_client()
+async def create_firma(
+    payload: FirmaCreate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Firma:
     data_payload = jsonable_encoder(payload, exclude_none=True)
     data_payload.setdefault("fecha_fin", data_payload.get("fecha_inicio"))
-    if user.get("id"):
+    if not await has_column(client, "firmas", "creado_por"):
+        data_payload.pop("creado_por", None)
+    elif user.get("id"):
         data_payload.setdefault("creado_por", str(user["id"]))
-    _ensure_entities_habilitated(client, data_payload)
-    try:
-        response = client.table("firmas").insert(data_payload).execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en firmas; reintentando inserción sin el campo.")
-            data_payload.pop("creado_por", None)
-            response = client.table("firmas").insert(data_payload).execute()
-        else:
-            raise
+    await _ensure_entities_habilitated(client, data_payload)
+    response = await client.table("firmas").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear la firma")
@@ -107,57 +135,62 @@ async def create_firma(payload: FirmaCreate, user: dict = Depends(require_admin_
 
 
 @router.put("/{firma_id}", response_model=Firma)
-async def update_firma(firma_id: UUID, payload: FirmaUpdate, user: dict = Depends(require_admin_or_asesor)) -> Firma:
-    client = get_client()
+async def update_firma(
+    firma_id: UUID,
+    payload: FirmaUpdate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Firma:
     data_payload = jsonable_encoder(payload, exclude_none=True)
     if "fecha_inicio" in data_payload and "fecha_fin" not in data_payload:
         data_payload["fecha_fin"] = data_payload["fecha_inicio"]
     requires_lookup = any(field not in data_payload for field in ("aval_id", "cliente_id", "inmobiliaria_id"))
     merged = dict(data_payload)
     if requires_lookup:
-        existing_resp = (
+        existing_resp = await (
             client.table("firmas").select("aval_id,cliente_id,inmobiliaria_id").eq("id", str(firma_id)).single().execute()
         )
         existing = handle_response(existing_resp) or {}
         for field in ("aval_id", "cliente_id", "inmobiliaria_id"):
             if field not in merged and existing.get(field):
                 merged[field] = existing[field]
-    _ensure_entities_habilitated(client, merged)
-    try:
-        if user.get("id") and user.get("role") != "admin":
-            response = (
-                client.table("firmas")
-                .update(data_payload)
-                .eq("id", str(firma_id))
-                .eq("creado_por", str(user["id"]))
-                .execute()
-            )
-        else:
-            response = client.table("firmas").update(data_payload).eq("id", str(firma_id)).execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en firmas; se actualiza sin filtro por asesor.")
-            response = client.table("firmas").update(data_payload).eq("id", str(firma_id)).execute()
-        else:
-            raise
+    await _ensure_entities_habilitated(client, merged)
+    query = client.table("firmas").update(data_payload).eq("id", str(firma_id))
+    if await _owner_filter_enabled(client, user):
+        query = query.eq("creado_por", str(user["id"]))
+    response = await query.execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Firma no encontrada")
     return Firma(**data[0])
 
 
+@router.post("/{firma_id}/documentos/{field}", response_model=DocumentoUploadResponse)
+async def upload_firma_documento(
+    firma_id: UUID,
+    field: str,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> DocumentoUploadResponse:
+    owner = ObjectOwner("firmas", firma_id, document_field("firmas", field))
+    if await _owner_filter_enabled(client, user):
+        return await store_record_document(
+            client, owner, file, "Firma no encontrada", scope=lambda query: query.eq("creado_por", str(user["id"]))
+        )
+    return await store_record_document(client, owner, file, "Firma no encontrada")
+
+
 @router.delete("/{firma_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_firma(firma_id: UUID, user: dict = Depends(require_admin_or_asesor)) -> Response:
-    client = get_client()
+async def delete_firma(
+    firma_id: UUID,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
     query = client.table("firmas").delete().eq("id", str(firma_id))
-    if user.get("role") != "admin" and user.get("id"):
+    if await _owner_filter_enabled(client, user):
         query = query.eq("creado_por", str(user["id"]))
-    try:
-        query.execute()
-    except APIError as exc:
-        if _column_missing(exc, "creado_por"):
-            logger.warning("Columna creado_por ausente en firmas; se elimina sin filtro por asesor.")
-            client.table("firmas").delete().eq("id", str(firma_id)).execute()
-        else:
-            raise
+    deleted = handle_response(await query.execute())
+    if deleted and await content_store_enabled(client):
+        await drop_owner_references(client, STORAGE_BUCKET, "firmas", firma_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -6,28 +6,42 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from apps.api.core.auth import require_admin, require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import Keyset, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Inmobiliaria, InmobiliariaCreate, InmobiliariaUpdate
 
+POR_NOMBRE = Keyset("nombre", desc=False)
+
 router = APIRouter(prefix="/inmobiliarias", tags=["inmobiliarias"])
 
 
 @router.get("", response_model=List[Inmobiliaria])
 async def list_inmobiliarias(
-    q: str | None = Query(default=None), _: dict = Depends(require_admin_or_asesor)
+    response: Response,
+    q: str | None = Query(default=None),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Inmobiliaria)),
+    _: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[Inmobiliaria]:
-    client = get_client()
-    query = client.table("inmobiliarias").select("*")
+    query = client.table("inmobiliarias").select(projection(fields, POR_NOMBRE.columns))
     if q:
         query = query.ilike("nombre", f"%{q}%")
-    response = query.order("nombre", desc=False).execute()
-    return [Inmobiliaria(**row) for row in handle_response(response)]
+    rows = await paginate(query, page, POR_NOMBRE, response)
+    if fields:
+        return sparse_response(rows, Inmobiliaria, fields, response)
+    return [Inmobiliaria(**row) for row in rows]
 
 
 @router.post("", response_model=Inmobiliaria, status_code=status.HTTP_201_CREATED)
-async def create_inmobiliaria(payload: InmobiliariaCreate, _: dict = Depends(require_admin)) -> Inmobiliaria:
-    client = get_client()
-    existing = (
+async def create_inmobiliaria(
+    payload: InmobiliariaCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Inmobiliaria:
+    existing = await (
         client.table("inmobiliarias")
         .select("id")
         .ilike("nombre", payload.nombre)
@@ -38,7 +52,7 @@ async def create_inmobiliaria(payload: InmobiliariaCreate, _: dict = Depends(req
     if data_existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La inmobiliaria ya está registrada")
 
-    response = client.table("inmobiliarias").insert(payload.dict()).execute()
+    response = await client.table("inmobiliarias").insert(payload.dict()).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar la inmobiliaria")
@@ -47,11 +61,13 @@ async def create_inmobiliaria(payload: InmobiliariaCreate, _: dict = Depends(req
 
 @router.put("/{inmobiliaria_id}", response_model=Inmobiliaria)
 async def update_inmobiliaria(
-    inmobiliaria_id: UUID, payload: InmobiliariaUpdate, _: dict = Depends(require_admin)
+    inmobiliaria_id: UUID,
+    payload: InmobiliariaUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> Inmobiliaria:
-    client = get_client()
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
-    response = client.table("inmobiliarias").update(data_payload).eq("id", str(inmobiliaria_id)).execute()
+    response = await client.table("inmobiliarias").update(data_payload).eq("id", str(inmobiliaria_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inmobiliaria no encontrada")
@@ -59,7 +75,10 @@ async def update_inmobiliaria(
 
 
 @router.delete("/{inmobiliaria_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_inmobiliaria(inmobiliaria_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("inmobiliarias").delete().eq("id", str(inmobiliaria_id)).execute()
+async def delete_inmobiliaria(
+    inmobiliaria_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("inmobiliarias").delete().eq("id", str(inmobiliaria_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
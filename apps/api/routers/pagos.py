@@ -4,29 +4,57 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, iter_keyset, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Pago, PagoCreate, PagoUpdate
+from apps.api.services.export import ExportFormat, export_response
 
 router = APIRouter(prefix="/pagos", tags=["pagos"])
 
 
 @router.get("", response_model=List[Pago])
-async def list_pagos(_: dict = Depends(require_admin)) -> List[Pago]:
-    client = get_client()
-    response = client.table("pagos").select("*").order("created_at", desc=True).execute()
-    return [Pago(**row) for row in handle_response(response)]
+async def list_pagos(
+    response: Response,
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Pago)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Pago]:
+    query = client.table("pagos").select(projection(fields, CREATED_AT.columns))
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, Pago, fields, response)
+    return [Pago(**row) for row in rows]
+
+
+@router.get("/export")
+async def export_pagos(
+    fmt: ExportFormat = Query(default="ndjson", alias="format"),
+    fields: List[str] | None = Depends(field_selector(Pago)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    columns = projection(fields, CREATED_AT.columns)
+    pages = iter_keyset(lambda: client.table("pagos").select(columns), CREATED_AT)
+    return export_response(pages, Pago, fmt, "pagos", fields)
 
 
 @router.post("", response_model=Pago, status_code=status.HTTP_201_CREATED)
-async def create_pago(payload: PagoCreate, _: dict = Depends(require_admin)) -> Pago:
-    client = get_client()
+async def create_pago(
+    payload: PagoCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Pago:
     data_payload = payload.dict()
     if data_payload.get("fecha_pago") is None:
         data_payload["fecha_pago"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("pagos").insert(data_payload).execute()
+    response = await client.table("pagos").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar el pago")
@@ -34,10 +62,14 @@ async def create_pago(payload: PagoCreate, _: dict = Depends(require_admin)) ->
 
 
 @router.put("/{pago_id}", response_model=Pago)
-async def update_pago(pago_id: UUID, payload: PagoUpdate, _: dict = Depends(require_admin)) -> Pago:
-    client = get_client()
+async def update_pago(
+    pago_id: UUID,
+    payload: PagoUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Pago:
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
-    response = client.table("pagos").update(data_payload).eq("id", str(pago_id)).execute()
+    response = await client.table("pagos").update(data_payload).eq("id", str(pago_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pago no encontrado")
@@ -45,7 +77,10 @@ async def update_pago(pago_id: UUID, payload: PagoUpdate, _: dict = Depends(requ
 
 
 @router.delete("/{pago_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_pago(pago_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("pagos").delete().eq("id", str(pago_id)).execute()
+async def delete_pago(
+    pago_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("pagos").delete().eq("id", str(pago_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
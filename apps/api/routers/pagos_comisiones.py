@@ -4,18 +4,25 @@ from datetime import datetime
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import Keyset, PageParams, iter_keyset, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import PagoComision, PagoComisionCreate, PagoComisionUpdate
+from apps.api.services.export import ExportFormat, export_response
+
+POR_FECHA_PAGO = Keyset("fecha_pago")
 
 router = APIRouter(prefix="/pagos-comisiones", tags=["pagos-comisiones"])
 
 
-@router.get("", response_model=List[PagoComision])
-async def list_pagos_comisiones(
+def _filtros(
     beneficiario_id: UUID | None = Query(default=None),
     beneficiario_tipo: str | None = Query(default=None),
     firma_id: UUID | None = Query(default=None),
@@ -24,35 +31,74 @@ async def list_pagos_comisiones(
     sin_corte: bool | None = Query(default=None),
     fecha_inicio: datetime | None = Query(default=None),
     fecha_fin: datetime | None = Query(default=None),
+) -> dict:
+    return {
+        "beneficiario_id": beneficiario_id,
+        "beneficiario_tipo": beneficiario_tipo,
+        "firma_id": firma_id,
+        "estado": estado,
+        "corte_id": corte_id,
+        "sin_corte": sin_corte,
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+    }
+
+
+def _query(client: AsyncSupabaseClient, columns: str, filtros: dict):
+    query = client.table("pagos_comisiones").select(columns)
+    for column in ("beneficiario_id", "beneficiario_tipo", "firma_id", "estado", "corte_id"):
+        if filtros[column]:
+            query = query.eq(column, str(filtros[column]))
+    if filtros["sin_corte"]:
+        query = query.is_("corte_id", "null")
+    if filtros["fecha_inicio"]:
+        query = query.gte("fecha_pago", filtros["fecha_inicio"].isoformat())
+    if filtros["fecha_fin"]:
+        query = query.lte("fecha_pago", filtros["fecha_fin"].isoformat())
+    return query
+
+
+@router.get("", response_model=List[PagoComision])
+async def list_pagos_comisiones(
+    request: Request,
+    response: Response,
+    filtros: dict = Depends(_filtros),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(PagoComision)),
     _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[PagoComision]:
-    client = get_client()
-    query = client.table("pagos_comisiones").select("*")
-    if beneficiario_id:
-        query = query.eq("beneficiario_id", str(beneficiario_id))
-    if beneficiario_tipo:
-        query = query.eq("beneficiario_tipo", beneficiario_tipo)
-    if firma_id:
-        query = query.eq("firma_id", str(firma_id))
-    if estado:
-        query = query.eq("estado", estado)
-    if corte_id:
-        query = query.eq("corte_id", str(corte_id))
-    if sin_corte:
-        query = query.is_("corte_id", "null")
-    if fecha_inicio:
-        query = query.gte("fecha_pago", fecha_inicio.isoformat())
-    if fecha_fin:
-        query = query.lte("fecha_pago", fecha_fin.isoformat())
-    response = query.order("fecha_pago", desc=True).execute()
-    return [PagoComision(**row) for row in handle_response(response)]
+    query = _query(client, projection(fields, POR_FECHA_PAGO.columns), filtros)
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, POR_FECHA_PAGO, response)
+    if fields:
+        return sparse_response(rows, PagoComision, fields, response)
+    return [PagoComision(**row) for row in rows]
+
+
+@router.get("/export")
+async def export_pagos_comisiones(
+    fmt: ExportFormat = Query(default="ndjson", alias="format"),
+    filtros: dict = Depends(_filtros),
+    fields: List[str] | None = Depends(field_selector(PagoComision)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> StreamingResponse:
+    columns = projection(fields, POR_FECHA_PAGO.columns)
+    pages = iter_keyset(lambda: _query(client, columns, filtros), POR_FECHA_PAGO)
+    return export_response(pages, PagoComision, fmt, "pagos-comisiones", fields)
 
 
 @router.post("", response_model=PagoComision, status_code=status.HTTP_201_CREATED)
-async def create_pago_comision(payload: PagoComisionCreate, _: dict = Depends(require_admin)) -> PagoComision:
-    client = get_client()
+async def create_pago_comision(
+    payload: PagoComisionCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> PagoComision:
     data_payload = jsonable_encoder(payload)
-    response = client.table("pagos_comisiones").insert(data_payload).execute()
+    response = await client.table("pagos_comisiones").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar el pago de comisión")
@@ -60,10 +106,14 @@ async def create_pago_comision(payload: PagoComisionCreate, _: dict = Depends(re
 
 
 @router.put("/{pago_id}", response_model=PagoComision)
-async def update_pago_comision(pago_id: UUID, payload: PagoComisionUpdate, _: dict = Depends(require_admin)) -> PagoComision:
-    client = get_client()
+async def update_pago_comision(
+    pago_id: UUID,
+    payload: PagoComisionUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> PagoComision:
     data_payload = {k: v for k, v in jsonable_encoder(payload).items() if v is not None}
-    response = client.table("pagos_comisiones").update(data_payload).eq("id", str(pago_id)).execute()
+    response = await client.table("pagos_comisiones").update(data_payload).eq("id", str(pago_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pago no encontrado")
@@ -71,7 +121,10 @@ async def update_pago_comision(pago_id: UUID, payload: PagoComisionUpdate, _: di
 
 
 @router.delete("/{pago_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_pago_comision(pago_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("pagos_comisiones").delete().eq("id", str(pago_id)).execute()
+async def delete_pago_comision(
+    pago_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("pagos_comisiones").delete().eq("id", str(pago_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
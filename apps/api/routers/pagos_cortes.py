@@ -1,32 +1,39 @@
 from __future__ import annotations
 
-from datetime import datetime
-from io import BytesIO
+from datetime import date
 from typing import List
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
-from decimal import Decimal
-
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
-from apps.api.models.schemas import PagoCorte, PagoCorteCreate
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.models.schemas import CorteJob, CortePreview, PagoCorte, PagoCorteCreate, PagosLedgerConciliacion
+from apps.api.services.cortes import (
+    STORAGE_BUCKET,
+    corte_from_result,
+    corte_job_payload,
+    corte_jobs,
+    corte_pdf_jobs,
+    preview_corte,
+    rebuild_pagos_ledger,
+    verify_pagos_ledger,
+)
+from apps.api.services.jobs import Job
 from apps.api.services.storage import build_proxy_url
 
-STORAGE_BUCKET = "documentos-aval"
-
 router = APIRouter(prefix="/pagos/cortes", tags=["pagos-cortes"])
 
 
 @router.get("", response_model=List[PagoCorte])
-async def list_pagos_cortes(_: dict = Depends(require_admin)) -> List[PagoCorte]:
-    client = get_client()
-    response = client.table("pagos_cortes").select("*").order("created_at", desc=True).execute()
-    registros = handle_response(response) or []
+async def list_pagos_cortes(
+    response: Response,
+    page: PageParams = Depends(),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[PagoCorte]:
+    registros = await paginate(client.table("pagos_cortes").select("*"), page, CREATED_AT, response)
     cortes: List[PagoCorte] = []
     for row in registros:
         pdf_path = row.get("pdf_path")
@@ -45,197 +52,99 @@ async def list_pagos_cortes(_: dict = Depends(require_admin)) -> List[PagoCorte]
     return cortes
 
 
-@router.post("", response_model=PagoCorte, status_code=status.HTTP_201_CREATED)
-async def create_pago_corte(payload: PagoCorteCreate, _: dict = Depends(require_admin)) -> PagoCorte:
-    if payload.fecha_inicio > payload.fecha_fin:
+@router.get("/preview", response_model=CortePreview)
+async def preview_pago_corte(
+    fecha_inicio: date = Query(...),
+    fecha_fin: date = Query(...),
+    incluir_servicios: bool = Query(default=True),
+    incluir_comisiones: bool = Query(default=True),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> CortePreview:
+    if fecha_inicio > fecha_fin:
         raise HTTPException(status_code=400, detail="La fecha inicio no puede ser mayor a la fecha fin.")
-
-    client = get_client()
-
-    servicios_query = client.table("pagos_servicio").select("*").is_("corte_id", "null")
-    comisiones_query = client.table("pagos_comisiones").select("*").is_("corte_id", "null")
-    fecha_inicio = datetime.combine(payload.fecha_inicio, datetime.min.time()).isoformat()
-    fecha_fin = datetime.combine(payload.fecha_fin, datetime.max.time()).isoformat()
-    servicios_query = servicios_query.gte("fecha_pago", fecha_inicio).lte("fecha_pago", fecha_fin)
-    comisiones_query = comisiones_query.gte("fecha_pago", fecha_inicio).lte("fecha_pago", fecha_fin)
-
-    servicios = handle_response(servicios_query.execute()) if payload.incluir_servicios else []
-    comisiones = handle_response(comisiones_query.execute()) if payload.incluir_comisiones else []
-    servicios = servicios or []
-    comisiones = comisiones or []
-
-    if not servicios and not comisiones:
-        raise HTTPException(status_code=400, detail="No hay pagos dentro del rango seleccionado.")
-
-    firma_ids = {row["firma_id"] for row in servicios + comisiones if row.get("firma_id")}
-    firmas_map = {}
-    if firma_ids:
-        firmas_resp = (
-            client.table("firmas")
-            .select("id,cliente_nombre,asesor_nombre")
-            .in_("id", list(firma_ids))
-            .execute()
-        )
-        firmas_map = {item["id"]: item for item in handle_response(firmas_resp) or []}
-
-    aval_ids = {row["beneficiario_id"] for row in comisiones if row.get("beneficiario_tipo") == "aval"}
-    avales_map = {}
-    if aval_ids:
-        avales_resp = (
-            client.table("avales").select("id,nombre_completo").in_("id", list(aval_ids)).execute()
-        )
-        avales_map = {item["id"]: item for item in handle_response(avales_resp) or []}
-
-    asesor_ids = {row["beneficiario_id"] for row in comisiones if row.get("beneficiario_tipo") == "asesor"}
-    asesores_map = {}
-    if asesor_ids:
-        asesores_resp = (
-            client.table("asesores").select("id,nombre").in_("id", list(asesor_ids)).execute()
-        )
-        asesores_map = {item["id"]: item for item in handle_response(asesores_resp) or []}
-
-    total_servicio = sum(
-        (row.get("monto_efectivo") or 0) + (row.get("monto_transferencia") or 0) for row in servicios
-    )
-    total_comisiones = sum(row.get("monto") or 0 for row in comisiones)
-
-    corte_id = uuid4()
-    data_payload = {
-        "id": str(corte_id),
-        "fecha_inicio": payload.fecha_inicio.isoformat(),
-        "fecha_fin": payload.fecha_fin.isoformat(),
-        "total_servicio": total_servicio,
-        "total_comisiones": total_comisiones,
-    }
-    insert_resp = client.table("pagos_cortes").insert(data_payload).execute()
-    handle_response(insert_resp)
-
-    pdf_path = _generate_and_upload_pdf(
-        corte_id=str(corte_id),
-        fecha_inicio=payload.fecha_inicio,
-        fecha_fin=payload.fecha_fin,
-        servicios=servicios,
-        comisiones=comisiones,
-        firmas_map=firmas_map,
-        avales_map=avales_map,
-        asesores_map=asesores_map,
-        client=client,
+    payload = PagoCorteCreate(
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        incluir_servicios=incluir_servicios,
+        incluir_comisiones=incluir_comisiones,
     )
+    return await preview_corte(client, payload)
 
-    client.table("pagos_cortes").update({"pdf_path": pdf_path}).eq("id", str(corte_id)).execute()
 
-    if servicios:
-        service_ids = [row["id"] for row in servicios]
-        client.table("pagos_servicio").update({"corte_id": str(corte_id)}).in_("id", service_ids).execute()
-    if comisiones:
-        comision_ids = [row["id"] for row in comisiones]
-        client.table("pagos_comisiones").update({"corte_id": str(corte_id)}).in_("id", comision_ids).execute()
+@router.get("/ledger", response_model=PagosLedgerConciliacion)
+async def verify_pagos_ledger_endpoint(
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> PagosLedgerConciliacion:
+    return await verify_pagos_ledger(client)
 
-    try:
-        pdf_url, *_ = build_proxy_url(STORAGE_BUCKET, pdf_path)
-    except ValueError:
-        pdf_url = None
 
-    return PagoCorte(
-        id=corte_id,
-        fecha_inicio=payload.fecha_inicio,
-        fecha_fin=payload.fecha_fin,
-        incluir_servicios=payload.incluir_servicios,
-        incluir_comisiones=payload.incluir_comisiones,
-        total_servicio=Decimal(str(total_servicio)),
-        total_comisiones=Decimal(str(total_comisiones)),
-        pdf_path=pdf_path,
-        pdf_url=pdf_url,
-        created_at=datetime.utcnow(),
-    )
+@router.post("/ledger/reconstruir", response_model=PagosLedgerConciliacion)
+async def rebuild_pagos_ledger_endpoint(
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> PagosLedgerConciliacion:
+    return await rebuild_pagos_ledger(client)
 
 
-def _generate_and_upload_pdf(
-    corte_id: str,
-    fecha_inicio,
-    fecha_fin,
-    servicios,
-    comisiones,
-    firmas_map,
-    avales_map,
-    asesores_map,
-    client,
-) -> str:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    y = height - 40
-
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(40, y, "Corte de pagos")
-    y -= 16
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(40, y, f"Rango: {fecha_inicio.isoformat()} al {fecha_fin.isoformat()}")
-    y -= 20
-
-    if servicios:
-        pdf.setFont("Helvetica-Bold", 12)
-        pdf.drawString(40, y, "Pagos del servicio")
-        y -= 16
-        pdf.setFont("Helvetica", 9)
-        for row in servicios:
-            if y < 80:
-                pdf.showPage()
-                y = height - 40
-                pdf.setFont("Helvetica-Bold", 12)
-                pdf.drawString(40, y, "Pagos del servicio (cont.)")
-                y -= 16
-                pdf.setFont("Helvetica", 9)
-            firma = firmas_map.get(row["firma_id"], {})
-            cliente = firma.get("cliente_nombre", "—")
-            total = (row.get("monto_efectivo") or 0) + (row.get("monto_transferencia") or 0)
-            pdf.drawString(
-                40,
-                y,
-                f"{cliente} | Efectivo: ${row.get('monto_efectivo', 0):,.2f} | Transferencia: ${row.get('monto_transferencia', 0):,.2f} | Total: ${total:,.2f}",
-            )
-            y -= 12
-    else:
-        pdf.drawString(40, y, "No se registraron pagos de servicio en este corte.")
-        y -= 16
-
-    if comisiones:
-        if y < 120:
-            pdf.showPage()
-            y = height - 40
-        pdf.setFont("Helvetica-Bold", 12)
-        pdf.drawString(40, y, "Pagos de comisiones")
-        y -= 16
-        pdf.setFont("Helvetica", 9)
-        for row in comisiones:
-            if y < 80:
-                pdf.showPage()
-                y = height - 40
-                pdf.setFont("Helvetica-Bold", 12)
-                pdf.drawString(40, y, "Pagos de comisiones (cont.)")
-                y -= 16
-                pdf.setFont("Helvetica", 9)
-            nombre = "—"
-            if row.get("beneficiario_tipo") == "aval":
-                nombre = avales_map.get(row["beneficiario_id"], {}).get("nombre_completo", "—")
-            else:
-                nombre = asesores_map.get(row["beneficiario_id"], {}).get("nombre", "—")
-            firma = firmas_map.get(row["firma_id"], {})
-            pdf.drawString(
-                40,
-                y,
-                f"{row.get('beneficiario_tipo').capitalize()}: {nombre} | Firma: {firma.get('cliente_nombre', '—')} | Monto: ${row.get('monto', 0):,.2f}",
-            )
-            y -= 12
-    else:
-        pdf.drawString(40, y, "No se registraron comisiones en este corte.")
-        y -= 16
-
-    pdf.save()
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-
-    path = f"reportes/cortes/{corte_id}.pdf"
-    storage = client.storage.from_(STORAGE_BUCKET)
-    storage.upload(path, pdf_bytes, {"content-type": "application/pdf", "upsert": True})
-    return path
+@router.post("", response_model=CorteJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_pago_corte(
+    payload: PagoCorteCreate,
+    user: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> CorteJob:
+    if payload.fecha_inicio > payload.fecha_fin:
+        raise HTTPException(status_code=400, detail="La fecha inicio no puede ser mayor a la fecha fin.")
+    job = await corte_jobs.submit(client, corte_job_payload(uuid4(), payload), created_by=user.get("id"))
+    return _job_response(job)
+
+
+@router.post("/{corte_id}/pdf", response_model=CorteJob, status_code=status.HTTP_202_ACCEPTED)
+async def regenerate_pago_corte_pdf(
+    corte_id: UUID,
+    user: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> CorteJob:
+    """Vuelve a generar el PDF de un corte existente (p. ej. si falló después de registrarlo)."""
+    job = await corte_pdf_jobs.submit(client, {"corte_id": str(corte_id)}, created_by=user.get("id"))
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=CorteJob)
+async def get_pago_corte_job(
+    job_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> CorteJob:
+    job = await corte_jobs.get(client, job_id) or await corte_pdf_jobs.get(client, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _job_response(job)
+
+
+@router.post("/jobs/{job_id}/reintentar", response_model=CorteJob, status_code=status.HTTP_202_ACCEPTED)
+async def retry_pago_corte_job(
+    job_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> CorteJob:
+    """Reintenta un trabajo fallido con el mismo payload (mismo ``corte_id``)."""
+    job = await corte_jobs.retry(client, job_id) or await corte_pdf_jobs.retry(client, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _job_response(job)
+
+
+def _job_response(job: Job) -> CorteJob:
+    return CorteJob(
+        id=job.id,
+        status=job.status,
+        corte_id=job.payload.get("corte_id"),
+        error=job.error,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        corte=corte_from_result(job.result) if job.result else None,
+    )
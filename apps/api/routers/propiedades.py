@@ -4,26 +4,45 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from apps.api.core.auth import require_admin
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import Propiedad, PropiedadCreate, PropiedadUpdate
 
 router = APIRouter(prefix="/propiedades", tags=["propiedades"])
 
 
 @router.get("", response_model=List[Propiedad])
-async def list_propiedades(_: dict = Depends(require_admin)) -> List[Propiedad]:
-    client = get_client()
-    response = client.table("propiedades").select("*").order("created_at", desc=True).execute()
-    return [Propiedad(**row) for row in handle_response(response)]
+async def list_propiedades(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(Propiedad)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Propiedad]:
+    query = client.table("propiedades").select(projection(fields, CREATED_AT.columns))
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, Propiedad, fields, response)
+    return [Propiedad(**row) for row in rows]
 
 
 @router.post("", response_model=Propiedad, status_code=status.HTTP_201_CREATED)
-async def create_propiedad(payload: PropiedadCreate, _: dict = Depends(require_admin)) -> Propiedad:
-    client = get_client()
-    response = client.table("propiedades").insert(payload.dict()).execute()
+async def create_propiedad(
+    payload: PropiedadCreate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Propiedad:
+    response = await client.table("propiedades").insert(payload.dict()).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo crear la propiedad")
@@ -31,21 +50,31 @@ async def create_propiedad(payload: PropiedadCreate, _: dict = Depends(require_a
 
 
 @router.get("/{propiedad_id}", response_model=Propiedad)
-async def get_propiedad(propiedad_id: UUID, _: dict = Depends(require_admin)) -> Propiedad:
-    client = get_client()
-    response = client.table("propiedades").select("*").eq("id", str(propiedad_id)).single().execute()
+async def get_propiedad(
+    propiedad_id: UUID,
+    fields: List[str] | None = Depends(field_selector(Propiedad)),
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Propiedad:
+    response = await client.table("propiedades").select(projection(fields)).eq("id", str(propiedad_id)).single().execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Propiedad no encontrada")
+    if fields:
+        return sparse_response(data, Propiedad, fields)
     return Propiedad(**data)
 
 
 @router.put("/{propiedad_id}", response_model=Propiedad)
-async def update_propiedad(propiedad_id: UUID, payload: PropiedadUpdate, _: dict = Depends(require_admin)) -> Propiedad:
-    client = get_client()
+async def update_propiedad(
+    propiedad_id: UUID,
+    payload: PropiedadUpdate,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Propiedad:
     data_payload = {k: v for k, v in payload.dict().items() if v is not None}
     data_payload["updated_at"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("propiedades").update(data_payload).eq("id", str(propiedad_id)).execute()
+    response = await client.table("propiedades").update(data_payload).eq("id", str(propiedad_id)).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Propiedad no encontrada")
@@ -53,7 +82,10 @@ async def update_propiedad(propiedad_id: UUID, payload: PropiedadUpdate, _: dict
 
 
 @router.delete("/{propiedad_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_propiedad(propiedad_id: UUID, _: dict = Depends(require_admin)) -> Response:
-    client = get_client()
-    client.table("propiedades").delete().eq("id", str(propiedad_id)).execute()
+async def delete_propiedad(
+    propiedad_id: UUID,
+    _: dict = Depends(require_admin),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
+    await client.table("propiedades").delete().eq("id", str(propiedad_id)).execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,22 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
 from apps.api.core.config import get_settings
 from apps.api.models.schemas import (
     Disponibilidad,
     PublicAval,
     PublicClienteVetado,
     PublicDocumento,
+    PublicEnTurno,
     PublicFirma,
     PublicVetoAval,
 )
-from apps.api.services.documentos import fetch_documentos
+from apps.api.services.aval_en_turno import get_aval_en_turno_id
+from apps.api.services.documentos import AVAL_DOCUMENT_LABELS, fetch_documentos
 from apps.api.services.storage import build_proxy_url
 
 
@@ -56,52 +62,20 @@ def _build_signed_urls_for_documents(document_map: dict[UUID, dict]) -> dict[UUI
         signed_map[doc_id] = _create_signed_url(path) if path else None
     return signed_map
 
-AVAL_DOCUMENT_LABELS = {
-    "identificacion_oficial_url": "Identificación oficial",
-    "comprobante_domicilio_cfe_url": "Comprobante domicilio CFE",
-    "comprobante_domicilio_siapa_url": "Comprobante domicilio SIAPA",
-    "pago_predial_url": "Pago predial",
-    "escrituras_url": "Escrituras",
-    "certificado_libre_gravamen_url": "Certificado libre de gravamen",
-    "rfc_url": "RFC",
-    "curp_url": "CURP",
-    "acta_nacimiento_url": "Acta de nacimiento",
-    "comprobante_ingresos_1_url": "Comprobante de ingresos 1",
-    "comprobante_ingresos_2_url": "Comprobante de ingresos 2",
-    "comprobante_ingresos_3_url": "Comprobante de ingresos 3",
-}
 
 router = APIRouter(prefix="/public", tags=["public"])
 
 
-def _get_active_aval_id() -> Optional[UUID]:
-    client = get_client()
-    now_iso = datetime.now(timezone.utc).isoformat()
-    response = client.rpc("fn_aval_en_turno", {"target": now_iso}).execute()
-    data = handle_response(response)
-
-    if data is None:
-        return None
-
-    if isinstance(data, list):
-        if not data:
-            return None
-        data = data[0]
-
-    try:
-        return UUID(str(data))
-    except (TypeError, ValueError):
-        return None
-
-
 @router.get("/firmas", response_model=List[PublicFirma])
 async def obtener_firmas_publicas(
+    request: Request,
+    response: Response,
     fecha_desde: datetime | None = Query(default=None),
     fecha_hasta: datetime | None = Query(default=None),
     aval_id: UUID | None = Query(default=None),
     estado: str | None = Query(default=None),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[PublicFirma]:
-    client = get_client()
     query = client.table("vw_firmas_publicas").select("*")
     if fecha_desde:
         query = query.gte("fecha_inicio", fecha_desde.isoformat())
@@ -111,122 +85,146 @@ async def obtener_firmas_publicas(
         query = query.eq("aval_id", str(aval_id))
     if estado:
         query = query.eq("estado", estado)
-    response = query.order("fecha_inicio", desc=False).execute()
-    return [PublicFirma(**row) for row in handle_response(response)]
+    # El calendario público consulta este endpoint constantemente; updated_at viene de la vista.
+    if await has_column(client, "vw_firmas_publicas", "updated_at"):
+        not_modified = await conditional_get(request, response, query)
+        if not_modified is not None:
+            return not_modified
+    result = await query.order("fecha_inicio", desc=False).execute()
+    return [PublicFirma(**row) for row in handle_response(result)]
 
 
 @router.get("/documentos", response_model=List[PublicDocumento])
-async def obtener_documentos_publicos() -> List[PublicDocumento]:
-    client = get_client()
-    response = client.table("vw_documentos_publicos").select("*").order("created_at", desc=True).execute()
+async def obtener_documentos_publicos(client: AsyncSupabaseClient = Depends(get_async_client)) -> List[PublicDocumento]:
+    response = await client.table("vw_documentos_publicos").select("*").order("created_at", desc=True).execute()
     documentos = []
     for row in handle_response(response):
         path = row.get("archivo_path")
-        signed = _create_signed_url(client, path) if path else None
+        signed = _create_signed_url(path) if path else None
         documentos.append(PublicDocumento(**row, signed_url=signed))
     return documentos
 
 
-@router.get("/documentos/en-turno", response_model=List[PublicDocumento])
-async def obtener_documentos_aval_en_turno() -> List[PublicDocumento]:
-    client = get_client()
-    aval_id = _get_active_aval_id()
-    if aval_id is None:
-        fallback_response = client.table("avales").select("id").eq("activo", True).order("created_at", desc=False).limit(1).execute()
-        fallback_data = handle_response(fallback_response)
-        if fallback_data:
-            try:
-                aval_id = UUID(str(fallback_data[0]["id"]))
-            except (KeyError, ValueError, TypeError):
-                aval_id = None
-    if aval_id is None:
-        return []
+PUBLIC_AVAL_FIELDS = ("id", "nombre_completo", "email", "telefono")
+DISPONIBILIDAD_FIELDS = "id,aval_id,fecha_inicio,fecha_fin,recurrente,created_at"
+
 
-    documentos = fetch_documentos(
+async def _fetch_aval(client: AsyncSupabaseClient, aval_id: UUID, fields: List[str]) -> Optional[dict]:
+    response = await client.table("avales").select(",".join(fields)).eq("id", str(aval_id)).limit(1).execute()
+    data = handle_response(response) or []
+    return data[0] if data else None
+
+
+async def _fetch_documentos_publicos(client: AsyncSupabaseClient, aval_id: UUID) -> List[PublicDocumento]:
+    documentos = await fetch_documentos(
         client,
         aval_id=aval_id,
         columns="id,contrato_id,tipo,archivo_path,created_at",
     )
-
     documentos_publicos: List[PublicDocumento] = []
     for row in documentos:
         path = row.get("archivo_path")
-        signed = _create_signed_url(client, path) if path else None
+        signed = _create_signed_url(path) if path else None
         documentos_publicos.append(PublicDocumento(**row, signed_url=signed))
+    return documentos_publicos
 
-    aval_fields = ["id", "updated_at", *AVAL_DOCUMENT_LABELS.keys()]
-    aval_response = client.table("avales").select(",".join(aval_fields)).eq("id", str(aval_id)).single().execute()
-    aval_data = handle_response(aval_response)
-
-    if aval_data:
-        aval_uuid = UUID(str(aval_data["id"]))
-        timestamp = aval_data.get("updated_at") or datetime.now(timezone.utc).isoformat()
-        fallback_timestamp = datetime.fromisoformat(timestamp.replace("Z", ""))
-        for field, label in AVAL_DOCUMENT_LABELS.items():
-            path = aval_data.get(field)
-            if path:
-                documentos_publicos.append(
-                    _public_document_from_path(label, path, aval_uuid, fallback_timestamp.isoformat())
-                )
 
-    return documentos_publicos
+def _documentos_de_aval(aval_data: Optional[dict]) -> List[PublicDocumento]:
+    if not aval_data:
+        return []
+    aval_uuid = UUID(str(aval_data["id"]))
+    timestamp = aval_data.get("updated_at") or datetime.now(timezone.utc).isoformat()
+    fallback_timestamp = datetime.fromisoformat(timestamp.replace("Z", ""))
+    documentos: List[PublicDocumento] = []
+    for field, label in AVAL_DOCUMENT_LABELS.items():
+        path = aval_data.get(field)
+        if path:
+            documentos.append(_public_document_from_path(label, path, aval_uuid, fallback_timestamp.isoformat()))
+    return documentos
+
+
+async def _fetch_disponibilidades(client: AsyncSupabaseClient, aval_id: UUID) -> List[Disponibilidad]:
+    response = await (
+        client.table("disponibilidades_avales")
+        .select(DISPONIBILIDAD_FIELDS)
+        .eq("aval_id", str(aval_id))
+        .order("fecha_inicio", desc=False)
+        .execute()
+    )
+    return [Disponibilidad(**row) for row in handle_response(response) or []]
+
+
+@router.get("/en-turno", response_model=PublicEnTurno)
+async def obtener_en_turno(client: AsyncSupabaseClient = Depends(get_async_client)) -> PublicEnTurno:
+    aval_id = await get_aval_en_turno_id(client)
+    if aval_id is None:
+        return PublicEnTurno()
+
+    # Una sola lectura del aval cubre los datos públicos y las rutas de sus documentos.
+    aval_fields = list(dict.fromkeys([*PUBLIC_AVAL_FIELDS, "updated_at", *AVAL_DOCUMENT_LABELS.keys()]))
+    aval_data, documentos, disponibilidades = await asyncio.gather(
+        _fetch_aval(client, aval_id, aval_fields),
+        _fetch_documentos_publicos(client, aval_id),
+        _fetch_disponibilidades(client, aval_id),
+    )
+    if not aval_data:
+        return PublicEnTurno()
+    return PublicEnTurno(
+        aval=PublicAval(**{field: aval_data.get(field) for field in PUBLIC_AVAL_FIELDS}),
+        documentos=[*documentos, *_documentos_de_aval(aval_data)],
+        disponibilidades=disponibilidades,
+    )
+
+
+@router.get("/documentos/en-turno", response_model=List[PublicDocumento])
+async def obtener_documentos_aval_en_turno(
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[PublicDocumento]:
+    aval_id = await get_aval_en_turno_id(client)
+    if aval_id is None:
+        return []
+
+    documentos_publicos, aval_data = await asyncio.gather(
+        _fetch_documentos_publicos(client, aval_id),
+        _fetch_aval(client, aval_id, ["id", "updated_at", *AVAL_DOCUMENT_LABELS.keys()]),
+    )
+    return [*documentos_publicos, *_documentos_de_aval(aval_data)]
 
 
 @router.get("/avales/en-turno", response_model=Optional[PublicAval])
-async def obtener_aval_en_turno() -> Optional[PublicAval]:
-    aval_id = _get_active_aval_id()
+async def obtener_aval_en_turno(client: AsyncSupabaseClient = Depends(get_async_client)) -> Optional[PublicAval]:
+    aval_id = await get_aval_en_turno_id(client)
     if aval_id is None:
-        client = get_client()
-        fallback = client.table("avales").select("id,nombre_completo,email,telefono").eq("activo", True).order("created_at", desc=False).limit(1).execute()
-        data = handle_response(fallback)
-        if not data:
-            return None
-        return PublicAval(**data[0])
-
-    client = get_client()
-    response = client.table("avales").select("id,nombre_completo,email,telefono").eq("id", str(aval_id)).single().execute()
-    data = handle_response(response)
+        return None
+
+    data = await _fetch_aval(client, aval_id, list(PUBLIC_AVAL_FIELDS))
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aval no encontrado")
     return PublicAval(**data)
 
 
 @router.get("/avales/en-turno/disponibilidades", response_model=List[Disponibilidad])
-async def obtener_disponibilidades_aval_en_turno() -> List[Disponibilidad]:
-    client = get_client()
-    aval_id = _get_active_aval_id()
-    if aval_id is None:
-        fallback = client.table("avales").select("id").eq("activo", True).order("created_at", desc=False).limit(1).execute()
-        fallback_data = handle_response(fallback)
-        if fallback_data:
-            try:
-                aval_id = UUID(str(fallback_data[0]["id"]))
-            except (KeyError, ValueError, TypeError):
-                aval_id = None
+async def obtener_disponibilidades_aval_en_turno(
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> List[Disponibilidad]:
+    aval_id = await get_aval_en_turno_id(client)
     if aval_id is None:
         return []
-    response = (
-        client.table("disponibilidades_avales")
-        .select("id,aval_id,fecha_inicio,fecha_fin,recurrente,created_at")
-        .eq("aval_id", str(aval_id))
-        .order("fecha_inicio", desc=False)
-        .execute()
-    )
-    return [Disponibilidad(**row) for row in handle_response(response) or []]
+    return await _fetch_disponibilidades(client, aval_id)
 
 
 @router.get("/lista-negra/avales", response_model=List[PublicVetoAval])
 async def obtener_lista_negra_avales(
     inmobiliaria_id: UUID | None = Query(default=None),
     solo_activos: bool = Query(default=True),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[PublicVetoAval]:
-    client = get_client()
     query = client.table("vetos_avales").select("*")
     if inmobiliaria_id:
         query = query.eq("inmobiliaria_id", str(inmobiliaria_id))
     if solo_activos:
         query = query.eq("estatus", "activo")
-    response = query.order("created_at", desc=True).execute()
+    response = await query.order("created_at", desc=True).execute()
     registros = handle_response(response) or []
     if not registros:
         return []
@@ -236,12 +234,12 @@ async def obtener_lista_negra_avales(
 
     aval_map = {}
     if aval_ids:
-        aval_resp = client.table("avales").select("id,nombre_completo").in_("id", list(aval_ids)).execute()
+        aval_resp = await client.table("avales").select("id,nombre_completo").in_("id", list(aval_ids)).execute()
         aval_map = {item["id"]: item for item in handle_response(aval_resp) or []}
 
     inmobiliaria_map = {}
     if inmobiliaria_ids:
-        inm_resp = client.table("inmobiliarias").select("id,nombre").in_("id", list(inmobiliaria_ids)).execute()
+        inm_resp = await client.table("inmobiliarias").select("id,nombre").in_("id", list(inmobiliaria_ids)).execute()
         inmobiliaria_map = {item["id"]: item for item in handle_response(inm_resp) or []}
 
     results: List[PublicVetoAval] = []
@@ -265,15 +263,15 @@ async def obtener_lista_negra_avales(
 async def obtener_clientes_vetados(
     search: str | None = Query(default=None),
     solo_activos: bool = Query(default=True),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[PublicClienteVetado]:
-    client = get_client()
     query = client.table("clientes_morosidad").select("*")
     if solo_activos:
         query = query.eq("estatus", "vetado")
     if search:
         pattern = f"%{search}%"
         query = query.or_(f"motivo.ilike.{pattern}")
-    response = query.order("created_at", desc=True).execute()
+    response = await query.order("created_at", desc=True).execute()
     registros = handle_response(response) or []
     if not registros:
         return []
@@ -281,7 +279,7 @@ async def obtener_clientes_vetados(
     cliente_ids = {row["cliente_id"] for row in registros if row.get("cliente_id")}
     clientes_map = {}
     if cliente_ids:
-        cli_resp = client.table("clientes").select("id,nombre_completo").in_("id", list(cliente_ids)).execute()
+        cli_resp = await client.table("clientes").select("id,nombre_completo").in_("id", list(cliente_ids)).execute()
         clientes_map = {item["id"]: item for item in handle_response(cli_resp) or []}
 
     results: List[PublicClienteVetado] = []
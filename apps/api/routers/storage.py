@@ -1,34 +1,51 @@
 from __future__ import annotations
 
-from io import BytesIO
-
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 from apps.api.core.auth import require_admin_or_asesor
+from apps.api.core.config import get_settings
+from apps.api.services.content_store import is_content_addressed
 from apps.api.services.storage import (
     DEFAULT_BUCKET,
     build_proxy_url,
-    download_storage_object,
     normalize_storage_path,
+    open_storage_stream,
+    parse_byte_range,
     verify_storage_token,
 )
 
 router = APIRouter(prefix="/storage", tags=["storage"])
 
+MAX_SIGN_BATCH = 100
+MIN_EXPIRES_IN = 60
+MAX_EXPIRES_IN = 60 * 60 * 24
+# Las rutas cas/ se nombran por su sha256: su contenido nunca cambia.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+settings = get_settings()
+
 
 class StorageSignRequest(BaseModel):
     path: str = Field(..., description="Ruta relativa dentro del bucket.")
     bucket: str = Field(default=DEFAULT_BUCKET, description="Nombre del bucket de Supabase.")
     expires_in: int | None = Field(
         default=3600,
-        ge=60,
-        le=60 * 60 * 24,
+        ge=MIN_EXPIRES_IN,
+        le=MAX_EXPIRES_IN,
         description="Duración del enlace en segundos (entre 60 y 86400).",
     )
 
 
+class StorageSignBatchEntry(BaseModel):
+    path: str = Field(..., description="Ruta relativa dentro del bucket.")
+    bucket: str = Field(default=DEFAULT_BUCKET, description="Nombre del bucket de Supabase.")
+    # Sin ge/le: un valor fuera de rango se reporta en su elemento, no como 422 del lote.
+    expires_in: int | None = Field(default=3600, description="Duración del enlace en segundos (entre 60 y 86400).")
+
+
 class StorageSignResponse(BaseModel):
     url: str
     token: str
@@ -37,6 +54,24 @@ class StorageSignResponse(BaseModel):
     expires_at: str
 
 
+class StorageSignBatchRequest(BaseModel):
+    items: list[StorageSignBatchEntry] = Field(..., min_items=1, max_items=MAX_SIGN_BATCH)
+
+
+class StorageSignBatchItem(BaseModel):
+    index: int
+    path: str
+    bucket: str
+    url: str | None = None
+    token: str | None = None
+    expires_at: str | None = None
+    error: str | None = None
+
+
+class StorageSignBatchResponse(BaseModel):
+    items: list[StorageSignBatchItem]
+
+
 @router.post("/sign", response_model=StorageSignResponse)
 async def sign_storage_object(payload: StorageSignRequest, _: dict = Depends(require_admin_or_asesor)) -> StorageSignResponse:
     try:
@@ -53,20 +88,68 @@ async def sign_storage_object(payload: StorageSignRequest, _: dict = Depends(req
     )
 
 
+@router.post("/sign-batch", response_model=StorageSignBatchResponse)
+async def sign_storage_objects(
+    payload: StorageSignBatchRequest, _: dict = Depends(require_admin_or_asesor)
+) -> StorageSignBatchResponse:
+    # Una ruta o duración inválida no invalida el lote: el error se reporta en su elemento.
+    results: list[StorageSignBatchItem] = []
+    for index, item in enumerate(payload.items):
+        try:
+            if item.expires_in is not None and not MIN_EXPIRES_IN <= item.expires_in <= MAX_EXPIRES_IN:
+                raise ValueError(f"expires_in debe estar entre {MIN_EXPIRES_IN} y {MAX_EXPIRES_IN} segundos.")
+            url, bucket, expires_at, token = build_proxy_url(item.bucket, item.path, item.expires_in)
+            normalized_path = normalize_storage_path(item.path)
+        except ValueError as exc:
+            results.append(StorageSignBatchItem(index=index, path=item.path, bucket=item.bucket, error=str(exc)))
+            continue
+        results.append(
+            StorageSignBatchItem(
+                index=index,
+                path=normalized_path,
+                bucket=bucket,
+                url=url,
+                token=token,
+                expires_at=expires_at,
+            )
+        )
+    return StorageSignBatchResponse(items=results)
+
+
 @router.get("/proxy")
 async def proxy_storage_object(
+    request: Request,
     token: str = Query(..., description="Token emitido por el endpoint /storage/sign"),
     download: bool = Query(default=False, description="Forzar la descarga como attachment."),
 ):
     bucket, path = verify_storage_token(token)
-    file_bytes, filename, mime_type = download_storage_object(bucket, path)
+    stream = await open_storage_stream(
+        bucket,
+        path,
+        parse_byte_range(request.headers.get("range")),
+        request.headers.get("if-none-match"),
+    )
     disposition = "attachment" if download else "inline"
     headers = {
-        "Content-Disposition": f'{disposition}; filename="{filename}"',
-        "Cache-Control": "private, max-age=60",
-        "Content-Length": str(len(file_bytes)),
+        "Content-Disposition": f'{disposition}; filename="{stream.filename}"',
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if is_content_addressed(path) else "private, max-age=60",
+        "Accept-Ranges": "bytes",
+        "X-Cache": "HIT" if stream.from_cache else "MISS",
+        **stream.headers,
     }
-    # En PythonAnywhere el streaming generaba write errors/SIGPIPE, así que
-    # devolvemos el payload completo para garantizar que el visor PDF recibe
-    # todos los bytes.
-    return Response(content=file_bytes, media_type=mime_type, headers=headers)
+    if stream.status_code in (status.HTTP_304_NOT_MODIFIED, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE):
+        return Response(status_code=stream.status_code, headers=headers)
+    if not settings.storage_proxy_streaming:
+        # En PythonAnywhere el streaming generaba write errors/SIGPIPE, así que
+        # ahí se devuelve el payload completo (o el rango pedido) en una sola escritura.
+        content = await stream.read()
+        headers["Content-Length"] = str(len(content))
+        return Response(content=content, status_code=stream.status_code, media_type=stream.mime_type, headers=headers)
+    return StreamingResponse(
+        stream.iter_bytes(settings.storage_proxy_chunk_size),
+        status_code=stream.status_code,
+        media_type=stream.mime_type,
+        headers=headers,
+        # Cierra la conexión con Storage aunque el cliente se desconecte antes de leer.
+        background=BackgroundTask(stream.aclose),
+    )
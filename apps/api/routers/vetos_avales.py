@@ -4,11 +4,15 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.encoders import jsonable_encoder
 
 from apps.api.core.auth import require_admin_or_asesor
-from apps.api.db.supabase_client import get_client, handle_response
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.etag import conditional_get
+from apps.api.db.fields import field_selector, projection, sparse_response
+from apps.api.db.pagination import CREATED_AT, PageParams, paginate
+from apps.api.db.supabase_client import handle_response
 from apps.api.models.schemas import AvalVeto, AvalVetoCreate, AvalVetoUpdate
 
 router = APIRouter(prefix="/vetos-avales", tags=["vetos-avales"])
@@ -16,13 +20,17 @@ router = APIRouter(prefix="/vetos-avales", tags=["vetos-avales"])
 
 @router.get("", response_model=List[AvalVeto])
 async def list_vetos_avales(
+    request: Request,
+    response: Response,
     aval_id: UUID | None = Query(default=None),
     inmobiliaria_id: UUID | None = Query(default=None),
     estatus: str | None = Query(default=None),
+    page: PageParams = Depends(),
+    fields: List[str] | None = Depends(field_selector(AvalVeto)),
     user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> List[AvalVeto]:
-    client = get_client()
-    query = client.table("vetos_avales").select("*")
+    query = client.table("vetos_avales").select(projection(fields, CREATED_AT.columns))
     if aval_id:
         query = query.eq("aval_id", str(aval_id))
     if inmobiliaria_id:
@@ -31,13 +39,21 @@ async def list_vetos_avales(
         query = query.eq("estatus", estatus)
     if user.get("role") == "asesor":
         query = query.eq("registrado_por", str(user.get("id")))
-    response = query.order("created_at", desc=True).execute()
-    return [AvalVeto(**row) for row in handle_response(response) or []]
+    not_modified = await conditional_get(request, response, query)
+    if not_modified is not None:
+        return not_modified
+    rows = await paginate(query, page, CREATED_AT, response)
+    if fields:
+        return sparse_response(rows, AvalVeto, fields, response)
+    return [AvalVeto(**row) for row in rows]
 
 
 @router.post("", response_model=AvalVeto, status_code=status.HTTP_201_CREATED)
-async def create_veto_aval(payload: AvalVetoCreate, user: dict = Depends(require_admin_or_asesor)) -> AvalVeto:
-    client = get_client()
+async def create_veto_aval(
+    payload: AvalVetoCreate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> AvalVeto:
     data_payload = jsonable_encoder(payload, exclude_none=True)
     user_id = user.get("id")
     role = user.get("role")
@@ -47,7 +63,7 @@ async def create_veto_aval(payload: AvalVetoCreate, user: dict = Depends(require
         data_payload["registrado_por"] = str(user_id)
     if data_payload.get("estatus") == "limpio" and not data_payload.get("limpio_at"):
         data_payload["limpio_at"] = datetime.now(timezone.utc).isoformat()
-    response = client.table("vetos_avales").insert(data_payload).execute()
+    response = await client.table("vetos_avales").insert(data_payload).execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=500, detail="No se pudo registrar el veto")
@@ -56,9 +72,11 @@ async def create_veto_aval(payload: AvalVetoCreate, user: dict = Depends(require
 
 @router.put("/{veto_id}", response_model=AvalVeto)
 async def update_veto_aval(
-    veto_id: UUID, payload: AvalVetoUpdate, user: dict = Depends(require_admin_or_asesor)
+    veto_id: UUID,
+    payload: AvalVetoUpdate,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
 ) -> AvalVeto:
-    client = get_client()
     data_payload = {k: v for k, v in jsonable_encoder(payload, exclude_none=True).items() if v is not None}
     if data_payload.get("estatus") == "limpio" and not data_payload.get("limpio_at"):
         data_payload["limpio_at"] = datetime.now(timezone.utc).isoformat()
@@ -66,7 +84,7 @@ async def update_veto_aval(
     query = client.table("vetos_avales").update(data_payload).eq("id", str(veto_id))
     if user.get("role") == "asesor":
         query = query.eq("registrado_por", str(user.get("id")))
-    response = query.execute()
+    response = await query.execute()
     data = handle_response(response)
     if not data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Veto no encontrado")
@@ -74,10 +92,13 @@ async def update_veto_aval(
 
 
 @router.delete("/{veto_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_veto_aval(veto_id: UUID, user: dict = Depends(require_admin_or_asesor)) -> Response:
-    client = get_client()
+async def delete_veto_aval(
+    veto_id: UUID,
+    user: dict = Depends(require_admin_or_asesor),
+    client: AsyncSupabaseClient = Depends(get_async_client),
+) -> Response:
     query = client.table("vetos_avales").delete().eq("id", str(veto_id))
     if user.get("role") == "asesor":
         query = query.eq("registrado_por", str(user.get("id")))
-    query.execute()
+    await query.execute()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
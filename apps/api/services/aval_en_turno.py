@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from apps.api.core.cache import TTLCache
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import AsyncSupabaseClient
+from apps.api.db.supabase_client import handle_response
+
+settings = get_settings()
+
+_MISSING = object()
+
+# Una entrada por ventana de tiempo: la clave es el índice de la ventana, así que
+# al cambiar de ventana la resolución se repite aunque nadie invalide la caché.
+_turno_cache: TTLCache[Optional[UUID]] = TTLCache(maxsize=4, ttl=settings.aval_en_turno_cache_seconds)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _window_key() -> int:
+    window = max(settings.aval_en_turno_cache_seconds, 1)
+    return int(time.time() // window)
+
+
+def invalidate_aval_en_turno() -> None:
+    """Descarta la resolución cacheada; se llama al modificar avales o disponibilidades."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        _turno_cache.clear()
+
+
+def aval_en_turno_cache_stats() -> dict:
+    return _turno_cache.stats()
+
+
+def _parse_uuid(value) -> Optional[UUID]:
+    try:
+        return UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _resolve(client: AsyncSupabaseClient) -> Optional[UUID]:
+    now_iso = datetime.now(timezone.utc).isoformat()
+    response = await client.rpc("fn_aval_en_turno", {"target": now_iso}).execute()
+    data = handle_response(response)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    aval_id = _parse_uuid(data) if data is not None else None
+    if aval_id is not None:
+        return aval_id
+
+    # Sin turno asignado se muestra el aval activo más antiguo.
+    fallback = await client.table("avales").select("id").eq("activo", True).order("created_at", desc=False).limit(1).execute()
+    fallback_data = handle_response(fallback)
+    if not fallback_data:
+        return None
+    return _parse_uuid(fallback_data[0].get("id"))
+
+
+async def get_aval_en_turno_id(client: AsyncSupabaseClient) -> Optional[UUID]:
+    key = _window_key()
+    cached = _turno_cache.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached  # type: ignore[return-value]
+    generation = _generation
+    aval_id = await _resolve(client)
+    # Si hubo una invalidación mientras resolvíamos, el resultado puede estar viejo.
+    with _generation_lock:
+        if generation == _generation:
+            _turno_cache.set(key, aval_id)
+    return aval_id
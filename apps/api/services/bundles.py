@@ -0,0 +1,169 @@
+"""
+Descarga de expedientes completos como un ZIP generado al vuelo.
+
+Los objetos se leen de Storage (o de la caché local) en paralelo con una ventana
+acotada: cada descarga deja sus bloques en una cola pequeña y el ZIP se escribe
+en orden, así que la memoria depende de ``concurrency × cola × bloque`` y no del
+tamaño del expediente. Los archivos que no se pueden leer se listan en
+``ERRORES.txt`` al final en lugar de cortar la descarga.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import re
+import unicodedata
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+from apps.api.core.config import get_settings
+from apps.api.services.documentos import AVAL_DOCUMENT_LABELS
+from apps.api.services.storage import DEFAULT_BUCKET, normalize_storage_path, open_storage_stream
+
+settings = get_settings()
+
+# Bloques en espera por archivo descargado antes de que la descarga se pause.
+QUEUE_CHUNKS = 4
+_END = object()
+
+
+@dataclass
+class BundleEntry:
+    name: str
+    path: str
+    bucket: str = DEFAULT_BUCKET
+
+
+@dataclass
+class _Failure:
+    detail: str
+
+
+class _ZipSink:
+    """Destino no seekable para ``zipfile``: acumula lo escrito hasta el siguiente ``drain``."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _safe_name(value: str) -> str:
+    value = unicodedata.normalize("NFC", value).strip()
+    value = re.sub(r'[\\/:*?"<>|]+', "-", value)
+    return value or "archivo"
+
+
+def entry_name(folder: str, label: str, path: str) -> str:
+    """``<carpeta>/<etiqueta>.<extensión del archivo>``."""
+    basename = normalize_storage_path(path).rsplit("/", 1)[-1]
+    extension = f".{basename.rsplit('.', 1)[-1].lower()}" if "." in basename else ""
+    return f"{folder}/{_safe_name(label)}{extension}"
+
+
+def aval_entries(aval: Dict[str, Any], folder: str = "aval") -> List[BundleEntry]:
+    """Documentos guardados en las columnas de ``avales`` (incluido el buró)."""
+    labels = {**AVAL_DOCUMENT_LABELS, "buro_credito_url": "Buró de crédito"}
+    return [
+        BundleEntry(name=entry_name(folder, label, aval[column]), path=aval[column])
+        for column, label in labels.items()
+        if aval.get(column)
+    ]
+
+
+def documento_entries(documentos: Iterable[Dict[str, Any]], folder: str = "documentos") -> List[BundleEntry]:
+    return [
+        BundleEntry(name=entry_name(folder, row.get("tipo") or "documento", row["archivo_path"]), path=row["archivo_path"])
+        for row in documentos
+        if row.get("archivo_path")
+    ]
+
+
+def _unique_names(entries: List[BundleEntry]) -> List[BundleEntry]:
+    seen: dict[str, int] = {}
+    result = []
+    for entry in entries:
+        name = entry.name
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            stem, dot, extension = name.rpartition(".")
+            name = f"{stem} ({count + 1}).{extension}" if dot else f"{name} ({count + 1})"
+        result.append(BundleEntry(name=name, path=entry.path, bucket=entry.bucket))
+    return result
+
+
+async def _fetch(entry: BundleEntry, queue: "asyncio.Queue[object]") -> None:
+    try:
+        stream = await open_storage_stream(entry.bucket, entry.path)
+        # aclosing: si stream_zip cancela la tarea, la respuesta de Storage se cierra
+        # de inmediato y no cuando el recolector finalice el generador.
+        async with contextlib.aclosing(stream.iter_bytes(settings.storage_proxy_chunk_size)) as chunks:
+            async for chunk in chunks:
+                await queue.put(chunk)
+    except HTTPException as exc:
+        await queue.put(_Failure(str(exc.detail)))
+        return
+    except Exception as exc:  # noqa: BLE001
+        await queue.put(_Failure(str(exc) or exc.__class__.__name__))
+        return
+    await queue.put(_END)
+
+
+async def stream_zip(entries: List[BundleEntry], concurrency: Optional[int] = None) -> AsyncIterator[bytes]:
+    entries = _unique_names(entries)
+    window = max(1, concurrency or settings.bundle_concurrency)
+    queues: List["asyncio.Queue[object]"] = [asyncio.Queue(maxsize=QUEUE_CHUNKS) for _ in entries]
+    tasks: List[asyncio.Task] = []
+
+    def launch_until(limit: int) -> None:
+        # Las descargas arrancan en orden: la entrada que se está escribiendo siempre
+        # tiene su descarga en curso, así que ninguna cola llena puede bloquearla.
+        while len(tasks) < min(limit, len(entries)):
+            index = len(tasks)
+            tasks.append(asyncio.create_task(_fetch(entries[index], queues[index])))
+
+    sink = _ZipSink()
+    errors: List[str] = []
+    # PDFs e imágenes ya vienen comprimidos: deflate nivel 1 solo evita el costo de CPU.
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+    try:
+        for index, entry in enumerate(entries):
+            launch_until(index + window)
+            item = await queues[index].get()
+            if isinstance(item, _Failure):
+                errors.append(f"{entry.name}: {item.detail}")
+                continue
+            with archive.open(entry.name, "w") as target:
+                while item is not _END:
+                    if isinstance(item, _Failure):
+                        errors.append(f"{entry.name}: incompleto ({item.detail})")
+                        break
+                    target.write(item)  # type: ignore[arg-type]
+                    data = sink.drain()
+                    if data:
+                        yield data
+                    item = await queues[index].get()
+            yield sink.drain()
+        if errors:
+            archive.writestr("ERRORES.txt", "\n".join(errors) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
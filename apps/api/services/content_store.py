@@ -0,0 +1,174 @@
+"""
+Almacenamiento direccionado por contenido para los documentos subidos por la API.
+
+Cada archivo único se guarda una sola vez en ``cas/<aa>/<sha256>/<generación>/<nombre>``
+y se registra en ``storage_objects``; cada registro que lo usa (p. ej. el buró de un
+aval) agrega una fila en ``storage_object_refs``. Subir un archivo idéntico
+reutiliza el objeto existente, y el objeto se borra cuando se queda sin
+referencias. Como el contenido de una ruta ``cas/`` nunca cambia, el proxy la
+sirve como inmutable.
+
+Liberar un objeto va en tres pasos (migración ``20261017190000``): se marca la fila
+(``released_at``), se borra el archivo y se borra la fila si sigue marcada con la
+misma ruta. Las referencias nunca se agregan a un objeto marcado y cada subida usa
+una generación propia en la ruta, así que el borrado de un objeto liberado no
+alcanza a un archivo que otra petición acaba de subir.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID, uuid4
+
+from apps.api.db.async_client import AsyncSupabaseClient
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
+from apps.api.services.storage import invalidate_storage_object, normalize_storage_path
+
+logger = logging.getLogger(__name__)
+
+CAS_PREFIX = "cas"
+# Vueltas de referenciar/subir antes de rendirse si otras peticiones liberan el objeto a la vez.
+_STORE_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class ObjectOwner:
+    table: str
+    id: UUID
+    field: str
+
+
+def content_address(sha256: str, filename: str) -> str:
+    return f"{CAS_PREFIX}/{sha256[:2]}/{sha256}/{uuid4().hex[:12]}/{filename}"
+
+
+def content_hash(path: str | None) -> Optional[str]:
+    """Devuelve el sha256 de una ruta ``cas/`` o None si es una ruta tradicional."""
+    try:
+        segments = normalize_storage_path(path).split("/")
+    except ValueError:
+        return None
+    if len(segments) < 3 or segments[0] != CAS_PREFIX or len(segments[2]) != 64:
+        return None
+    return segments[2]
+
+
+def is_content_addressed(path: str | None) -> bool:
+    return content_hash(path) is not None
+
+
+async def content_store_enabled(client: AsyncSupabaseClient) -> bool:
+    # Sin la migración de storage_objects se sigue usando la ruta con timestamp.
+    return await has_column(client, "storage_objects", "sha256")
+
+
+async def store_content_addressed(
+    client: AsyncSupabaseClient,
+    bucket: str,
+    source: str,
+    sha256: str,
+    size_bytes: int,
+    filename: str,
+    content_type: str,
+    owner: ObjectOwner,
+) -> tuple[str, bool]:
+    """Guarda ``source`` (si hace falta) y registra la referencia de ``owner``.
+
+    Devuelve la ruta del objeto y si se reutilizó uno existente.
+    """
+    uploaded: Optional[str] = None
+    for _ in range(_STORE_ATTEMPTS):
+        path = await _add_reference(client, bucket, sha256, owner)
+        if path is not None:
+            if uploaded is not None and uploaded != path:
+                # Otra petición registró el mismo contenido primero: la copia propia sobra.
+                await _remove_object(client, bucket, uploaded)
+            return path, path != uploaded
+        if uploaded is not None:
+            # La copia anterior se liberó antes de referenciarla; la siguiente usa otra ruta.
+            await _remove_object(client, bucket, uploaded)
+        uploaded = content_address(sha256, filename)
+        with open(source, "rb") as handle:
+            await client.storage.from_(bucket).upload(
+                uploaded,
+                handle,
+                {"content-type": content_type, "cache-control": "31536000"},
+            )
+        await client.rpc(
+            "fn_register_storage_object",
+            {
+                "p_bucket": bucket,
+                "p_sha256": sha256,
+                "p_path": uploaded,
+                "p_size_bytes": size_bytes,
+                "p_content_type": content_type,
+            },
+        ).execute()
+    raise RuntimeError(f"No se pudo registrar el objeto {sha256} en {bucket}.")
+
+
+async def _add_reference(client: AsyncSupabaseClient, bucket: str, sha256: str, owner: ObjectOwner) -> Optional[str]:
+    # Devuelve la ruta del objeto vivo, o None si no existe o se está liberando.
+    response = await client.rpc(
+        "fn_ref_storage_object",
+        {
+            "p_bucket": bucket,
+            "p_sha256": sha256,
+            "p_owner_table": owner.table,
+            "p_owner_id": str(owner.id),
+            "p_owner_field": owner.field,
+        },
+    ).execute()
+    return handle_response(response) or None
+
+
+async def _remove_object(client: AsyncSupabaseClient, bucket: str, path: str) -> bool:
+    try:
+        await client.storage.from_(bucket).remove([path])
+    except Exception:  # noqa: BLE001
+        logger.warning("No se pudo eliminar el objeto %s/%s sin referencias", bucket, path, exc_info=True)
+        return False
+    finally:
+        invalidate_storage_object(bucket, path)
+    return True
+
+
+async def _release(client: AsyncSupabaseClient, bucket: str, sha256: str) -> bool:
+    # 1) marca el objeto si no tiene referencias; 2) borra el archivo; 3) borra la fila
+    # si sigue marcada con esa ruta. Si el paso 2 falla, la fila queda marcada y una
+    # subida posterior del mismo contenido la revive con una ruta nueva.
+    released = handle_response(
+        await client.rpc("fn_release_storage_object", {"p_bucket": bucket, "p_sha256": sha256}).execute()
+    )
+    for row in released or []:
+        path = row.get("path")
+        if await _remove_object(client, bucket, path):
+            await client.rpc(
+                "fn_purge_storage_object", {"p_bucket": bucket, "p_sha256": sha256, "p_path": path}
+            ).execute()
+    return bool(released)
+
+
+async def release_content_addressed(client: AsyncSupabaseClient, bucket: str, path: str | None) -> bool:
+    """Borra el objeto ``cas/`` si ya nadie lo referencia. Devuelve True si se borró."""
+    sha256 = content_hash(path)
+    if sha256 is None:
+        return False
+    return await _release(client, bucket, sha256)
+
+
+async def drop_owner_references(client: AsyncSupabaseClient, bucket: str, table: str, owner_id: UUID) -> None:
+    """Quita las referencias de un registro eliminado y libera los objetos que quedan huérfanos."""
+    deleted = handle_response(
+        await client.table("storage_object_refs")
+        .delete()
+        .eq("bucket", bucket)
+        .eq("owner_table", table)
+        .eq("owner_id", str(owner_id))
+        .execute()
+    )
+    for sha256 in {row["sha256"] for row in deleted or []}:
+        await _release(client, bucket, sha256)
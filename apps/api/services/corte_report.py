@@ -0,0 +1,346 @@
+"""
+PDF de un corte, escrito página por página en un archivo.
+
+Las filas llegan por lotes (``add_rows``) ya ordenadas por beneficiario; cada
+página se cierra y se escribe al archivo en cuanto se llena, así que en memoria
+solo viven la página actual y la tabla de offsets del PDF. reportlab guarda el
+documento completo hasta ``save()``; aquí solo se usan sus métricas de fuente
+para medir y recortar texto.
+"""
+
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict, Iterable, List, Literal, Optional
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import getFont
+
+SectionKind = Literal["servicio", "comision"]
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 40
+ROW_HEIGHT = 11
+FONT_SIZE = 8
+BOTTOM = 50
+
+_FONTS = {"Helvetica": b"F1", "Helvetica-Bold": b"F2"}
+# Anchos (milésimas de em) por byte en WinAnsiEncoding, la codificación del PDF.
+_WIDTHS = {name: getFont(name).widths for name in _FONTS}
+_ELLIPSIS = "…".encode("cp1252")
+ZERO = Decimal("0")
+
+
+@dataclass(frozen=True)
+class Column:
+    title: str
+    x: float
+    width: float
+    align: Literal["left", "right"] = "left"
+
+    @property
+    def right(self) -> float:
+        return self.x + self.width
+
+
+SECTIONS: Dict[SectionKind, dict] = {
+    "servicio": {
+        "title": "Pagos del servicio",
+        "empty": "No se registraron pagos de servicio en este corte.",
+        "group_key": "firma_id",
+        "group_name": "cliente_nombre",
+        "columns": (
+            Column("Cliente", MARGIN, 200),
+            Column("Fecha", 245, 70),
+            Column("Efectivo", 320, 80, "right"),
+            Column("Transferencia", 405, 80, "right"),
+            Column("Total", 490, PAGE_WIDTH - MARGIN - 490, "right"),
+        ),
+    },
+    "comision": {
+        "title": "Pagos de comisiones",
+        "empty": "No se registraron comisiones en este corte.",
+        "group_key": "beneficiario_id",
+        "group_name": "beneficiario_nombre",
+        "columns": (
+            Column("Beneficiario", MARGIN, 150),
+            Column("Tipo", 195, 45),
+            Column("Cliente", 245, 150),
+            Column("Fecha", 400, 65),
+            Column("Monto", 470, PAGE_WIDTH - MARGIN - 470, "right"),
+        ),
+    },
+}
+
+
+def _money(value: Any) -> str:
+    return f"${Decimal(str(value or 0)):,.2f}"
+
+
+def _pagos(count: int) -> str:
+    return f"{count} pago" if count == 1 else f"{count} pagos"
+
+
+def _amount(value: Any) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _encode(text: str) -> bytes:
+    return " ".join(text.split()).encode("cp1252", errors="replace")
+
+
+def _width(data: bytes, font: str, size: float = FONT_SIZE) -> float:
+    return sum(map(_WIDTHS[font].__getitem__, data)) * size / 1000
+
+
+def _fit(data: bytes, font: str, width: float) -> bytes:
+    if _width(data, font) <= width:
+        return data
+    while data and _width(data + _ELLIPSIS, font) > width:
+        data = data[:-1]
+    return data + _ELLIPSIS
+
+
+def _literal(data: bytes) -> bytes:
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class StreamingPdf:
+    """Escritor PDF mínimo (texto y líneas en Helvetica) que vuelca cada página al cerrarla."""
+
+    # 1: catálogo, 2: árbol de páginas, 3-4: fuentes; las páginas se numeran después.
+    _CATALOG, _PAGES, _FIRST_FONT = 1, 2, 3
+
+    def __init__(self, handle: BinaryIO) -> None:
+        self._handle = handle
+        self._offsets: Dict[int, int] = {}
+        self._next_object = self._FIRST_FONT + len(_FONTS)
+        self._pages: List[int] = []
+        self._position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def _write(self, data: bytes) -> None:
+        self._handle.write(data)
+        self._position += len(data)
+
+    def _object(self, number: int, body: bytes) -> None:
+        self._offsets[number] = self._position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _reserve(self) -> int:
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def add_page(self, content: bytes) -> None:
+        stream = zlib.compress(content)
+        content_number = self._reserve()
+        self._object(
+            content_number,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        )
+        page_number = self._reserve()
+        fonts = b" ".join(b"/%s %d 0 R" % (alias, self._FIRST_FONT + index) for index, alias in enumerate(_FONTS.values()))
+        self._object(
+            page_number,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents %d 0 R >>"
+            % (self._PAGES, PAGE_WIDTH, PAGE_HEIGHT, fonts, content_number),
+        )
+        self._pages.append(page_number)
+
+    def close(self) -> None:
+        for index, name in enumerate(_FONTS):
+            self._object(
+                self._FIRST_FONT + index,
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % name.encode(),
+            )
+        kids = b" ".join(b"%d 0 R" % number for number in self._pages)
+        self._object(self._PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        self._object(self._CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGES)
+        xref_at = self._position
+        size = self._next_object
+        entries = [b"0000000000 65535 f \n"]
+        entries.extend(b"%010d 00000 n \n" % self._offsets[number] for number in range(1, size))
+        self._write(b"xref\n0 %d\n" % size + b"".join(entries))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, self._CATALOG, xref_at))
+
+
+@dataclass
+class _Group:
+    key: Any = None
+    name: str = "—"
+    pagos: int = 0
+    sums: List[Decimal] = field(default_factory=list)
+
+
+class CorteReport:
+    """Tabla paginada del corte con subtotales por beneficiario y totales por sección."""
+
+    def __init__(self, handle: BinaryIO, fecha_inicio: date, fecha_fin: date) -> None:
+        self._pdf = StreamingPdf(handle)
+        self._range = f"Rango: {fecha_inicio.isoformat()} al {fecha_fin.isoformat()}"
+        self._ops: List[bytes] = []
+        self._y = 0.0
+        self._kind: Optional[SectionKind] = None
+        self._section_rows = 0
+        self._section_sums: List[Decimal] = []
+        self._group = _Group()
+        self.totals: Dict[SectionKind, Decimal] = {"servicio": ZERO, "comision": ZERO}
+
+    # -- primitivas de página -------------------------------------------------
+
+    def _text(self, x: float, y: float, text: str | bytes, font: str = "Helvetica", size: float = FONT_SIZE) -> None:
+        data = _encode(text) if isinstance(text, str) else text
+        self._ops.append(b"BT /%s %g Tf %.2f %.2f Td %s Tj ET" % (_FONTS[font], size, x, y, _literal(data)))
+
+    def _line(self, y: float) -> None:
+        self._ops.append(b"0.5 w %.2f %.2f m %.2f %.2f l S" % (MARGIN, y, PAGE_WIDTH - MARGIN, y))
+
+    def _cells(self, values: Iterable[str], font: str = "Helvetica") -> None:
+        assert self._kind is not None
+        for column, value in zip(SECTIONS[self._kind]["columns"], values):
+            data = _fit(_encode(value), font, column.width - 4)
+            x = column.right - _width(data, font) if column.align == "right" else column.x
+            self._text(x, self._y, data, font)
+        self._y -= ROW_HEIGHT
+
+    def _flush_page(self) -> None:
+        if self._ops:
+            self._text(PAGE_WIDTH - MARGIN - 50, 30, f"Página {self._pdf.page_count + 1}", size=7)
+            self._pdf.add_page(b"\n".join(self._ops))
+            self._ops = []
+
+    def _new_page(self, continued: bool = False) -> None:
+        self._flush_page()
+        self._y = PAGE_HEIGHT - MARGIN
+        self._text(MARGIN, self._y, "Corte de pagos", "Helvetica-Bold", 12)
+        self._y -= 14
+        self._text(MARGIN, self._y, self._range, size=9)
+        self._y -= 20
+        if self._kind is not None:
+            section = SECTIONS[self._kind]
+            title = f"{section['title']} (cont.)" if continued else section["title"]
+            self._text(MARGIN, self._y, title, "Helvetica-Bold", 10)
+            self._y -= 14
+            self._cells([column.title for column in section["columns"]], "Helvetica-Bold")
+            self._line(self._y + ROW_HEIGHT - 3)
+
+    def _ensure_room(self, rows: int = 1) -> None:
+        if not self._ops:
+            self._new_page()
+        elif self._y - ROW_HEIGHT * (rows - 1) < BOTTOM:
+            self._new_page(continued=self._kind is not None)
+
+    # -- secciones --------------------------------------------------------------
+
+    def start_section(self, kind: SectionKind) -> None:
+        self._kind = None
+        # Título, encabezados y al menos tres filas juntos; si no caben, nueva página.
+        if not self._ops or self._y - ROW_HEIGHT * 6 < BOTTOM:
+            self._new_page()
+        self._kind = kind
+        self._section_rows = 0
+        self._section_sums = [ZERO, ZERO, ZERO]
+        self._group = _Group()
+        section = SECTIONS[kind]
+        self._y -= 6
+        self._text(MARGIN, self._y, section["title"], "Helvetica-Bold", 10)
+        self._y -= 14
+        self._cells([column.title for column in section["columns"]], "Helvetica-Bold")
+        self._line(self._y + ROW_HEIGHT - 3)
+
+    def _sums(self, row: Dict[str, Any]) -> List[Decimal]:
+        if self._kind == "servicio":
+            efectivo, transferencia = _amount(row.get("monto_efectivo")), _amount(row.get("monto_transferencia"))
+            return [efectivo, transferencia, efectivo + transferencia]
+        return [ZERO, ZERO, _amount(row.get("monto"))]
+
+    def _amount_cells(self, sums: List[Decimal]) -> List[str]:
+        if self._kind == "servicio":
+            return [_money(value) for value in sums]
+        return [_money(sums[2])]
+
+    def _close_group(self) -> None:
+        group = self._group
+        if not group.pagos:
+            return
+        self._ensure_room()
+        label = f"Subtotal {group.name} ({_pagos(group.pagos)})"
+        blanks = [""] * (len(SECTIONS[self._kind]["columns"]) - len(self._amount_cells(group.sums)) - 1)  # type: ignore[index]
+        self._cells([label, *blanks, *self._amount_cells(group.sums)], "Helvetica-Bold")
+        self._y -= 3
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        assert self._kind is not None, "start_section() antes de add_rows()"
+        section = SECTIONS[self._kind]
+        for row in rows:
+            key = row.get(section["group_key"])
+            if self._group.pagos and key != self._group.key:
+                self._close_group()
+                self._group = _Group()
+            if not self._group.pagos:
+                self._group = _Group(key=key, name=row.get(section["group_name"]) or "—", sums=[ZERO, ZERO, ZERO])
+            sums = self._sums(row)
+            self._group.pagos += 1
+            self._group.sums = [a + b for a, b in zip(self._group.sums, sums)]
+            self._section_sums = [a + b for a, b in zip(self._section_sums, sums)]
+            self._section_rows += 1
+            self._ensure_room()
+            fecha = str(row.get("fecha_pago") or "")[:10]
+            cliente = row.get("cliente_nombre") or "—"
+            if self._kind == "servicio":
+                self._cells([cliente, fecha, *self._amount_cells(sums)])
+            else:
+                tipo = (row.get("beneficiario_tipo") or "").capitalize()
+                self._cells([self._group.name, tipo, cliente, fecha, *self._amount_cells(sums)])
+
+    def end_section(self) -> None:
+        assert self._kind is not None
+        section = SECTIONS[self._kind]
+        if not self._section_rows:
+            self._ensure_room()
+            self._text(MARGIN, self._y, section["empty"], size=9)
+            self._y -= ROW_HEIGHT
+        else:
+            self._close_group()
+            self._ensure_room()
+            self._line(self._y + ROW_HEIGHT - 3)
+            label = f"Total ({_pagos(self._section_rows)})"
+            blanks = [""] * (len(section["columns"]) - len(self._amount_cells(self._section_sums)) - 1)
+            self._cells([label, *blanks, *self._amount_cells(self._section_sums)], "Helvetica-Bold")
+        self.totals[self._kind] = self._section_sums[2]
+        self._kind = None
+        self._y -= 8
+
+    def close(self) -> int:
+        """Escribe los totales finales y cierra el PDF. Devuelve el número de páginas."""
+        self._ensure_room(3)
+        self._text(MARGIN, self._y, f"Total servicio: {_money(self.totals['servicio'])}", "Helvetica-Bold", 10)
+        self._y -= 14
+        self._text(MARGIN, self._y, f"Total comisiones: {_money(self.totals['comision'])}", "Helvetica-Bold", 10)
+        self._flush_page()
+        self._pdf.close()
+        return self._pdf.page_count
+
+
+def render_corte_pdf(
+    handle: BinaryIO,
+    fecha_inicio: date,
+    fecha_fin: date,
+    servicios: Optional[Iterable[Dict[str, Any]]],
+    comisiones: Optional[Iterable[Dict[str, Any]]],
+) -> int:
+    """Versión síncrona para iterables ya ordenados (benchmark y pruebas)."""
+    report = CorteReport(handle, fecha_inicio, fecha_fin)
+    for kind, rows in (("servicio", servicios), ("comision", comisiones)):
+        report.start_section(kind)  # type: ignore[arg-type]
+        report.add_rows(rows or [])
+        report.end_section()
+    return report.close()
@@ -0,0 +1,232 @@
+"""
+Generación de cortes de pagos. ``fn_crear_corte`` registra el corte, asigna los
+pagos abiertos del rango y calcula los totales en una sola transacción; después
+los pagos del corte se leen por lotes, el PDF se escribe en disco página por
+página (``services/corte_report``) y se sube a Storage desde el archivo.
+
+Corre como trabajo en segundo plano (``services/jobs``); es idempotente por
+``corte_id`` para que un trabajo interrumpido pueda repetirse sin duplicar el corte.
+Si el PDF falla después de que ``fn_crear_corte`` confirmó el corte, el corte queda
+sin ``pdf_path``; ``regenerate_corte_pdf`` lo vuelve a generar a partir de los pagos
+que ya tiene asignados.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from postgrest.exceptions import APIError
+
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import AsyncSupabaseClient
+from apps.api.db.pagination import Keyset, iter_keyset
+from apps.api.db.supabase_client import handle_response
+from apps.api.models.schemas import (
+    CortePreview,
+    CortePreviewGrupo,
+    PagoCorte,
+    PagoCorteCreate,
+    PagosLedgerConciliacion,
+    PagosLedgerDiferencia,
+)
+from apps.api.services.corte_report import CorteReport
+from apps.api.services.jobs import JobQueue
+from apps.api.services.storage import build_proxy_url, invalidate_storage_object
+from apps.api.services.uploads import upload_workspace
+
+settings = get_settings()
+
+STORAGE_BUCKET = "documentos-aval"
+
+CORTE_JOB_KIND = "pagos_corte"
+CORTE_PDF_JOB_KIND = "pagos_corte_pdf"
+
+# Errores de validación que lanza fn_crear_corte (rango inválido, sin pagos).
+_VALIDATION_CODES = {"22023", "P0002"}
+
+
+def corte_job_payload(corte_id: UUID, payload: PagoCorteCreate) -> Dict[str, Any]:
+    return {"corte_id": str(corte_id), **jsonable_encoder(payload)}
+
+
+def corte_from_result(result: Dict[str, Any]) -> PagoCorte:
+    """Arma la respuesta con una URL del proxy recién firmada."""
+    pdf_url = None
+    if result.get("pdf_path"):
+        try:
+            pdf_url, *_ = build_proxy_url(STORAGE_BUCKET, result["pdf_path"])
+        except ValueError:
+            pdf_url = None
+    return PagoCorte(**{**result, "pdf_url": pdf_url})
+
+
+async def generate_corte(client: AsyncSupabaseClient, job_payload: Dict[str, Any]) -> Dict[str, Any]:
+    corte_id = job_payload["corte_id"]
+    payload = PagoCorteCreate(**{key: value for key, value in job_payload.items() if key != "corte_id"})
+
+    try:
+        response = await client.rpc(
+            "fn_crear_corte",
+            {
+                "p_corte_id": corte_id,
+                "p_fecha_inicio": payload.fecha_inicio.isoformat(),
+                "p_fecha_fin": payload.fecha_fin.isoformat(),
+                "p_incluir_servicios": payload.incluir_servicios,
+                "p_incluir_comisiones": payload.incluir_comisiones,
+            },
+        ).execute()
+    except APIError as exc:
+        if exc.code in _VALIDATION_CODES:
+            raise HTTPException(status_code=400, detail=exc.message) from exc
+        raise
+    data = handle_response(response)
+
+    pdf_path = await _generate_and_upload_pdf(
+        corte_id=corte_id,
+        fecha_inicio=payload.fecha_inicio,
+        fecha_fin=payload.fecha_fin,
+        client=client,
+        expected={"servicio": data.get("pagos_servicio", 0), "comision": data.get("pagos_comisiones", 0)},
+    )
+    await client.table("pagos_cortes").update({"pdf_path": pdf_path}).eq("id", corte_id).execute()
+
+    corte = PagoCorte(
+        **{**data["corte"], "pdf_path": pdf_path},
+        incluir_servicios=payload.incluir_servicios,
+        incluir_comisiones=payload.incluir_comisiones,
+    )
+    return jsonable_encoder(corte, exclude={"pdf_url"})
+
+
+async def regenerate_corte_pdf(client: AsyncSupabaseClient, job_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Vuelve a generar y subir el PDF de un corte ya registrado, sin reasignar pagos."""
+    corte_id = job_payload["corte_id"]
+    rows = handle_response(await client.table("pagos_cortes").select("*").eq("id", corte_id).limit(1).execute())
+    if not rows:
+        raise HTTPException(status_code=404, detail="Corte no encontrado")
+    row = rows[0]
+
+    expected: Dict[str, int] = {}
+    for kind, view, _, _ in _REPORT_SOURCES:
+        counted = await client.table(view).select("id", count="exact").eq("corte_id", corte_id).limit(1).execute()
+        expected[kind] = counted.count or 0
+
+    pdf_path = await _generate_and_upload_pdf(
+        corte_id=corte_id,
+        fecha_inicio=date.fromisoformat(str(row["fecha_inicio"])),
+        fecha_fin=date.fromisoformat(str(row["fecha_fin"])),
+        client=client,
+        expected=expected,
+    )
+    await client.table("pagos_cortes").update({"pdf_path": pdf_path}).eq("id", corte_id).execute()
+    return jsonable_encoder(PagoCorte(**{**row, "pdf_path": pdf_path}), exclude={"pdf_url"})
+
+
+async def preview_corte(client: AsyncSupabaseClient, payload: PagoCorteCreate) -> CortePreview:
+    """Totales de los pagos abiertos del rango, leídos de pagos_ledger (sin leer filas de pagos)."""
+    response = await client.rpc(
+        "fn_preview_corte",
+        {
+            "p_fecha_inicio": payload.fecha_inicio.isoformat(),
+            "p_fecha_fin": payload.fecha_fin.isoformat(),
+            "p_incluir_servicios": payload.incluir_servicios,
+            "p_incluir_comisiones": payload.incluir_comisiones,
+        },
+    ).execute()
+    grupos = [CortePreviewGrupo(**row) for row in handle_response(response) or []]
+    servicios = [grupo for grupo in grupos if grupo.tipo == "servicio"]
+    comisiones = [grupo for grupo in grupos if grupo.tipo == "comision"]
+    return CortePreview(
+        **payload.dict(),
+        total_servicio=sum((grupo.monto for grupo in servicios), Decimal("0")),
+        total_comisiones=sum((grupo.monto for grupo in comisiones), Decimal("0")),
+        pagos_servicio=sum(grupo.pagos for grupo in servicios),
+        pagos_comisiones=sum(grupo.pagos for grupo in comisiones),
+        grupos=grupos,
+    )
+
+
+async def verify_pagos_ledger(client: AsyncSupabaseClient) -> PagosLedgerConciliacion:
+    """Compara pagos_ledger contra los pagos abiertos y devuelve los renglones que no cuadran."""
+    response = await client.rpc("fn_pagos_ledger_diferencias", {}).execute()
+    diferencias = [PagosLedgerDiferencia(**row) for row in handle_response(response) or []]
+    return PagosLedgerConciliacion(cuadra=not diferencias, diferencias=diferencias)
+
+
+async def rebuild_pagos_ledger(client: AsyncSupabaseClient) -> PagosLedgerConciliacion:
+    """Reconstruye pagos_ledger desde los pagos y verifica el resultado."""
+    response = await client.rpc("fn_pagos_ledger_reconstruir", {}).execute()
+    renglones = handle_response(response)
+    conciliacion = await verify_pagos_ledger(client)
+    conciliacion.renglones_reconstruidos = int(renglones or 0)
+    return conciliacion
+
+
+# Vista, columnas y orden de recorrido de cada sección del PDF.
+_REPORT_SOURCES = (
+    (
+        "servicio",
+        "vw_corte_pagos_servicio",
+        "id,firma_id,fecha_pago,monto_efectivo,monto_transferencia,cliente_nombre",
+        Keyset("firma_id", desc=False),
+    ),
+    (
+        "comision",
+        "vw_corte_pagos_comisiones",
+        "id,beneficiario_tipo,beneficiario_id,beneficiario_nombre,fecha_pago,monto,cliente_nombre",
+        Keyset("beneficiario_id", desc=False),
+    ),
+)
+
+
+async def _generate_and_upload_pdf(
+    corte_id: str,
+    fecha_inicio: date,
+    fecha_fin: date,
+    client: AsyncSupabaseClient,
+    expected: Dict[str, int],
+) -> str:
+    """Lee los pagos del corte por lotes, escribe el PDF en disco y lo sube desde el archivo.
+
+    ``expected`` son los pagos por sección que asignó fn_crear_corte; si el PDF no los
+    incluye todos, el trabajo falla antes de subir un reporte con totales incompletos.
+    """
+    path = f"reportes/cortes/{corte_id}.pdf"
+    async with upload_workspace() as workspace:
+        target = workspace / "corte.pdf"
+        with open(target, "wb") as output:
+            report = CorteReport(output, fecha_inicio, fecha_fin)
+            for kind, view, columns, keyset in _REPORT_SOURCES:
+                report.start_section(kind)
+                pages = iter_keyset(
+                    lambda view=view, columns=columns: client.table(view).select(columns).eq("corte_id", corte_id),
+                    keyset,
+                    settings.corte_report_batch_size,
+                )
+                rendered = 0
+                async for rows in pages:
+                    # Maquetar un lote es CPU-bound: se hace en el threadpool.
+                    await run_in_threadpool(report.add_rows, rows)
+                    rendered += len(rows)
+                report.end_section()
+                if rendered != int(expected.get(kind) or 0):
+                    raise RuntimeError(
+                        f"El PDF del corte incluye {rendered} de {expected.get(kind) or 0} pagos de tipo {kind}."
+                    )
+            await run_in_threadpool(report.close)
+        with open(target, "rb") as handle:
+            await client.storage.from_(STORAGE_BUCKET).upload(
+                path, handle, {"content-type": "application/pdf", "x-upsert": "true"}
+            )
+    invalidate_storage_object(STORAGE_BUCKET, path)
+    return path
+
+
+corte_jobs = JobQueue(CORTE_JOB_KIND, generate_corte)
+corte_pdf_jobs = JobQueue(CORTE_PDF_JOB_KIND, regenerate_corte_pdf)
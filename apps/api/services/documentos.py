@@ -3,13 +3,28 @@ from __future__ import annotations
 from typing import Any, Dict, List
 from uuid import UUID
 
-from supabase import Client
-
+from apps.api.db.async_client import AsyncSupabaseClient
 from apps.api.db.supabase_client import handle_response
 
-
-def fetch_documentos(
-    client: Client,
+# Columnas de avales que guardan la ruta de un documento, con su nombre visible.
+AVAL_DOCUMENT_LABELS = {
+    "identificacion_oficial_url": "Identificación oficial",
+    "comprobante_domicilio_cfe_url": "Comprobante domicilio CFE",
+    "comprobante_domicilio_siapa_url": "Comprobante domicilio SIAPA",
+    "pago_predial_url": "Pago predial",
+    "escrituras_url": "Escrituras",
+    "certificado_libre_gravamen_url": "Certificado libre de gravamen",
+    "rfc_url": "RFC",
+    "curp_url": "CURP",
+    "acta_nacimiento_url": "Acta de nacimiento",
+    "comprobante_ingresos_1_url": "Comprobante de ingresos 1",
+    "comprobante_ingresos_2_url": "Comprobante de ingresos 2",
+    "comprobante_ingresos_3_url": "Comprobante de ingresos 3",
+}
+
+
+async def fetch_documentos(
+    client: AsyncSupabaseClient,
     *,
     contrato_id: UUID | None = None,
     aval_id: UUID | None = None,
@@ -34,7 +49,7 @@ def fetch_documentos(
     if cliente_id is not None:
         query = query.eq("cliente_id", str(cliente_id))
 
-    response = query.order("created_at", desc=True).execute()
+    response = await query.order("created_at", desc=True).execute()
     data = handle_response(response)
 
     if not isinstance(data, list):
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Literal, Optional, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from apps.api.db.fields import partial_model
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def _encode(
+    pages: AsyncIterator[List[dict]],
+    model: Type[BaseModel],
+    columns: List[str],
+    fmt: ExportFormat,
+) -> AsyncIterator[str]:
+    partial = partial_model(model)
+    include = set(columns)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    if fmt == "csv":
+        writer.writeheader()
+    try:
+        # Un chunk por lote: la memoria depende del tamaño de lote, no de la tabla.
+        async for rows in pages:
+            for row in rows:
+                record = jsonable_encoder(partial(**row), include=include)
+                if fmt == "csv":
+                    writer.writerow({key: _csv_value(record.get(key)) for key in columns})
+                else:
+                    buffer.write(json.dumps(record, ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    except Exception:  # noqa: BLE001
+        # Los headers ya se enviaron; solo queda cortar el stream y dejar rastro.
+        logger.exception("Exportación de %s interrumpida", model.__name__)
+        raise
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(
+    pages: AsyncIterator[List[dict]],
+    model: Type[BaseModel],
+    fmt: ExportFormat,
+    basename: str,
+    fields: Optional[List[str]] = None,
+) -> StreamingResponse:
+    columns = list(fields or model.__fields__)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d")
+    extension = "csv" if fmt == "csv" else "ndjson"
+    return StreamingResponse(
+        _encode(pages, model, columns, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{basename}-{stamp}.{extension}"'},
+    )
@@ -0,0 +1,307 @@
+"""
+Cola de trabajos en segundo plano dentro del proceso de la API.
+
+Cada ``JobQueue`` atiende un tipo de trabajo con un pool de workers asyncio. El
+estado se guarda en ``background_jobs``: la petición responde ``202`` con el id
+del trabajo y el cliente consulta su estado. Al arrancar, la cola retoma los
+trabajos que quedaron pendientes o cuya ejecución se interrumpió (un reinicio a
+media ejecución), hasta ``max_attempts`` intentos; el reclamo es condicional
+sobre ``attempts`` para que dos procesos no ejecuten el mismo trabajo. Un trabajo
+que falla por un error inesperado o por tiempo vuelve a ``queued`` y se reintenta
+tras ``BACKGROUND_JOB_RETRY_SECONDS`` (duplicado en cada intento); los errores de
+validación (``HTTPException``) lo marcan ``failed`` de inmediato. ``retry`` vuelve a
+encolar a mano un trabajo ``failed`` con el mismo payload.
+
+Sin la migración de ``background_jobs`` el estado vive solo en memoria. Con
+``BACKGROUND_JOB_WORKERS=0`` el trabajo se ejecuta dentro de la petición (p. ej.
+en PythonAnywhere, donde no hay un event loop que sobreviva a la petición).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+
+from apps.api.core.config import get_settings
+from apps.api.db.async_client import AsyncSupabaseClient, get_async_client
+from apps.api.db.schema import has_column
+from apps.api.db.supabase_client import handle_response
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+JOBS_TABLE = "background_jobs"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+PENDING_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# Trabajos terminados que se conservan en memoria para responder el polling sin ir a la BD.
+_FINISHED_IN_MEMORY = 200
+
+JobHandler = Callable[[AsyncSupabaseClient, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+@dataclass
+class Job:
+    id: UUID
+    kind: str
+    payload: Dict[str, Any]
+    status: str = JOB_QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_by: Optional[str] = None
+    created_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Job":
+        return cls(
+            id=UUID(str(row["id"])),
+            kind=row["kind"],
+            payload=row.get("payload") or {},
+            status=row.get("status") or JOB_QUEUED,
+            result=row.get("result"),
+            error=row.get("error"),
+            attempts=row.get("attempts") or 0,
+            created_by=row.get("created_by"),
+            created_at=_parse_datetime(row.get("created_at")) or _now(),
+            started_at=_parse_datetime(row.get("started_at")),
+            finished_at=_parse_datetime(row.get("finished_at")),
+        )
+
+
+class JobQueue:
+    def __init__(self, kind: str, handler: JobHandler, max_attempts: int = 3) -> None:
+        self.kind = kind
+        self._handler = handler
+        self.max_attempts = max_attempts
+        self._jobs: "OrderedDict[UUID, Job]" = OrderedDict()
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _persistent(self, client: AsyncSupabaseClient) -> bool:
+        return await has_column(client, JOBS_TABLE, "status")
+
+    def _ensure_workers(self) -> "asyncio.Queue[Job]":
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._queue is None:
+            # Los workers pertenecen a un event loop; si cambió (tests, recarga) se recrean.
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"jobs-{self.kind}-{index}")
+                for index in range(settings.background_job_workers)
+            ]
+        return self._queue
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._execute(job)
+            except Exception:  # noqa: BLE001
+                logger.exception("Falló el worker de %s con el trabajo %s", self.kind, job.id)
+            finally:
+                queue.task_done()
+
+    async def start(self, client: AsyncSupabaseClient) -> None:
+        """Arranca el pool y reencola los trabajos pendientes de ejecuciones anteriores."""
+        if settings.background_job_workers <= 0:
+            return
+        self._ensure_workers()
+        try:
+            if await self._persistent(client):
+                await self._recover(client)
+        except Exception:  # noqa: BLE001
+            logger.exception("No se pudieron recuperar los trabajos pendientes de %s", self.kind)
+
+    async def stop(self) -> None:
+        # Los reintentos en espera siguen en "queued" en la BD; el próximo arranque los retoma.
+        workers, self._workers = [*self._workers, *self._retries], []
+        self._retries = set()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+
+    async def _recover(self, client: AsyncSupabaseClient) -> None:
+        rows = handle_response(
+            await client.table(JOBS_TABLE)
+            .select("*")
+            .eq("kind", self.kind)
+            .in_("status", list(PENDING_STATUSES))
+            .order("created_at")
+            .execute()
+        )
+        # Un trabajo "running" más reciente que el tiempo máximo puede seguir vivo en otro proceso.
+        stale_before = _now() - timedelta(seconds=settings.background_job_timeout_seconds)
+        for row in rows or []:
+            job = Job.from_row(row)
+            if job.id in self._jobs:
+                continue
+            if job.status == JOB_RUNNING and job.started_at and job.started_at > stale_before:
+                continue
+            if job.attempts >= self.max_attempts:
+                job.status, job.error, job.finished_at = JOB_FAILED, "El trabajo se interrumpió demasiadas veces.", _now()
+                await self._save(client, job, ["status", "error", "finished_at"])
+                continue
+            logger.info("Se retoma el trabajo %s (%s)", job.id, self.kind)
+            self._remember(job)
+            self._ensure_workers().put_nowait(job)
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        finished = [job_id for job_id, item in self._jobs.items() if item.finished]
+        for job_id in finished[: max(0, len(finished) - _FINISHED_IN_MEMORY)]:
+            del self._jobs[job_id]
+
+    async def _save(self, client: AsyncSupabaseClient, job: Job, fields: List[str]) -> None:
+        values = {name: getattr(job, name) for name in fields}
+        values = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+        await client.table(JOBS_TABLE).update(values).eq("id", str(job.id)).execute()
+
+    async def _claim(self, client: AsyncSupabaseClient, job: Job) -> bool:
+        started_at = _now()
+        claimed = handle_response(
+            await client.table(JOBS_TABLE)
+            .update({"status": JOB_RUNNING, "attempts": job.attempts + 1, "started_at": started_at.isoformat()})
+            .eq("id", str(job.id))
+            .eq("attempts", job.attempts)
+            .in_("status", list(PENDING_STATUSES))
+            .execute()
+        )
+        if claimed:
+            job.status, job.attempts, job.started_at = JOB_RUNNING, job.attempts + 1, started_at
+        return bool(claimed)
+
+    async def submit(self, client: AsyncSupabaseClient, payload: Dict[str, Any], created_by: Optional[str] = None) -> Job:
+        job = Job(id=uuid4(), kind=self.kind, payload=payload, created_by=created_by)
+        if await self._persistent(client):
+            await client.table(JOBS_TABLE).insert(
+                {
+                    "id": str(job.id),
+                    "kind": job.kind,
+                    "status": job.status,
+                    "payload": job.payload,
+                    "created_by": created_by,
+                    "created_at": job.created_at.isoformat(),
+                }
+            ).execute()
+        self._remember(job)
+        await self._dispatch(job)
+        return job
+
+    async def retry(self, client: AsyncSupabaseClient, job_id: UUID) -> Optional[Job]:
+        """Vuelve a encolar un trabajo ``failed`` con el mismo payload; otro estado se devuelve sin cambios."""
+        job = await self.get(client, job_id)
+        if job is None or job.status != JOB_FAILED:
+            return job
+        job.status, job.result, job.error, job.finished_at = JOB_QUEUED, None, None, None
+        self._remember(job)
+        if await self._persistent(client):
+            await self._save(client, job, ["status", "result", "error", "finished_at"])
+        await self._dispatch(job)
+        return job
+
+    async def _dispatch(self, job: Job) -> None:
+        if settings.background_job_workers <= 0:
+            await self._execute(job)
+        else:
+            self._ensure_workers().put_nowait(job)
+
+    async def get(self, client: AsyncSupabaseClient, job_id: UUID) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None or not await self._persistent(client):
+            return job
+        rows = handle_response(
+            await client.table(JOBS_TABLE).select("*").eq("id", str(job_id)).eq("kind", self.kind).limit(1).execute()
+        )
+        return Job.from_row(rows[0]) if rows else None
+
+    async def _execute(self, job: Job) -> None:
+        client = await get_async_client()
+        persistent = await self._persistent(client)
+        if persistent:
+            if not await self._claim(client, job):
+                # Otro proceso lo reclamó primero; su estado se consulta en la BD.
+                self._jobs.pop(job.id, None)
+                return
+        else:
+            job.status, job.attempts, job.started_at = JOB_RUNNING, job.attempts + 1, _now()
+        retryable = False
+        try:
+            job.result = await asyncio.wait_for(self._handler(client, job.payload), settings.background_job_timeout_seconds)
+            job.status, job.error = JOB_SUCCEEDED, None
+        except HTTPException as exc:
+            job.status, job.error = JOB_FAILED, str(exc.detail)
+        except asyncio.TimeoutError:
+            job.status, job.error = JOB_FAILED, "El trabajo excedió el tiempo máximo de ejecución."
+            retryable = True
+        except Exception:  # noqa: BLE001
+            logger.exception("Error ejecutando el trabajo %s (%s)", job.id, self.kind)
+            job.status, job.error = JOB_FAILED, "Ocurrió un error inesperado al procesar el trabajo."
+            retryable = True
+        # Dentro de la petición (sin workers) no se espera el backoff: se reintenta con retry().
+        if retryable and job.attempts < self.max_attempts and settings.background_job_workers > 0:
+            await self._retry_later(client, job, persistent)
+            return
+        job.finished_at = _now()
+        self._remember(job)
+        if persistent:
+            await self._save(client, job, ["status", "result", "error", "finished_at"])
+
+    async def _retry_later(self, client: AsyncSupabaseClient, job: Job, persistent: bool) -> None:
+        job.status = JOB_QUEUED
+        self._remember(job)
+        if persistent:
+            await self._save(client, job, ["status", "error"])
+        delay = settings.background_job_retry_seconds * 2 ** (job.attempts - 1)
+        logger.warning(
+            "Se reintenta el trabajo %s (%s) en %.0f s (intento %d de %d)",
+            job.id,
+            self.kind,
+            delay,
+            job.attempts + 1,
+            self.max_attempts,
+        )
+        queue = self._ensure_workers()
+
+        async def requeue() -> None:
+            await asyncio.sleep(delay)
+            queue.put_nowait(job)
+
+        task = asyncio.create_task(requeue(), name=f"jobs-{self.kind}-retry-{job.id}")
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
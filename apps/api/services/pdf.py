@@ -0,0 +1,338 @@
+"""
+Procesamiento de PDFs subidos (extracción desde ZIP, desbloqueo, reescritura y
+optimización opcional).
+
+pypdf es CPU-bound: descifrar y reescribir un buró de cientos de páginas tarda
+segundos, así que cada tarea corre en su propio proceso, con un máximo de
+procesos simultáneos y un tiempo máximo configurables. La espera por un proceso
+libre ocurre en el event loop (no ocupa un hilo del threadpool) y cuenta dentro del
+tiempo máximo. Un proceso que excede el tiempo se termina sin afectar a las demás
+subidas. Con ``PDF_PROCESS_WORKERS=0``
+se usa el threadpool (p. ej. en PythonAnywhere, donde no conviene crear procesos
+desde la app web).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+from zipfile import BadZipFile, ZipFile
+
+from fastapi import HTTPException, status
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import DictionaryObject, IndirectObject, NameObject
+from starlette.concurrency import run_in_threadpool
+
+from apps.api.core.config import get_settings
+from apps.api.services.uploads import file_sha256
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+_state_lock = threading.Lock()
+_context: Optional[Any] = None
+_slots: Optional[tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+_running: set = set()
+
+
+class PdfProcessingError(ValueError):
+    """Error de validación del archivo; el mensaje se muestra tal cual al usuario."""
+
+
+def extract_pdf_file(source: str, filename: str, workspace: str, max_bytes: int) -> tuple[str, str]:
+    """Devuelve la ruta del PDF a procesar; de un ZIP se extrae el primer PDF por bloques."""
+    lower_name = (filename or "").lower()
+    if lower_name.endswith(".zip"):
+        try:
+            with ZipFile(source) as archive:
+                pdf_members = [info for info in archive.infolist() if info.filename.lower().endswith(".pdf")]
+                if not pdf_members:
+                    raise PdfProcessingError("El ZIP no contiene ningún archivo PDF.")
+                member = pdf_members[0]
+                if member.flag_bits & 0x1:
+                    raise PdfProcessingError(
+                        "El ZIP está protegido con contraseña. Descomprime el archivo antes de subirlo."
+                    )
+                if member.file_size > max_bytes:
+                    raise PdfProcessingError("El PDF dentro del ZIP excede el tamaño máximo permitido.")
+                target = os.path.join(workspace, "extracted.pdf")
+                with archive.open(member) as stream, open(target, "wb") as output:
+                    copied = 0
+                    # El tamaño declarado en el ZIP puede mentir: se cuenta lo que realmente sale.
+                    while chunk := stream.read(_COPY_CHUNK_SIZE):
+                        copied += len(chunk)
+                        if copied > max_bytes:
+                            raise PdfProcessingError("El PDF dentro del ZIP excede el tamaño máximo permitido.")
+                        output.write(chunk)
+                return target, member.filename
+        except BadZipFile as exc:
+            raise PdfProcessingError("El archivo comprimido está dañado o no es válido.") from exc
+    if lower_name.endswith(".pdf"):
+        return source, filename
+    raise PdfProcessingError("Solo se permiten archivos PDF o ZIP que contengan un PDF.")
+
+
+def _stream_key(stream: Any) -> tuple:
+    # Bytes codificados tal como están en el archivo (sin descomprimir la imagen) y su
+    # diccionario; las referencias anidadas cuentan por id, así que solo se unen
+    # objetos realmente idénticos.
+    data = getattr(stream, "_data", b"") or b""
+    entries = tuple(sorted((str(key), repr(value)) for key, value in stream.items() if key != "/Length"))
+    return hashlib.sha256(data).hexdigest(), entries
+
+
+def _dedupe_xobjects(reader: PdfReader) -> None:
+    """Hace que las páginas apunten a una sola copia de cada imagen/formulario repetido."""
+    seen: dict[tuple, IndirectObject] = {}
+    for page in reader.pages:
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources is not None else None
+        if xobjects is None:
+            continue
+        xobjects = xobjects.get_object()
+        for name, ref in list(xobjects.items()):
+            if not isinstance(ref, IndirectObject):
+                continue
+            canonical = seen.setdefault(_stream_key(ref.get_object()), ref)
+            if canonical.idnum != ref.idnum:
+                xobjects[NameObject(name)] = canonical
+
+
+def _prune_unused_resources(page: PageObject) -> None:
+    """Quita de la página las fuentes e imágenes que su contenido no usa."""
+    resources = page.get("/Resources")
+    contents = page.get_contents()
+    if resources is None or contents is None:
+        return
+    resources = resources.get_object()
+    used = {operands[0] for operands, operator in contents.operations if operator in (b"Do", b"Tf") and operands}
+    xobjects = resources.get("/XObject")
+    if xobjects is not None:
+        for name in used:
+            xobject = xobjects.get_object().get(name)
+            # Un formulario sin /Resources propios hereda los de la página: no se poda.
+            if xobject is not None and xobject.get_object().get("/Subtype") == "/Form" and "/Resources" not in xobject.get_object():
+                return
+    # Copia superficial: /Resources puede ser heredado y compartido con otras páginas.
+    pruned = DictionaryObject(resources)
+    for category in ("/XObject", "/Font"):
+        entries = resources.get(category)
+        if entries is None:
+            continue
+        pruned[NameObject(category)] = DictionaryObject(
+            {NameObject(key): value for key, value in entries.get_object().items() if key in used}
+        )
+    page[NameObject("/Resources")] = pruned
+
+
+def _write_pdf(reader: PdfReader, target: str, optimize: bool) -> None:
+    writer = PdfWriter()
+    if optimize:
+        try:
+            _dedupe_xobjects(reader)
+            for page in reader.pages:
+                _prune_unused_resources(page)
+        except Exception:  # noqa: BLE001
+            # La optimización es opcional: si el PDF tiene una estructura inesperada se copia tal cual.
+            logger.warning("No se pudieron optimizar los recursos del PDF", exc_info=True)
+    for page in reader.pages:
+        added = writer.add_page(page)
+        if optimize:
+            added.compress_content_streams()
+    if reader.metadata:
+        writer.add_metadata({k: v for k, v in reader.metadata.items() if v is not None})
+    with open(target, "wb") as output:
+        writer.write(output)
+    writer.close()
+
+
+def unlock_pdf_file(source: str, password: str | None, workspace: str, optimize: bool = False) -> str:
+    """Devuelve la ruta del PDF sin cifrado y, con ``optimize``, reescrito más compacto.
+
+    Si no hay nada que hacer (o la versión optimizada no es más chica) devuelve ``source``.
+    """
+    with open(source, "rb") as handle:
+        try:
+            reader = PdfReader(handle)
+        except Exception as exc:  # noqa: BLE001
+            raise PdfProcessingError("El PDF está dañado o tiene un formato no válido.") from exc
+        encrypted = reader.is_encrypted
+        if not encrypted and not optimize:
+            return source
+        if encrypted:
+            if not password:
+                raise PdfProcessingError("El PDF está protegido. Ingresa la clave para desbloquearlo.")
+            try:
+                result = reader.decrypt(password)
+            except Exception as exc:  # noqa: BLE001
+                raise PdfProcessingError("No se pudo desbloquear el PDF. Verifica la clave proporcionada.") from exc
+            if result == 0:
+                raise PdfProcessingError("La clave del PDF es incorrecta.")
+        target = os.path.join(workspace, "unlocked.pdf")
+        try:
+            _write_pdf(reader, target, optimize)
+        except Exception:  # noqa: BLE001
+            if not encrypted:
+                logger.warning("No se pudo optimizar el PDF; se conserva el original", exc_info=True)
+                return source
+            if not optimize:
+                raise
+            logger.warning("No se pudo optimizar el PDF; se guarda solo desbloqueado", exc_info=True)
+            _write_pdf(reader, target, optimize=False)
+    if not encrypted and os.path.getsize(target) >= os.path.getsize(source):
+        return source
+    return target
+
+
+@dataclass
+class PreparedPdf:
+    path: str
+    filename: str
+    original_bytes: int
+    stored_bytes: int
+    sha256: str
+
+
+def prepare_uploaded_pdf(
+    source: str,
+    filename: str,
+    password: str | None,
+    workspace: str,
+    max_bytes: int,
+    optimize: bool = False,
+) -> PreparedPdf:
+    """Extrae, desbloquea y (opcionalmente) optimiza el PDF en una sola tarea (un proceso).
+
+    Trabaja con rutas dentro de ``workspace``.
+    """
+    pdf_path, inner_filename = extract_pdf_file(source, filename, workspace, max_bytes)
+    final_path = unlock_pdf_file(pdf_path, password, workspace, optimize)
+    return PreparedPdf(
+        path=final_path,
+        filename=inner_filename,
+        original_bytes=os.path.getsize(pdf_path),
+        stored_bytes=os.path.getsize(final_path),
+        sha256=file_sha256(final_path),
+    )
+
+
+class _WorkerDied(RuntimeError):
+    """El proceso de la tarea terminó sin devolver resultado."""
+
+
+def _get_context() -> Any:
+    global _context
+    with _state_lock:
+        if _context is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # forkserver: cada tarea es un fork de un servidor limpio con este módulo ya
+                # importado; no hereda el event loop ni los pools HTTP del proceso padre.
+                _context = multiprocessing.get_context("forkserver")
+                _context.set_forkserver_preload([__name__])
+            else:
+                _context = multiprocessing.get_context("spawn")
+        return _context
+
+
+def _get_slots() -> asyncio.Semaphore:
+    """Procesos disponibles para el event loop actual (la API corre en uno solo)."""
+    global _slots
+    loop = asyncio.get_running_loop()
+    with _state_lock:
+        if _slots is None or _slots[0] is not loop:
+            _slots = (loop, asyncio.Semaphore(settings.pdf_process_workers))
+        return _slots[1]
+
+
+def _process_main(conn: Any, fn: Callable[..., Any], args: tuple) -> None:
+    try:
+        result = (True, fn(*args))
+    except BaseException as exc:  # noqa: BLE001
+        result = (False, exc)
+    try:
+        conn.send(result)
+    finally:
+        conn.close()
+
+
+def _run_in_process(fn: Callable[..., T], args: tuple, timeout: float) -> T:
+    """Corre ``fn`` en un proceso propio; al exceder ``timeout`` se termina solo ese proceso.
+
+    Quien llama ya reservó el lugar en ``_get_slots()``.
+    """
+    context = _get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_process_main, args=(sender, fn, args), daemon=True)
+    process.start()
+    sender.close()
+    with _state_lock:
+        _running.add(process)
+    timed_out = False
+    try:
+        if not receiver.poll(timeout):
+            timed_out = True
+            raise asyncio.TimeoutError
+        ok, value = receiver.recv()
+    except EOFError as exc:
+        raise _WorkerDied(f"El proceso terminó con código {process.exitcode}") from exc
+    finally:
+        receiver.close()
+        if timed_out:
+            process.terminate()
+        process.join()
+        with _state_lock:
+            _running.discard(process)
+    if ok:
+        return value
+    raise value
+
+
+def shutdown_pdf_pool() -> None:
+    """Termina los procesos de PDFs en curso (al apagar la API)."""
+    global _slots
+    with _state_lock:
+        running = list(_running)
+        _slots = None
+    for process in running:
+        process.terminate()
+
+
+async def run_pdf_task(fn: Callable[..., T], *args: Any) -> T:
+    """Ejecuta ``fn`` fuera del event loop y traduce los errores a ``HTTPException``.
+
+    ``fn`` debe ser una función de módulo (se serializa hacia el proceso worker).
+    """
+    try:
+        if settings.pdf_process_workers <= 0:
+            return await asyncio.wait_for(run_in_threadpool(fn, *args), settings.pdf_task_timeout_seconds)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.pdf_task_timeout_seconds
+        slots = _get_slots()
+        await asyncio.wait_for(slots.acquire(), settings.pdf_task_timeout_seconds)
+        try:
+            return await run_in_threadpool(_run_in_process, fn, args, max(deadline - loop.time(), 0))
+        except _WorkerDied as exc:
+            logger.exception("El proceso del PDF se detuvo inesperadamente")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No se pudo procesar el PDF."
+            ) from exc
+        finally:
+            slots.release()
+    except PdfProcessingError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="El PDF tardó demasiado en procesarse. Intenta con un archivo más ligero.",
+        ) from exc
@@ -0,0 +1,154 @@
+"""
+Documentos guardados en un campo de un registro (``avales.curp_url``,
+``firmas.solicitud_aval_url``, ``clientes.identificacion_oficial_url``...).
+
+El archivo se copia a disco por bloques (``services/uploads``), se calcula su
+sha256 y se guarda con el almacenamiento direccionado por contenido: un archivo
+idéntico reutiliza el objeto existente. Después se actualiza el campo del registro
+y se libera el archivo anterior. Sin la migración de ``storage_objects`` se
+mantiene la ruta con timestamp.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from supabase import StorageException
+
+from apps.api.db.async_client import AsyncSupabaseClient
+from apps.api.db.supabase_client import handle_response
+from apps.api.models.schemas import DocumentoUploadResponse
+from apps.api.services.content_store import (
+    ObjectOwner,
+    content_store_enabled,
+    is_content_addressed,
+    release_content_addressed,
+    store_content_addressed,
+)
+from apps.api.services.storage import invalidate_storage_object
+from apps.api.services.uploads import file_sha256, spool_upload, upload_workspace
+
+STORAGE_BUCKET = "documentos-aval"
+
+# Campos de documento que se pueden subir por la API, por tabla.
+DOCUMENT_FIELDS: Dict[str, FrozenSet[str]] = {
+    "avales": frozenset(
+        {
+            "identificacion_oficial_url",
+            "comprobante_domicilio_cfe_url",
+            "comprobante_domicilio_siapa_url",
+            "pago_predial_url",
+            "escrituras_url",
+            "certificado_libre_gravamen_url",
+            "rfc_url",
+            "curp_url",
+            "acta_nacimiento_url",
+            "comprobante_ingresos_1_url",
+            "comprobante_ingresos_2_url",
+            "comprobante_ingresos_3_url",
+        }
+    ),
+    "firmas": frozenset({"solicitud_aval_url"}),
+    "clientes": frozenset({"identificacion_oficial_url"}),
+}
+
+Scope = Callable[[Any], Any]
+
+
+def _unscoped(query: Any) -> Any:
+    return query
+
+
+def sanitize_filename(filename: str, fallback: str = "archivo") -> str:
+    base = (filename or "").split("/")[-1]
+    base = unicodedata.normalize("NFD", base).encode("ascii", "ignore").decode("ascii")
+    base = base.lower().strip()
+    base = re.sub(r"[^a-z0-9._-]+", "-", base)
+    base = re.sub(r"-{2,}", "-", base).strip("-")
+    return base or f"{fallback}-{int(time.time())}"
+
+
+def document_field(table: str, field: str) -> str:
+    if field not in DOCUMENT_FIELDS.get(table, frozenset()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Campo de documento inválido: {field}")
+    return field
+
+
+async def discard_stored_file(client: AsyncSupabaseClient, bucket: str, path: str) -> None:
+    """Borra un archivo reemplazado; los objetos ``cas/`` solo si quedaron sin referencias."""
+    if is_content_addressed(path):
+        await release_content_addressed(client, bucket, path)
+        return
+    invalidate_storage_object(bucket, path)
+    try:
+        await client.storage.from_(bucket).remove([path])
+    except Exception:  # noqa: BLE001
+        # No es crítico si la eliminación falla; el reemplazo ya quedó guardado
+        pass
+
+
+async def store_record_document(
+    client: AsyncSupabaseClient,
+    owner: ObjectOwner,
+    file: UploadFile,
+    not_found: str,
+    scope: Scope = _unscoped,
+) -> DocumentoUploadResponse:
+    """Guarda ``file`` en el campo ``owner.field`` del registro y libera el archivo anterior.
+
+    ``scope`` restringe las consultas al registro (p. ej. ``creado_por`` para asesores).
+    """
+    current = handle_response(
+        await scope(client.table(owner.table).select(owner.field).eq("id", str(owner.id))).limit(1).execute()
+    )
+    if not current:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    previous_path = current[0].get(owner.field)
+
+    filename = sanitize_filename(file.filename or "")
+    content_type = file.content_type or "application/octet-stream"
+    reused = False
+    async with upload_workspace() as workspace:
+        source = await spool_upload(file, workspace)
+        size_bytes = source.stat().st_size
+        try:
+            if await content_store_enabled(client):
+                sha256 = await run_in_threadpool(file_sha256, source)
+                storage_path, reused = await store_content_addressed(
+                    client, STORAGE_BUCKET, str(source), sha256, size_bytes, filename, content_type, owner
+                )
+            else:
+                storage_path = _timestamped_path(owner, filename)
+                await _upload(client, storage_path, source, content_type)
+        except StorageException as exc:
+            raise HTTPException(status_code=500, detail="No se pudo guardar el documento.") from exc
+    invalidate_storage_object(STORAGE_BUCKET, storage_path)
+
+    await scope(
+        client.table(owner.table)
+        .update({owner.field: storage_path, "updated_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", str(owner.id))
+    ).execute()
+
+    if previous_path and previous_path != storage_path:
+        await discard_stored_file(client, STORAGE_BUCKET, previous_path)
+
+    return DocumentoUploadResponse(path=storage_path, stored_bytes=size_bytes, reused=reused)
+
+
+def _timestamped_path(owner: ObjectOwner, filename: str) -> str:
+    return f"{owner.table}/{owner.id}/{owner.field}/{int(time.time() * 1000)}-{filename}"
+
+
+async def _upload(client: AsyncSupabaseClient, path: str, source: Path, content_type: str) -> None:
+    with open(source, "rb") as handle:
+        await client.storage.from_(STORAGE_BUCKET).upload(
+            path, handle, {"content-type": content_type, "x-upsert": "true", "cache-control": "3600"}
+        )
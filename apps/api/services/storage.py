@@ -1,26 +1,41 @@
 from __future__ import annotations
 
 import mimetypes
+import os
 import re
-from datetime import datetime, timedelta, timezone
-from io import BytesIO
-from typing import Tuple
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Dict, Optional, Tuple
 
+import httpx
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
-from supabase import StorageException
+from starlette.concurrency import run_in_threadpool
 
+from apps.api.core.cache import DiskCacheEntry, DiskCacheWriter, DiskLRUCache
 from apps.api.core.config import get_settings
-from apps.api.db.supabase_client import get_client
+from apps.api.db.async_client import get_async_client
 
 DEFAULT_BUCKET = "documentos-aval"
 ALLOWED_BUCKETS = {DEFAULT_BUCKET}
 MIN_EXPIRATION_SECONDS = 60
 MAX_EXPIRATION_SECONDS = 60 * 60 * 24
 TOKEN_ALGORITHM = "HS256"
+# Cabeceras de Storage que se reenvían tal cual en las respuestas del proxy.
+FORWARDED_HEADERS = {"content-length": "Content-Length", "content-range": "Content-Range", "etag": "ETag"}
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
 
 settings = get_settings()
 
+# Copia local de los objetos servidos por el proxy (burós, identificaciones...).
+_object_cache = DiskLRUCache(
+    settings.storage_cache_dir or os.path.join(tempfile.gettempdir(), "aval-manager-storage"),
+    max_bytes=settings.storage_cache_max_bytes,
+    max_entry_bytes=settings.storage_cache_max_object_bytes,
+)
+
 
 def normalize_storage_path(path: str | None) -> str:
     if not path:
@@ -69,18 +84,28 @@ def create_storage_token(bucket: str | None, path: str | None, expires_in: int |
         raise ValueError("Ruta de almacenamiento vacía.")
 
     ttl = _clamp_expiration(expires_in)
-    now = datetime.now(timezone.utc)
-    expires_at = now + timedelta(seconds=ttl)
+    now = int(datetime.now(timezone.utc).timestamp())
+    expires_at = now + ttl
+    # La ventana nunca pasa de la mitad del ttl: un token firmado justo antes del
+    # cambio de ventana conserva al menos ttl/2 de vida (el visor PDF sigue pidiendo
+    # rangos y los enlaces compartidos siguen abriendo).
+    window = min(settings.storage_token_window_seconds, ttl // 2)
+    if window > 0:
+        # Vencimiento alineado hacia abajo a la ventana: la misma ruta produce el mismo
+        # token (y la misma URL) dentro de la ventana, así el navegador reutiliza su
+        # caché, y el token nunca dura más que el ttl pedido.
+        expires_at = max(expires_at // window * window, now + MIN_EXPIRATION_SECONDS)
+    issued_at = expires_at - ttl
     payload = {
         "sub": "storage-proxy",
         "bucket": normalized_bucket,
         "path": normalized_path,
-        "iat": int(now.timestamp()),
-        "nbf": int(now.timestamp()),
-        "exp": int(expires_at.timestamp()),
+        "iat": issued_at,
+        "nbf": issued_at,
+        "exp": expires_at,
     }
     token = jwt.encode(payload, settings.supabase_jwt_secret, algorithm=TOKEN_ALGORITHM)
-    return token, normalized_bucket, expires_at.isoformat()
+    return token, normalized_bucket, datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
 
 
 def build_proxy_url(bucket: str | None, path: str | None, expires_in: int | None = None) -> tuple[str, str, str, str]:
@@ -129,30 +154,260 @@ def _sanitize_filename(filename: str) -> str:
     return base or "archivo"
 
 
-def download_storage_object(bucket: str, path: str) -> Tuple[bytes, str, str]:
+async def download_storage_object(bucket: str, path: str) -> Tuple[bytes, str, str]:
+    stream = await open_storage_stream(bucket, path)
+    file_bytes = await stream.read()
+    return file_bytes, stream.filename, stream.mime_type
+
+
+def _cache_key(bucket: str, path: str) -> str:
+    return f"{bucket}/{path}"
+
+
+def invalidate_storage_object(bucket: str | None, path: str | None) -> None:
+    """Descarta la copia local de un objeto; se llama al reemplazarlo o eliminarlo."""
+    try:
+        normalized_path = normalize_storage_path(path)
+        normalized_bucket = _normalize_bucket(bucket)
+    except ValueError:
+        return
+    if normalized_path:
+        _object_cache.invalidate(_cache_key(normalized_bucket, normalized_path))
+
+
+def storage_cache_stats() -> dict:
+    return _object_cache.stats()
+
+
+def parse_byte_range(header: str | None) -> Optional[str]:
+    """Normaliza un ``Range`` de un solo intervalo (``bytes=a-b``, ``bytes=a-`` o ``bytes=-n``).
+
+    Devuelve None si no hay cabecera o si no es un rango simple válido; en ese caso
+    se sirve el archivo completo, como permite el RFC 9110.
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip().replace(" ", ""))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """Comparación débil de ``If-None-Match`` contra ``etag`` (RFC 9110)."""
+    if not if_none_match or not etag:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _byte_span(byte_range: str, size: int) -> Optional[Tuple[int, int]]:
+    """Resuelve un rango normalizado contra ``size``; None si no es satisfacible."""
+    start, end = byte_range.removeprefix("bytes=").split("-")
+    if not start:
+        suffix = int(end)
+        if suffix == 0 or size == 0:
+            return None
+        return max(size - suffix, 0), size - 1
+    first = int(start)
+    if first >= size:
+        return None
+    last = min(int(end), size - 1) if end else size - 1
+    return first, last
+
+
+@dataclass
+class StorageObjectStream:
+    """Objeto abierto (en Storage o en la caché local); el cuerpo se consume por bloques y debe cerrarse."""
+
+    status_code: int
+    filename: str
+    mime_type: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = False
+    _response: Optional[httpx.Response] = field(default=None, repr=False)
+    _file: Optional[BinaryIO] = field(default=None, repr=False)
+    _remaining: int = field(default=0, repr=False)
+    _cache_writer: Optional[DiskCacheWriter] = field(default=None, repr=False)
+
+    async def iter_bytes(self, chunk_size: int) -> AsyncIterator[bytes]:
+        try:
+            if self._file is not None:
+                while self._remaining > 0:
+                    chunk = await run_in_threadpool(self._file.read, min(chunk_size, self._remaining))
+                    if not chunk:
+                        break
+                    self._remaining -= len(chunk)
+                    _object_cache.record_served(len(chunk))
+                    yield chunk
+            elif self._response is not None:
+                async for chunk in self._response.aiter_bytes(chunk_size):
+                    if self._cache_writer is not None:
+                        self._cache_writer.write(chunk)
+                    yield chunk
+                if self._cache_writer is not None:
+                    etag = self.headers.get("ETag") or f'"{self._cache_writer.sha256()[:32]}"'
+                    self._cache_writer.commit({"etag": etag})
+                    self._cache_writer = None
+        finally:
+            await self.aclose()
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_bytes(settings.storage_proxy_chunk_size)])
+
+    async def aclose(self) -> None:
+        if self._cache_writer is not None:
+            # Descarga incompleta (cliente desconectado o error): no se publica.
+            self._cache_writer.discard()
+            self._cache_writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._response is not None:
+            await self._response.aclose()
+
+
+def _stream_from_cache(
+    entry: DiskCacheEntry,
+    byte_range: str | None,
+    if_none_match: str | None,
+    filename: str,
+    mime_type: str,
+) -> StorageObjectStream:
+    handle = entry.file
+    size = os.fstat(handle.fileno()).st_size
+    etag = entry.metadata.get("etag")
+    base_headers = {"ETag": etag} if etag else {}
+    if etag_matches(if_none_match, etag):
+        handle.close()
+        return StorageObjectStream(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            filename=filename,
+            mime_type=mime_type,
+            headers=base_headers,
+            from_cache=True,
+        )
+    if byte_range is None:
+        return StorageObjectStream(
+            status_code=status.HTTP_200_OK,
+            filename=filename,
+            mime_type=mime_type,
+            headers={**base_headers, "Content-Length": str(size)},
+            from_cache=True,
+            _file=handle,
+            _remaining=size,
+        )
+    span = _byte_span(byte_range, size)
+    if span is None:
+        handle.close()
+        return StorageObjectStream(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            filename=filename,
+            mime_type=mime_type,
+            headers={"Content-Range": f"bytes */{size}"},
+            from_cache=True,
+        )
+    start, end = span
+    handle.seek(start)
+    return StorageObjectStream(
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        filename=filename,
+        mime_type=mime_type,
+        headers={
+            **base_headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        },
+        from_cache=True,
+        _file=handle,
+        _remaining=end - start + 1,
+    )
+
+
+async def open_storage_stream(
+    bucket: str,
+    path: str,
+    byte_range: str | None = None,
+    if_none_match: str | None = None,
+) -> StorageObjectStream:
+    """Abre el objeto sin descargarlo, desde la caché local o desde Storage.
+
+    ``byte_range`` se resuelve contra la copia local o se reenvía a Storage, que
+    responde ``206`` con ``Content-Range`` o ``416`` si el rango queda fuera del
+    archivo; ambos códigos se propagan al llamador, igual que ``304`` cuando
+    ``if_none_match`` coincide con el ETag. Las descargas completas desde Storage
+    se copian a la caché mientras se transmiten.
+    """
     normalized_bucket = _normalize_bucket(bucket)
     normalized_path = normalize_storage_path(path)
     if not normalized_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo no encontrado.")
 
-    client = get_client()
-    storage = client.storage.from_(normalized_bucket)
+    filename = _sanitize_filename(normalized_path.split("/")[-1])
+    mime_type = _guess_mime_type(filename)
+
+    cache_key = _cache_key(normalized_bucket, normalized_path)
+    cached = _object_cache.open(cache_key)
+    if cached is not None:
+        return _stream_from_cache(cached, byte_range, if_none_match, filename, mime_type)
+
+    client = await get_async_client()
+    session = client.storage.session
+    # Sin compresión: Content-Length y Content-Range deben corresponder a los bytes reenviados.
+    headers = {"Accept-Encoding": "identity"}
+    if byte_range:
+        headers["Range"] = byte_range
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    request = session.build_request("GET", f"object/{normalized_bucket}/{normalized_path}", headers=headers)
     try:
-        data = storage.download(normalized_path)
-    except StorageException as exc:  # pragma: no cover
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo no encontrado.") from exc
-    except Exception as exc:  # noqa: BLE001
+        response = await session.send(request, stream=True)
+    except httpx.HTTPError as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No se pudo descargar el archivo.") from exc
 
-    if isinstance(data, bytes):
-        file_bytes = data
-    elif isinstance(data, BytesIO):
-        file_bytes = data.getvalue()
-    elif hasattr(data, "data"):
-        file_bytes = data.data  # type: ignore[attr-defined]
-    else:
-        file_bytes = bytes(data)
-
-    filename = _sanitize_filename(normalized_path.split("/")[-1])
-    mime_type = _guess_mime_type(filename)
-    return file_bytes, filename, mime_type
+    if response.status_code == status.HTTP_304_NOT_MODIFIED:
+        await response.aclose()
+        etag = response.headers.get("etag")
+        return StorageObjectStream(
+            status_code=response.status_code,
+            filename=filename,
+            mime_type=mime_type,
+            headers={"ETag": etag} if etag else {},
+        )
+    if response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE:
+        await response.aclose()
+        content_range = response.headers.get("content-range")
+        return StorageObjectStream(
+            status_code=response.status_code,
+            filename=filename,
+            mime_type=mime_type,
+            headers={"Content-Range": content_range} if content_range else {},
+        )
+    if response.status_code >= 400:
+        await response.aclose()
+        if response.status_code in (400, 404):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo no encontrado.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No se pudo descargar el archivo.")
+
+    forwarded = {
+        canonical: response.headers[name] for name, canonical in FORWARDED_HEADERS.items() if name in response.headers
+    }
+    cache_writer = None
+    content_length = response.headers.get("content-length")
+    if response.status_code == status.HTTP_200_OK and (
+        content_length is None or int(content_length) <= _object_cache.max_entry_bytes
+    ):
+        cache_writer = _object_cache.writer(cache_key)
+    return StorageObjectStream(
+        status_code=response.status_code,
+        filename=filename,
+        mime_type=mime_type,
+        headers=forwarded,
+        _response=response,
+        _cache_writer=cache_writer,
+    )
@@ -0,0 +1,70 @@
+"""
+Pipeline de subida de documentos con memoria acotada.
+
+El archivo recibido se copia por bloques a un directorio temporal propio de la
+petición (los workers de PDF lo leen por ruta), el tamaño se valida mientras se
+copia y el resultado se sube a Storage desde un file handle. Así la memoria por
+subida depende del tamaño de bloque y no del archivo.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import HTTPException, UploadFile, status
+
+from apps.api.core.config import get_settings
+
+settings = get_settings()
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _too_large() -> HTTPException:
+    limit_mb = settings.upload_max_bytes / (1024 * 1024)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El archivo excede el tamaño máximo permitido ({limit_mb:.0f} MB).",
+    )
+
+
+@asynccontextmanager
+async def upload_workspace() -> AsyncIterator[Path]:
+    """Directorio temporal para los archivos intermedios de una subida; se borra al salir."""
+    directory = Path(tempfile.mkdtemp(prefix="aval-upload-"))
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def spool_upload(file: UploadFile, workspace: Path) -> Path:
+    """Copia ``file`` a ``workspace`` por bloques; 413 en cuanto supera ``UPLOAD_MAX_BYTES``."""
+    if file.size is not None and file.size > settings.upload_max_bytes:
+        raise _too_large()
+    suffix = Path(file.filename or "").suffix.lower()
+    target = workspace / f"upload{suffix}"
+    total = 0
+    with open(target, "wb") as output:
+        while chunk := await file.read(CHUNK_SIZE):
+            total += len(chunk)
+            if total > settings.upload_max_bytes:
+                raise _too_large()
+            output.write(chunk)
+    if total == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo recibido está vacío.")
+    return target
+
+
+def file_sha256(path: str | Path) -> str:
+    """sha256 del archivo leído por bloques (para el almacenamiento direccionado por contenido)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
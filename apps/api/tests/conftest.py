@@ -0,0 +1,27 @@
+from typing import Callable
+
+import httpx
+import pytest
+
+from apps.api.db import async_client
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+@pytest.fixture
+def supabase_transport(monkeypatch) -> Callable[[Handler], list[httpx.Request]]:
+    """Responde las peticiones del cliente async de Supabase (PostgREST y Storage) con ``handler``.
+
+    Devuelve una función que instala el handler y regresa la lista de peticiones recibidas.
+    """
+    requests: list[httpx.Request] = []
+
+    def install(handler: Handler) -> list[httpx.Request]:
+        def record(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return handler(request)
+
+        monkeypatch.setattr(async_client, "_base_transport", lambda: httpx.MockTransport(record))
+        return requests
+
+    return install
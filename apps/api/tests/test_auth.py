@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from apps.api.core import auth
+from apps.api.core.config import get_settings
+
+
+def _make_token(**overrides) -> str:
+    settings = get_settings()
+    now = int(time.time())
+    claims = {
+        "sub": "7d6a3c1e-0000-4000-8000-000000000001",
+        "email": "asesor@example.com",
+        "aud": settings.supabase_jwt_audience,
+        "iat": now,
+        "exp": now + 3600,
+        "app_metadata": {"role": "asesor"},
+        "user_metadata": {},
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, settings.supabase_jwt_secret, algorithm="HS256")
+
+
+def test_decode_access_token_extracts_user_shape() -> None:
+    user = auth._decode_access_token(_make_token())
+    assert user == {
+        "id": "7d6a3c1e-0000-4000-8000-000000000001",
+        "email": "asesor@example.com",
+        "app_metadata": {"role": "asesor"},
+        "user_metadata": {},
+    }
+
+
+def test_decode_access_token_rejects_expired_tokens() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        auth._decode_access_token(_make_token(exp=int(time.time()) - 60))
+    assert exc_info.value.status_code == 401
+
+
+def test_decode_access_token_defers_unverifiable_tokens() -> None:
+    assert auth._decode_access_token(_make_token(aud="otro")) is None
+    foreign = jwt.encode({"sub": "x", "aud": "authenticated"}, "otro-secreto", algorithm="HS256")
+    assert auth._decode_access_token(foreign) is None
+
+
+def test_role_lookup_is_cached_and_invalidated(monkeypatch) -> None:
+    calls = []
+
+    class _Query:
+        def select(self, *_):
+            return self
+
+        def eq(self, *_):
+            return self
+
+        def single(self):
+            return self
+
+        async def execute(self):
+            calls.append(1)
+            return type("Resp", (), {"data": {"rol": "asesor"}, "error": None})()
+
+    class _Client:
+        def table(self, _name):
+            return _Query()
+
+    async def _get_client():
+        return _Client()
+
+    monkeypatch.setattr(auth, "get_async_client", _get_client)
+    auth._role_cache.clear()
+    user = {"id": "user-1", "app_metadata": {}, "user_metadata": {}}
+
+    assert asyncio.run(auth._resolve_user_role(user)) == "asesor"
+    assert asyncio.run(auth._resolve_user_role(user)) == "asesor"
+    assert len(calls) == 1
+
+    auth._role_cache.invalidate("user-1")
+    assert asyncio.run(auth._resolve_user_role(user)) == "asesor"
+    assert len(calls) == 2
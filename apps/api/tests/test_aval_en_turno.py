@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.api.main import app
+from apps.api.services import aval_en_turno
+
+AVAL_ID = "00000000-0000-0000-0000-0000000000aa"
+DISPONIBILIDAD = {
+    "id": "00000000-0000-0000-0000-0000000000bb",
+    "aval_id": AVAL_ID,
+    "fecha_inicio": "2025-01-01T09:00:00+00:00",
+    "fecha_fin": "2025-01-01T18:00:00+00:00",
+    "recurrente": False,
+    "created_at": "2025-01-01T00:00:00+00:00",
+}
+
+
+@pytest.fixture
+def api(supabase_transport):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/rpc/fn_aval_en_turno"):
+            return httpx.Response(200, json=AVAL_ID)
+        if request.url.path.endswith("/avales"):
+            aval = {"id": AVAL_ID, "nombre_completo": "Aval en turno", "updated_at": "2025-01-01T00:00:00+00:00"}
+            return httpx.Response(200, json=[aval])
+        if request.url.path.endswith("/disponibilidades_avales"):
+            return httpx.Response(200, json=[DISPONIBILIDAD])
+        return httpx.Response(200, json=[])
+
+    requests = supabase_transport(handler)
+    aval_en_turno.invalidate_aval_en_turno()
+    yield TestClient(app), requests
+    aval_en_turno.invalidate_aval_en_turno()
+
+
+def _rpc_calls(requests: list[httpx.Request]) -> int:
+    return sum(1 for request in requests if request.url.path.endswith("/rpc/fn_aval_en_turno"))
+
+
+def test_turno_is_resolved_once_per_window(api) -> None:
+    client, requests = api
+    for _ in range(3):
+        response = client.get("/public/avales/en-turno")
+        assert response.status_code == 200
+        assert response.json()["id"] == AVAL_ID
+    assert _rpc_calls(requests) == 1
+
+
+def test_invalidation_forces_new_resolution(api) -> None:
+    client, requests = api
+    client.get("/public/avales/en-turno")
+    aval_en_turno.invalidate_aval_en_turno()
+    client.get("/public/avales/en-turno")
+    assert _rpc_calls(requests) == 2
+
+
+def test_composite_endpoint_returns_everything_in_one_call(api) -> None:
+    client, requests = api
+    response = client.get("/public/en-turno")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["aval"]["id"] == AVAL_ID
+    assert body["documentos"] == []
+    assert [item["id"] for item in body["disponibilidades"]] == [DISPONIBILIDAD["id"]]
+    # RPC de turno + aval, documentos y disponibilidades.
+    assert len(requests) == 4
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import zipfile
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.api.core.auth import require_admin_or_asesor
+from apps.api.core.cache import DiskLRUCache
+from apps.api.core.config import get_settings
+from apps.api.main import app
+from apps.api.services import bundles
+from apps.api.services import storage as storage_service
+
+FILES = {
+    "avales/1/ine.pdf": b"%PDF ine" * 5000,
+    "avales/1/buro.pdf": b"%PDF buro",
+    "contratos/1/pagare.PDF": b"%PDF pagare",
+}
+
+
+@pytest.fixture
+def storage(supabase_transport, monkeypatch, tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/object/", 1)[-1].split("/", 1)[-1]
+        if path not in FILES:
+            return httpx.Response(400, json={"error": "not_found", "message": "Object not found"})
+        return httpx.Response(200, content=FILES[path], headers={"Content-Type": "application/pdf"})
+
+    supabase_transport(handler)
+    monkeypatch.setattr(storage_service, "_object_cache", DiskLRUCache(tmp_path, max_bytes=1024 * 1024, max_entry_bytes=1024 * 1024))
+
+
+def _build(entries, concurrency=2) -> zipfile.ZipFile:
+    async def run():
+        return b"".join([chunk async for chunk in bundles.stream_zip(entries, concurrency=concurrency)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(run())))
+
+
+def test_zip_contains_every_document_in_order(storage) -> None:
+    aval = {"identificacion_oficial_url": "avales/1/ine.pdf", "buro_credito_url": "avales/1/buro.pdf", "rfc_url": None}
+    documentos = [{"tipo": "Pagaré", "archivo_path": "contratos/1/pagare.PDF"}, {"tipo": "Pagaré", "archivo_path": "avales/1/buro.pdf"}]
+    archive = _build(bundles.aval_entries(aval) + bundles.documento_entries(documentos))
+
+    assert archive.namelist() == [
+        "aval/Identificación oficial.pdf",
+        "aval/Buró de crédito.pdf",
+        "documentos/Pagaré.pdf",
+        "documentos/Pagaré (2).pdf",
+    ]
+    assert archive.read("aval/Identificación oficial.pdf") == FILES["avales/1/ine.pdf"]
+    assert archive.read("documentos/Pagaré (2).pdf") == FILES["avales/1/buro.pdf"]
+    assert archive.testzip() is None
+
+
+def test_missing_objects_are_reported_instead_of_aborting(storage) -> None:
+    entries = [
+        bundles.BundleEntry(name="aval/Faltante.pdf", path="avales/1/no-existe.pdf"),
+        bundles.BundleEntry(name="aval/Buró.pdf", path="avales/1/buro.pdf"),
+    ]
+    archive = _build(entries, concurrency=1)
+
+    assert archive.namelist() == ["aval/Buró.pdf", "ERRORES.txt"]
+    assert "aval/Faltante.pdf" in archive.read("ERRORES.txt").decode()
+
+
+def test_zip_endpoint_requires_streaming(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "storage_proxy_streaming", False)
+    app.dependency_overrides[require_admin_or_asesor] = lambda: {"id": "user-1", "role": "admin"}
+    try:
+        response = TestClient(app).get("/documentos/aval/00000000-0000-0000-0000-000000000001/zip")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 501
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import re
+from io import BytesIO
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from apps.api.db import async_client
+from apps.api.services import content_store, record_documents
+
+SHA = "ab" + "0" * 62
+
+
+@pytest.fixture
+def supabase(supabase_transport):
+    # Modelo mínimo de storage_objects: una fila (o None), marcada o viva, y su número de referencias.
+    state = {"row": None, "refs": 0, "before_register": None}
+
+    def rpc(name: str, params: dict):
+        row = state["row"]
+        if name == "fn_ref_storage_object":
+            if row and not row["released"]:
+                state["refs"] += 1
+                return row["path"]
+            return None
+        if name == "fn_register_storage_object":
+            if state["before_register"]:
+                state["before_register"]()
+                state["before_register"], row = None, state["row"]
+            if row is None or row["released"]:
+                state["row"] = {"path": params["p_path"], "released": False}
+                return params["p_path"]
+            return None
+        if name == "fn_release_storage_object":
+            if row and not row["released"] and not state["refs"]:
+                row["released"] = True
+                return [{"path": row["path"]}]
+            return []
+        if name == "fn_purge_storage_object":
+            if row and row["released"] and row["path"] == params["p_path"] and not state["refs"]:
+                state["row"] = None
+                return True
+            return False
+        raise AssertionError(name)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/storage/v1/object/"):
+            return httpx.Response(200, json={"Key": path})
+        if "/rpc/" in path:
+            return httpx.Response(200, json=rpc(path.rsplit("/", 1)[-1], json.loads(request.content)))
+        return httpx.Response(404, json={})
+
+    return state, supabase_transport(handler)
+
+
+def _store(tmp_path):
+    source = tmp_path / "buro.pdf"
+    source.write_bytes(b"%PDF-1.7")
+
+    async def run():
+        client = await async_client.get_async_client()
+        owner = content_store.ObjectOwner("avales", uuid4(), "buro_credito_url")
+        return await content_store.store_content_addressed(
+            client, "documentos-aval", str(source), SHA, 8, "buro.pdf", "application/pdf", owner
+        )
+
+    return asyncio.run(run())
+
+
+def _release(path):
+    async def run():
+        client = await async_client.get_async_client()
+        return await content_store.release_content_addressed(client, "documentos-aval", path)
+
+    return asyncio.run(run())
+
+
+def _uploads(requests) -> list[str]:
+    return [
+        request.url.path
+        for request in requests
+        if request.method == "POST" and request.url.path.startswith("/storage/v1/object/")
+    ]
+
+
+def _removed(requests) -> list[str]:
+    return [
+        prefix
+        for request in requests
+        if request.method == "DELETE" and request.url.path.startswith("/storage/v1/object/")
+        for prefix in json.loads(request.content)["prefixes"]
+    ]
+
+
+def test_new_content_is_uploaded_under_its_hash(supabase, tmp_path) -> None:
+    _, requests = supabase
+    path, reused = _store(tmp_path)
+    assert re.fullmatch(rf"cas/ab/{SHA}/[0-9a-f]{{12}}/buro\.pdf", path)
+    assert not reused
+    assert len(_uploads(requests)) == 1
+    assert content_store.content_hash(path) == SHA
+    assert not content_store.is_content_addressed("avales/1/buro_credito/123-buro.pdf")
+
+
+def test_duplicate_content_reuses_existing_object(supabase, tmp_path) -> None:
+    state, requests = supabase
+    state["row"] = {"path": f"cas/ab/{SHA}/otro-nombre.pdf", "released": False}
+    path, reused = _store(tmp_path)
+    assert path == f"cas/ab/{SHA}/otro-nombre.pdf"
+    assert reused
+    assert _uploads(requests) == []
+
+
+def test_release_removes_the_file_before_the_row(supabase) -> None:
+    state, requests = supabase
+    path = f"cas/ab/{SHA}/buro.pdf"
+    state["row"] = {"path": path, "released": False}
+
+    state["refs"] = 1
+    assert _release(path) is False
+    assert _removed(requests) == []
+
+    state["refs"] = 0
+    assert _release(path) is True
+    assert state["row"] is None
+    calls = [request.url.path.rsplit("/", 1)[-1] for request in requests]
+    assert calls.index("documentos-aval") < calls.index("fn_purge_storage_object")
+    assert _removed(requests) == [path]
+
+
+def test_upload_during_a_release_uses_a_new_path(supabase, tmp_path) -> None:
+    state, requests = supabase
+    # Otra petición ya marcó el objeto y todavía no borra su archivo.
+    old = f"cas/ab/{SHA}/0123456789ab/buro.pdf"
+    state["row"] = {"path": old, "released": True}
+
+    path, reused = _store(tmp_path)
+    assert path != old and not reused
+    assert state["row"] == {"path": path, "released": False}
+
+    # La liberación termina: borra su archivo, pero la fila revivida ya no es suya.
+    async def finish_release():
+        client = await async_client.get_async_client()
+        await client.storage.from_("documentos-aval").remove([old])
+        response = await client.rpc(
+            "fn_purge_storage_object", {"p_bucket": "documentos-aval", "p_sha256": SHA, "p_path": old}
+        ).execute()
+        return response.data
+
+    assert asyncio.run(finish_release()) is False
+    assert state["row"]["path"] == path
+    assert path not in _removed(requests)
+
+
+def test_concurrent_upload_of_the_same_content_keeps_one_copy(supabase, tmp_path) -> None:
+    state, requests = supabase
+    winner = f"cas/ab/{SHA}/fedcba987654/buro.pdf"
+    state["before_register"] = lambda: state.update(row={"path": winner, "released": False})
+
+    path, reused = _store(tmp_path)
+    assert path == winner and reused
+    (own,) = _uploads(requests)
+    assert _removed(requests) == [own.split("/documentos-aval/", 1)[1]]
+
+
+def test_record_documents_share_the_content_store(supabase_transport, monkeypatch) -> None:
+    async def enabled(_client):
+        return True
+
+    monkeypatch.setattr(record_documents, "content_store_enabled", enabled)
+    previous = "firmas/1/solicitud_aval_url/123-solicitud.pdf"
+    existing = f"cas/ab/{SHA}/fedcba987654/solicitud.pdf"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/rpc/fn_ref_storage_object"):
+            return httpx.Response(200, json=existing)
+        if path.endswith("/firmas") and request.method == "GET":
+            return httpx.Response(200, json=[{"solicitud_aval_url": previous}])
+        return httpx.Response(200, json=[])
+
+    requests = supabase_transport(handler)
+    monkeypatch.setattr(record_documents, "file_sha256", lambda _path: SHA)
+
+    async def run():
+        client = await async_client.get_async_client()
+        owner = content_store.ObjectOwner("firmas", uuid4(), record_documents.document_field("firmas", "solicitud_aval_url"))
+        upload = UploadFile(BytesIO(b"%PDF-1.7"), filename="Solicitud Aval.pdf")
+        return await record_documents.store_record_document(client, owner, upload, "Firma no encontrada")
+
+    result = asyncio.run(run())
+    assert result.path == existing and result.reused
+    patch = next(request for request in requests if request.method == "PATCH")
+    assert json.loads(patch.content)["solicitud_aval_url"] == existing
+    # La ruta con timestamp anterior no es cas/: se borra directamente.
+    assert _removed(requests) == [previous]
+    assert not any(request.method == "POST" and "/storage/v1/object/" in request.url.path for request in requests)
+
+    with pytest.raises(HTTPException) as exc:
+        record_documents.document_field("firmas", "../avales")
+    assert exc.value.status_code == 400
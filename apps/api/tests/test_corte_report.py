@@ -0,0 +1,66 @@
+import io
+import tracemalloc
+from datetime import date
+from uuid import uuid4
+
+from pypdf import PdfReader
+
+from apps.api.services.corte_report import render_corte_pdf
+
+
+def _servicios(count: int, per_group: int = 5):
+    firma = None
+    for index in range(count):
+        if index % per_group == 0:
+            firma = str(uuid4())
+        yield {"id": index, "firma_id": firma, "cliente_nombre": f"Cliente {index // per_group}",
+               "fecha_pago": "2026-10-03T12:00:00+00:00", "monto_efectivo": 100, "monto_transferencia": "50.25"}
+
+
+def _render(servicios, comisiones) -> tuple[bytes, int]:
+    output = io.BytesIO()
+    pages = render_corte_pdf(output, date(2026, 10, 1), date(2026, 10, 15), servicios, comisiones)
+    return output.getvalue(), pages
+
+
+def test_report_has_subtotals_per_beneficiary_and_totals() -> None:
+    comisiones = [
+        {"id": 1, "beneficiario_id": "a", "beneficiario_tipo": "aval", "beneficiario_nombre": "Luis (aval)",
+         "cliente_nombre": "Ana", "fecha_pago": "2026-10-02", "monto": 30},
+        {"id": 2, "beneficiario_id": "a", "beneficiario_tipo": "aval", "beneficiario_nombre": "Luis (aval)",
+         "cliente_nombre": "Ñoño", "fecha_pago": "2026-10-04", "monto": 20},
+        {"id": 3, "beneficiario_id": "b", "beneficiario_tipo": "asesor", "beneficiario_nombre": "Eva",
+         "cliente_nombre": "Ana", "fecha_pago": "2026-10-05", "monto": 5.5},
+    ]
+    data, pages = _render(_servicios(3), comisiones)
+    reader = PdfReader(io.BytesIO(data))
+    text = reader.pages[0].extract_text()
+
+    assert pages == len(reader.pages) == 1
+    assert "Subtotal Cliente 0 (3 pagos)" in text and "$450.75" in text
+    assert "Subtotal Luis (aval) (2 pagos)" in text and "$50.00" in text
+    assert "Subtotal Eva (1 pago)" in text
+    assert "Ñoño" in text
+    assert "Total comisiones: $55.50" in text
+
+
+def test_empty_sections_are_reported() -> None:
+    data, _ = _render([], None)
+    text = PdfReader(io.BytesIO(data)).pages[0].extract_text()
+    assert "No se registraron pagos de servicio en este corte." in text
+    assert "No se registraron comisiones en este corte." in text
+
+
+def test_memory_does_not_grow_with_row_count(tmp_path) -> None:
+    def peak(count: int) -> int:
+        tracemalloc.start()
+        with open(tmp_path / f"{count}.pdf", "wb") as output:
+            render_corte_pdf(output, date(2026, 10, 1), date(2026, 10, 15), _servicios(count), None)
+        _, result = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result
+
+    small, large = peak(500), peak(5_000)
+    # Solo crece la tabla de offsets (unos bytes por página).
+    assert large < small + 256 * 1024
+    assert len(PdfReader(tmp_path / "5000.pdf").pages) > 50
@@ -0,0 +1,185 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from apps.api.db import async_client
+from apps.api.services import cortes
+
+
+@pytest.fixture
+def supabase(supabase_transport):
+    state = {"rpc": None, "views": {}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if "/rpc/" in path:
+            return state["rpc"](json.loads(request.content))
+        if path.startswith("/storage/v1/object/"):
+            return httpx.Response(200, json={"Key": path})
+        view = path.rsplit("/", 1)[-1]
+        if request.method == "GET" and view in state["views"]:
+            # Un solo lote: las consultas con cursor (and=) ya no tienen filas.
+            rows = [] if "and" in request.url.params else state["views"][view]
+            return httpx.Response(200, json=rows)
+        return httpx.Response(200, json=[])
+
+    return state, supabase_transport(handler)
+
+
+def _generate(corte_id):
+    async def run():
+        client = await async_client.get_async_client()
+        payload = {"corte_id": str(corte_id), "fecha_inicio": "2026-10-01", "fecha_fin": "2026-10-15"}
+        return await cortes.generate_corte(client, payload)
+
+    return asyncio.run(run())
+
+
+def test_corte_is_created_by_one_rpc_and_rendered_from_the_views(supabase) -> None:
+    state, calls = supabase
+    corte_id = uuid4()
+    servicio = {"id": str(uuid4()), "firma_id": str(uuid4()), "monto_efectivo": 100, "monto_transferencia": 50,
+                "cliente_nombre": "Ana"}
+    comision = {"id": str(uuid4()), "beneficiario_id": str(uuid4()), "monto": 30, "beneficiario_tipo": "aval",
+                "beneficiario_nombre": "Luis", "cliente_nombre": "Ana"}
+
+    def rpc(params):
+        assert params["p_corte_id"] == str(corte_id)
+        corte = {"id": str(corte_id), "fecha_inicio": "2026-10-01", "fecha_fin": "2026-10-15", "total_servicio": 150,
+                 "total_comisiones": 30, "pdf_path": None, "created_at": "2026-10-16T10:00:00+00:00"}
+        return httpx.Response(200, json={"corte": corte, "pagos_servicio": 1, "pagos_comisiones": 1})
+
+    state["rpc"] = rpc
+    state["views"] = {"vw_corte_pagos_servicio": [servicio], "vw_corte_pagos_comisiones": [comision]}
+    result = _generate(corte_id)
+
+    assert result["total_servicio"] == 150 and result["total_comisiones"] == 30
+    assert result["pdf_path"] == f"reportes/cortes/{corte_id}.pdf"
+    table_calls = [(call.method, call.url.path) for call in calls if call.url.path.startswith("/rest/v1/")]
+    assert table_calls == [
+        ("POST", "/rest/v1/rpc/fn_crear_corte"),
+        ("GET", "/rest/v1/vw_corte_pagos_servicio"),
+        ("GET", "/rest/v1/vw_corte_pagos_servicio"),
+        ("GET", "/rest/v1/vw_corte_pagos_comisiones"),
+        ("GET", "/rest/v1/vw_corte_pagos_comisiones"),
+        ("PATCH", "/rest/v1/pagos_cortes"),
+    ]
+    upload = next(call for call in calls if call.url.path.startswith("/storage/v1/object/"))
+    assert b"%PDF-1.4" in upload.content and b"%%EOF" in upload.content
+
+
+def test_pdf_missing_rows_fails_the_job(supabase) -> None:
+    state, calls = supabase
+    corte_id = uuid4()
+    corte = {"id": str(corte_id), "fecha_inicio": "2026-10-01", "fecha_fin": "2026-10-15", "total_servicio": 150,
+             "total_comisiones": 0, "pdf_path": None, "created_at": "2026-10-16T10:00:00+00:00"}
+    servicio = {"id": str(uuid4()), "firma_id": str(uuid4()), "monto_efectivo": 100, "monto_transferencia": 50,
+                "cliente_nombre": "Ana"}
+    state["rpc"] = lambda params: httpx.Response(200, json={"corte": corte, "pagos_servicio": 2, "pagos_comisiones": 0})
+    state["views"] = {"vw_corte_pagos_servicio": [servicio]}
+
+    with pytest.raises(RuntimeError, match="incluye 1 de 2 pagos de tipo servicio"):
+        _generate(corte_id)
+    assert not any(call.url.path.startswith("/storage/v1/object/") for call in calls)
+
+
+def test_empty_range_is_a_validation_error(supabase) -> None:
+    state, _ = supabase
+    state["rpc"] = lambda params: httpx.Response(
+        400, json={"code": "P0002", "message": "No hay pagos dentro del rango seleccionado.", "details": None, "hint": None}
+    )
+    with pytest.raises(HTTPException) as exc:
+        _generate(uuid4())
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "No hay pagos dentro del rango seleccionado."
+
+
+def test_preview_reads_only_aggregates(supabase) -> None:
+    state, calls = supabase
+    rows = [
+        {"tipo": "servicio", "beneficiario_tipo": None, "beneficiario_id": None, "beneficiario_nombre": None,
+         "pagos": 3, "monto_efectivo": 100, "monto_transferencia": 50, "monto": 150},
+        {"tipo": "comision", "beneficiario_tipo": "aval", "beneficiario_id": str(uuid4()), "beneficiario_nombre": "Luis",
+         "pagos": 2, "monto_efectivo": 0, "monto_transferencia": 0, "monto": 40},
+        {"tipo": "comision", "beneficiario_tipo": "asesor", "beneficiario_id": str(uuid4()), "beneficiario_nombre": "Eva",
+         "pagos": 1, "monto_efectivo": 0, "monto_transferencia": 0, "monto": 10.5},
+    ]
+
+    state["rpc"] = lambda params: httpx.Response(200, json=rows)
+
+    async def run():
+        client = await async_client.get_async_client()
+        payload = cortes.PagoCorteCreate(fecha_inicio="2026-10-01", fecha_fin="2026-10-15")
+        return await cortes.preview_corte(client, payload)
+
+    preview = asyncio.run(run())
+
+    assert [call.url.path for call in calls] == ["/rest/v1/rpc/fn_preview_corte"]
+    assert preview.total_servicio == 150 and preview.pagos_servicio == 3
+    assert float(preview.total_comisiones) == 50.5 and preview.pagos_comisiones == 3
+    assert [grupo.beneficiario_nombre for grupo in preview.grupos] == [None, "Luis", "Eva"]
+
+
+def test_ledger_rebuild_reports_rows_and_remaining_differences(supabase) -> None:
+    state, calls = supabase
+    diferencia = {"fecha": "2026-10-03", "tipo": "comision", "beneficiario_tipo": "aval", "beneficiario_id": str(uuid4()),
+                  "ledger_pagos": 1, "real_pagos": 2, "ledger_monto": 30, "real_monto": 60}
+
+    def rpc(params):
+        if calls[-1].url.path.endswith("fn_pagos_ledger_reconstruir"):
+            return httpx.Response(200, json=12)
+        return httpx.Response(200, json=[diferencia])
+
+    state["rpc"] = rpc
+
+    async def run():
+        client = await async_client.get_async_client()
+        return await cortes.rebuild_pagos_ledger(client)
+
+    conciliacion = asyncio.run(run())
+
+    assert [call.url.path for call in calls] == [
+        "/rest/v1/rpc/fn_pagos_ledger_reconstruir",
+        "/rest/v1/rpc/fn_pagos_ledger_diferencias",
+    ]
+    assert conciliacion.renglones_reconstruidos == 12
+    assert not conciliacion.cuadra and conciliacion.diferencias[0].real_pagos == 2
+
+
+def test_regenerate_pdf_uses_the_pagos_already_in_the_corte(supabase_transport) -> None:
+    corte_id = uuid4()
+    corte = {"id": str(corte_id), "fecha_inicio": "2026-10-01", "fecha_fin": "2026-10-15", "total_servicio": 150,
+             "total_comisiones": 0, "pdf_path": None, "created_at": "2026-10-16T10:00:00+00:00"}
+    servicio = {"id": str(uuid4()), "firma_id": str(uuid4()), "monto_efectivo": 100, "monto_transferencia": 50,
+                "cliente_nombre": "Ana"}
+    views = {"vw_corte_pagos_servicio": [servicio], "vw_corte_pagos_comisiones": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.path.rsplit("/", 1)[-1]
+        if request.url.path.startswith("/storage/v1/object/"):
+            return httpx.Response(200, json={"Key": request.url.path})
+        if name == "pagos_cortes" and request.method == "GET":
+            return httpx.Response(200, json=[corte])
+        if name in views and "count=exact" in request.headers.get("prefer", ""):
+            rows = views[name]
+            return httpx.Response(200, json=rows[:1], headers={"Content-Range": f"0-0/{len(rows)}"})
+        if name in views:
+            return httpx.Response(200, json=[] if "and" in request.url.params else views[name])
+        return httpx.Response(200, json=[])
+
+    calls = supabase_transport(handler)
+
+    async def run():
+        client = await async_client.get_async_client()
+        return await cortes.regenerate_corte_pdf(client, {"corte_id": str(corte_id)})
+
+    result = asyncio.run(run())
+
+    assert result["pdf_path"] == f"reportes/cortes/{corte_id}.pdf"
+    assert not any("/rpc/" in call.url.path for call in calls)
+    patch = next(call for call in calls if call.method == "PATCH")
+    assert json.loads(patch.content) == {"pdf_path": f"reportes/cortes/{corte_id}.pdf"}
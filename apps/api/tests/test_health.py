@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 
+from apps.api.core.auth import require_admin
 from apps.api.main import app
 
 
@@ -8,3 +9,15 @@ def test_health_check() -> None:
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
+
+
+def test_diagnostics_expose_cache_counters() -> None:
+    app.dependency_overrides[require_admin] = lambda: {"id": "user-1", "role": "admin"}
+    try:
+        response = TestClient(app).get("/health/diagnostics")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    body = response.json()
+    assert {"hits", "misses", "hit_ratio"} <= set(body["role_cache"])
+    assert "bytes_served" in body["storage_cache"]
@@ -0,0 +1,71 @@
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from apps.api.core.auth import require_admin_or_asesor
+from apps.api.db.instrumentation import (
+    InstrumentedTransport,
+    assert_query_budget,
+    query_count_from_response,
+    query_stats_middleware,
+)
+from apps.api.db.schema import schema_capabilities
+from apps.api.main import app
+
+
+@pytest.fixture
+def api(supabase_transport, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[])
+
+    supabase_transport(handler)
+    # Esquema ya sondeado: el conteo no depende del orden de las pruebas.
+    monkeypatch.setitem(schema_capabilities._columns, ("table_versions", "version"), True)
+    app.dependency_overrides[require_admin_or_asesor] = lambda: {"id": "user-1", "role": "admin"}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_server_timing_reports_supabase_queries(api) -> None:
+    response = api.get("/clientes")
+    assert response.status_code == 200
+    # Consulta de versión (ETag) + listado.
+    assert query_count_from_response(response) == 2
+    assert_query_budget(response, 2)
+    with pytest.raises(AssertionError):
+        assert_query_budget(response, 1)
+
+
+def test_server_timing_without_queries() -> None:
+    response = TestClient(app).get("/health")
+    assert query_count_from_response(response) == 0
+
+
+def test_queries_during_a_streaming_body_are_logged(caplog) -> None:
+    streaming_app = FastAPI()
+    streaming_app.middleware("http")(query_stats_middleware)
+    transport = InstrumentedTransport(httpx.MockTransport(lambda request: httpx.Response(200, json=[])))
+
+    @streaming_app.get("/reporte")
+    async def reporte():
+        async def body():
+            async with httpx.AsyncClient(transport=transport, base_url="http://sb.local") as supabase:
+                for _ in range(3):
+                    await supabase.get("/rest/v1/avales")
+                    yield b"fila\n"
+
+        return StreamingResponse(body())
+
+    caplog.set_level(logging.INFO, logger="apps.api.db.instrumentation")
+    response = TestClient(streaming_app).get("/reporte")
+    assert response.text == "fila\n" * 3
+    # El header sale antes de que el cuerpo termine; el log tiene el total.
+    in_header = query_count_from_response(response)
+    assert in_header < 3
+    [message] = caplog.messages
+    assert message.startswith("GET /reporte -> 3 consultas a Supabase")
+    assert message.endswith(f"({3 - in_header} durante el cuerpo)")
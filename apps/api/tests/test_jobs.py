@@ -0,0 +1,126 @@
+import asyncio
+import json
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from apps.api.core.config import get_settings
+from apps.api.db import async_client
+from apps.api.services import jobs
+
+
+async def _echo(_client, payload):
+    if payload.get("fail"):
+        raise HTTPException(status_code=400, detail="No hay pagos dentro del rango seleccionado.")
+    return {"total": payload["monto"] * 2}
+
+
+def _use_table(monkeypatch, present: bool) -> None:
+    async def has_column(_client, table, column):
+        return present
+
+    monkeypatch.setattr(jobs, "has_column", has_column)
+
+
+def test_inline_jobs_report_result_and_errors(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "background_job_workers", 0)
+    _use_table(monkeypatch, False)
+    queue = jobs.JobQueue("prueba", _echo)
+
+    async def run():
+        client = await async_client.get_async_client()
+        ok = await queue.submit(client, {"monto": 5})
+        failed = await queue.submit(client, {"fail": True})
+        return ok, failed, await queue.get(client, ok.id)
+
+    ok, failed, fetched = asyncio.run(run())
+    assert ok.status == jobs.JOB_SUCCEEDED and ok.result == {"total": 10}
+    assert fetched is ok
+    assert failed.status == jobs.JOB_FAILED
+    assert failed.error == "No hay pagos dentro del rango seleccionado."
+
+
+def test_pending_jobs_are_resumed_after_restart(supabase_transport, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "background_job_workers", 1)
+    _use_table(monkeypatch, True)
+    job_id = str(uuid4())
+    updates: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            row = {"id": job_id, "kind": "prueba", "status": "queued", "payload": {"monto": 4}, "attempts": 0,
+                   "created_at": "2026-10-17T10:00:00+00:00"}
+            return httpx.Response(200, json=[row])
+        body = json.loads(request.content)
+        updates.append(body)
+        return httpx.Response(200, json=[{"id": job_id, **body}])
+
+    supabase_transport(handler)
+    queue = jobs.JobQueue("prueba", _echo)
+
+    async def run():
+        client = await async_client.get_async_client()
+        await queue.start(client)
+        await queue._queue.join()
+        await queue.stop()
+        return await queue.get(client, UUID(job_id))
+
+    job = asyncio.run(run())
+    assert job.status == jobs.JOB_SUCCEEDED and job.attempts == 1
+    assert updates[0]["status"] == "running" and updates[0]["attempts"] == 1
+    assert updates[-1]["status"] == "succeeded" and updates[-1]["result"] == {"total": 8}
+
+
+def test_unexpected_errors_are_retried_with_backoff(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "background_job_workers", 1)
+    monkeypatch.setattr(get_settings(), "background_job_retry_seconds", 0.01)
+    _use_table(monkeypatch, False)
+    calls: list[int] = []
+
+    async def flaky(_client, payload):
+        calls.append(len(calls) + 1)
+        if len(calls) < 2:
+            raise RuntimeError("Storage no respondió")
+        return {"total": payload["monto"]}
+
+    queue = jobs.JobQueue("prueba", flaky)
+
+    async def run():
+        client = await async_client.get_async_client()
+        job = await queue.submit(client, {"monto": 3})
+        while not job.finished:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == jobs.JOB_SUCCEEDED and job.result == {"total": 3}
+    assert job.attempts == 2 and calls == [1, 2]
+
+
+def test_failed_job_can_be_retried(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "background_job_workers", 0)
+    _use_table(monkeypatch, False)
+    outcomes = [RuntimeError("Storage no respondió"), {"total": 1}]
+
+    async def handler(_client, _payload):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    queue = jobs.JobQueue("prueba", handler)
+
+    async def run():
+        client = await async_client.get_async_client()
+        job = await queue.submit(client, {"corte_id": "c1"})
+        failed = (job.status, job.error)
+        retried = await queue.retry(client, job.id)
+        return failed, retried
+
+    (status, error), retried = asyncio.run(run())
+    assert status == jobs.JOB_FAILED and error == "Ocurrió un error inesperado al procesar el trabajo."
+    assert retried.status == jobs.JOB_SUCCEEDED and retried.attempts == 2
+    assert retried.payload == {"corte_id": "c1"}
@@ -0,0 +1,140 @@
+import re
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.api.core.auth import require_admin_or_asesor
+from apps.api.db.pagination import CREATED_AT, decode_cursor, encode_cursor
+from apps.api.main import app
+
+ROWS = [
+    {
+        "id": f"00000000-0000-0000-0000-00000000000{i}",
+        "nombre_completo": f"Cliente {i}",
+        "created_at": f"2025-01-0{i}T10:00:00+00:00",
+        "updated_at": f"2025-01-0{i}T10:00:00+00:00",
+    }
+    for i in (3, 2, 1)
+]
+
+# max-rows de PostgREST en el servidor simulado (None = sin tope).
+MAX_ROWS = None
+VERSIONS = {"clientes": 1}
+
+
+@pytest.fixture
+def api(supabase_transport):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/table_versions"):
+            return httpx.Response(200, json=[{"table_name": name, "version": v} for name, v in VERSIONS.items()])
+        rows = ROWS
+        after = re.search(r'id\.lt\."([^"]+)"', request.url.params.get("and", ""))
+        if after:
+            rows = [row for row in ROWS if row["id"] < after.group(1)]
+        limit = int(request.url.params.get("limit", len(rows)))
+        if MAX_ROWS is not None:
+            limit = min(limit, MAX_ROWS)
+        headers = {"Content-Range": f"0-{limit - 1}/{len(ROWS)}"}
+        return httpx.Response(200, json=rows[:limit], headers=headers)
+
+    requests = supabase_transport(handler)
+    app.dependency_overrides[require_admin_or_asesor] = lambda: {"id": "user-1", "role": "admin"}
+    yield TestClient(app), requests
+    app.dependency_overrides.clear()
+
+
+def test_list_without_limit_returns_everything(api) -> None:
+    client, requests = api
+    response = client.get("/clientes")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert "X-Next-Cursor" not in response.headers
+    assert requests[-1].url.params["order"] == "created_at.desc.nullslast,id.desc"
+    assert "limit" not in requests[-1].url.params
+
+
+def test_limit_sets_next_cursor_and_total(api) -> None:
+    client, requests = api
+    response = client.get("/clientes", params={"limit": 2, "count": "exact"})
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [ROWS[0]["id"], ROWS[1]["id"]]
+    assert requests[-1].url.params["limit"] == "3"
+    assert requests[-1].headers["prefer"] == "count=exact"
+    assert response.headers["X-Total-Count"] == "3"
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == (ROWS[1]["created_at"], ROWS[1]["id"])
+
+
+def test_cursor_filters_after_last_row(api) -> None:
+    client, requests = api
+    cursor = encode_cursor(CREATED_AT, ROWS[1])
+    response = client.get("/clientes", params={"limit": 2, "cursor": cursor})
+    assert response.status_code == 200
+    keyset_filter = requests[-1].url.params["and"]
+    assert keyset_filter.startswith("(or(created_at.lt.")
+    assert f'id.lt."{ROWS[1]["id"]}"' in keyset_filter
+
+
+def test_invalid_cursor_is_rejected(api) -> None:
+    client, _ = api
+    response = client.get("/clientes", params={"cursor": "no-es-un-cursor"})
+    assert response.status_code == 400
+
+
+def test_fields_projects_columns_and_response(api) -> None:
+    client, requests = api
+    response = client.get("/clientes", params={"fields": "nombre_completo", "limit": 2})
+    assert response.status_code == 200
+    assert requests[-1].url.params["select"] == "nombre_completo,created_at,id"
+    assert response.json() == [{"nombre_completo": "Cliente 3"}, {"nombre_completo": "Cliente 2"}]
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_unknown_fields_are_rejected(api) -> None:
+    client, _ = api
+    response = client.get("/clientes", params={"fields": "nombre_completo,password"})
+    assert response.status_code == 400
+
+
+def test_export_streams_every_batch(api, monkeypatch) -> None:
+    from apps.api.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "export_batch_size", 2)
+    client, requests = api
+    response = client.get("/clientes/export", params={"format": "csv", "fields": "id,nombre_completo"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "id,nombre_completo"
+    assert lines[1:] == [f"{row['id']},{row['nombre_completo']}" for row in ROWS]
+    # Dos lotes con filas y uno vacío que cierra el recorrido.
+    assert len(requests) == 3
+
+
+def test_export_survives_server_max_rows(api, monkeypatch) -> None:
+    monkeypatch.setitem(globals(), "MAX_ROWS", 1)
+    client, requests = api
+    response = client.get("/clientes/export", params={"format": "ndjson", "fields": "id"})
+    assert response.status_code == 200
+    assert len(response.text.strip().splitlines()) == len(ROWS)
+    assert requests[0].url.params["limit"] == "1000"
+
+
+def test_matching_etag_returns_not_modified(api, monkeypatch) -> None:
+    client, requests = api
+    first = client.get("/clientes")
+    etag = first.headers["ETag"]
+    calls = len(requests)
+    second = client.get("/clientes", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    # Solo se lee la versión de la tabla, no el listado.
+    assert len(requests) == calls + 1
+    assert requests[-1].url.path.endswith("/table_versions")
+    assert requests[-1].url.params["table_name"] == "in.(clientes)"
+
+    # Cualquier escritura (también un borrado) incrementa la versión y cambia el ETag.
+    monkeypatch.setitem(VERSIONS, "clientes", 2)
+    third = client.get("/clientes", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
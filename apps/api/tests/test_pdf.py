@@ -0,0 +1,175 @@
+import asyncio
+import time
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, NumberObject, StreamObject
+
+from apps.api.core.config import get_settings
+from apps.api.services import pdf
+from apps.api.services.uploads import spool_upload
+
+MAX_BYTES = 1024 * 1024
+
+
+def _encrypted_pdf(password: str) -> bytes:
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=612, height=792)
+    writer.encrypt(password)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+@pytest.fixture(params=[0, 1], ids=["threadpool", "process-pool"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(get_settings(), "pdf_process_workers", request.param)
+    yield request.param
+    pdf.shutdown_pdf_pool()
+
+
+def test_unlocks_pdf_inside_zip(workers, tmp_path) -> None:
+    source = tmp_path / "upload.zip"
+    with ZipFile(source, "w") as zip_file:
+        zip_file.writestr("reporte.pdf", _encrypted_pdf("secreto"))
+    prepared = asyncio.run(
+        pdf.run_pdf_task(pdf.prepare_uploaded_pdf, str(source), "buro.zip", "secreto", str(tmp_path), MAX_BYTES)
+    )
+    assert prepared.filename == "reporte.pdf"
+    reader = PdfReader(prepared.path)
+    assert not reader.is_encrypted
+    assert len(reader.pages) == 3
+
+
+def test_keeps_validation_errors(workers, tmp_path) -> None:
+    source = tmp_path / "upload.pdf"
+    source.write_bytes(_encrypted_pdf("secreto"))
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(pdf.run_pdf_task(pdf.prepare_uploaded_pdf, str(source), "buro.pdf", "otra", str(tmp_path), MAX_BYTES))
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "La clave del PDF es incorrecta."
+
+
+def _sleep(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def _double(value: int) -> int:
+    return value * 2
+
+
+def test_timeout_only_stops_its_own_process(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "pdf_process_workers", 2)
+    monkeypatch.setattr(get_settings(), "pdf_task_timeout_seconds", 3)
+
+    async def run():
+        return await asyncio.gather(
+            pdf.run_pdf_task(_sleep, 60), pdf.run_pdf_task(_double, 21), return_exceptions=True
+        )
+
+    try:
+        slow, fast = asyncio.run(run())
+    finally:
+        pdf.shutdown_pdf_pool()
+    assert isinstance(slow, HTTPException) and slow.status_code == 422
+    assert fast == 42
+
+
+def test_waiting_for_a_process_counts_toward_the_timeout(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "pdf_process_workers", 1)
+    monkeypatch.setattr(get_settings(), "pdf_task_timeout_seconds", 2)
+
+    async def run():
+        return await asyncio.gather(
+            pdf.run_pdf_task(_sleep, 60), pdf.run_pdf_task(_double, 21), return_exceptions=True
+        )
+
+    try:
+        started = time.monotonic()
+        slow, queued = asyncio.run(run())
+        elapsed = time.monotonic() - started
+        assert asyncio.run(pdf.run_pdf_task(_double, 4)) == 8
+    finally:
+        pdf.shutdown_pdf_pool()
+    assert isinstance(slow, HTTPException) and slow.status_code == 422
+    assert isinstance(queued, HTTPException) and queued.status_code == 422
+    assert elapsed < 4
+
+
+def test_rejects_oversized_zip_members(tmp_path) -> None:
+    source = tmp_path / "upload.zip"
+    with ZipFile(source, "w") as zip_file:
+        zip_file.writestr("reporte.pdf", b"0" * (MAX_BYTES + 1))
+    with pytest.raises(pdf.PdfProcessingError):
+        pdf.extract_pdf_file(str(source), "buro.zip", str(tmp_path), MAX_BYTES)
+
+
+def test_spool_upload_enforces_max_size(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(get_settings(), "upload_max_bytes", 10)
+    upload = UploadFile(BytesIO(b"x" * 11), filename="buro.pdf")
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(spool_upload(upload, tmp_path))
+    assert exc_info.value.status_code == 413
+
+    upload = UploadFile(BytesIO(b"x" * 10), filename="buro.PDF")
+    assert asyncio.run(spool_upload(upload, tmp_path)).read_bytes() == b"x" * 10
+
+
+def _scanned_pdf(pages: int) -> bytes:
+    # Misma imagen embebida como objeto distinto en cada página, contenido sin
+    # comprimir y una fuente declarada que nadie usa.
+    writer = PdfWriter()
+    pixels = bytes(range(256)) * 64
+    for _ in range(pages):
+        page = writer.add_blank_page(width=612, height=792)
+        image = StreamObject()
+        image.set_data(pixels)
+        image.update(
+            {
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Image"),
+                NameObject("/Width"): NumberObject(128),
+                NameObject("/Height"): NumberObject(128),
+                NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                NameObject("/BitsPerComponent"): NumberObject(8),
+            }
+        )
+        font = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)}),
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)}),
+            }
+        )
+        contents = StreamObject()
+        contents.set_data(b"q 500 0 0 500 50 150 cm /Im0 Do Q\n" * 20)
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def test_optimization_shrinks_and_keeps_pages(tmp_path) -> None:
+    source = tmp_path / "upload.pdf"
+    source.write_bytes(_scanned_pdf(5))
+    prepared = pdf.prepare_uploaded_pdf(str(source), "scan.pdf", None, str(tmp_path), MAX_BYTES, True)
+    assert prepared.original_bytes == source.stat().st_size
+    assert prepared.stored_bytes < prepared.original_bytes / 3
+    reader = PdfReader(prepared.path)
+    assert len(reader.pages) == 5
+    images = {page["/Resources"]["/XObject"].raw_get("/Im0").idnum for page in reader.pages}
+    assert len(images) == 1
+    assert all(page["/Resources"]["/Font"] == {} for page in reader.pages)
+
+    untouched = pdf.prepare_uploaded_pdf(str(source), "scan.pdf", None, str(tmp_path), MAX_BYTES, False)
+    assert untouched.path == str(source)
@@ -0,0 +1,200 @@
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.api.core.auth import require_admin_or_asesor
+from apps.api.core.cache import DiskLRUCache
+from apps.api.core.config import get_settings
+from apps.api.main import app
+from apps.api.routers.storage import MAX_SIGN_BATCH
+from apps.api.services import storage as storage_service
+from apps.api.services.storage import create_storage_token, parse_byte_range, verify_storage_token
+
+PDF = bytes(range(256)) * 8
+ETAG = '"0f343b0931126a20f133d67c2b018a3b"'
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[require_admin_or_asesor] = lambda: {"id": "user-1", "role": "admin"}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_sign_batch_returns_tokens_and_per_item_errors(client) -> None:
+    payload = {
+        "items": [
+            {"path": "avales/1/ine.pdf"},
+            {"path": "../secreto.pdf"},
+            {"path": "avales/1/comprobante.pdf", "bucket": "otro"},
+            {"path": "/documentos-aval/avales/1/acta.pdf", "expires_in": 600},
+            {"path": "avales/1/curp.pdf", "expires_in": 10},
+        ]
+    }
+    response = client.post("/storage/sign-batch", json=payload)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3, 4]
+    assert items[1]["error"] == "Ruta de almacenamiento inválida."
+    assert items[2]["error"] == "Bucket no permitido."
+    assert items[1]["token"] is None
+    assert verify_storage_token(items[0]["token"]) == ("documentos-aval", "avales/1/ine.pdf")
+    assert items[3]["path"] == "avales/1/acta.pdf"
+    assert items[3]["url"].endswith(items[3]["token"])
+    assert items[4]["error"] == "expires_in debe estar entre 60 y 86400 segundos."
+    assert items[4]["url"] is None
+
+
+def test_sign_batch_rejects_oversized_batches(client) -> None:
+    items = [{"path": f"avales/1/{index}.pdf"} for index in range(MAX_SIGN_BATCH + 1)]
+    assert client.post("/storage/sign-batch", json={"items": items}).status_code == 422
+
+
+@pytest.fixture
+def storage(supabase_transport, monkeypatch, tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/object/documentos-aval/avales/1/ine.pdf"):
+            return httpx.Response(400, json={"error": "not_found"})
+        if request.headers.get("if-none-match") == ETAG:
+            return httpx.Response(304, headers={"ETag": ETAG})
+        header = request.headers.get("range")
+        if header is None:
+            return httpx.Response(200, content=PDF, headers={"ETag": ETAG})
+        start, end = parse_byte_range(header).removeprefix("bytes=").split("-")
+        if int(start) >= len(PDF):
+            return httpx.Response(416, headers={"Content-Range": f"bytes */{len(PDF)}"})
+        end = min(int(end or len(PDF) - 1), len(PDF) - 1)
+        chunk = PDF[int(start) : end + 1]
+        return httpx.Response(206, content=chunk, headers={"Content-Range": f"bytes {start}-{end}/{len(PDF)}"})
+
+    requests = supabase_transport(handler)
+    monkeypatch.setattr(storage_service, "_object_cache", DiskLRUCache(tmp_path, max_bytes=3 * len(PDF), max_entry_bytes=len(PDF)))
+    token, _, _ = create_storage_token("documentos-aval", "avales/1/ine.pdf")
+    return TestClient(app), requests, f"/storage/proxy?token={token}"
+
+
+def test_parse_byte_range_accepts_single_ranges_only() -> None:
+    assert parse_byte_range("bytes=0-99") == "bytes=0-99"
+    assert parse_byte_range("bytes=100-") == "bytes=100-"
+    assert parse_byte_range("bytes=-500") == "bytes=-500"
+    assert parse_byte_range("bytes=0-1,5-9") is None
+    assert parse_byte_range("bytes=9-1") is None
+    assert parse_byte_range("items=0-1") is None
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_proxy_forwards_ranges(storage, monkeypatch, streaming) -> None:
+    client, requests, url = storage
+    monkeypatch.setattr(get_settings(), "storage_proxy_streaming", streaming)
+    response = client.get(url, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == PDF[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(PDF)}"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["x-cache"] == "MISS"
+    assert requests[-1].headers["range"] == "bytes=10-19"
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == PDF
+    assert full.headers["content-type"] == "application/pdf"
+
+
+def test_proxy_reports_unsatisfiable_ranges(storage) -> None:
+    client, _, url = storage
+    response = client.get(url, headers={"Range": f"bytes={len(PDF)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(PDF)}"
+
+
+def test_proxy_serves_repeat_views_from_disk_cache(storage) -> None:
+    client, requests, url = storage
+    assert client.get(url).content == PDF
+    assert client.get(url).content == PDF
+    partial = client.get(url, headers={"Range": "bytes=-16"})
+    assert partial.status_code == 206
+    assert partial.content == PDF[-16:]
+    assert partial.headers["content-range"] == f"bytes {len(PDF) - 16}-{len(PDF) - 1}/{len(PDF)}"
+    assert len(requests) == 1
+
+    stats = storage_service.storage_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["bytes_served"] == len(PDF) + 16
+
+    storage_service.invalidate_storage_object("documentos-aval", "avales/1/ine.pdf")
+    assert client.get(url).content == PDF
+    assert len(requests) == 2
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = DiskLRUCache(tmp_path, max_bytes=10, max_entry_bytes=6)
+    for key in ("a", "b"):
+        writer = cache.writer(key)
+        writer.write(b"12345")
+        writer.commit()
+    cache.open("a").file.close()
+    writer = cache.writer("c")
+    writer.write(b"123")
+    writer.commit()
+    assert cache.open("b") is None
+    assert cache.open("a") is not None
+    oversized = cache.writer("d")
+    oversized.write(b"1234567")
+    oversized.commit()
+    assert cache.open("d") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def _freeze_clock(monkeypatch, timestamp: int) -> None:
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(timestamp, tz)
+
+    monkeypatch.setattr(storage_service, "datetime", FrozenDatetime)
+
+
+def test_tokens_are_stable_within_a_window(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "storage_token_window_seconds", 0)
+    token, _, _ = create_storage_token("documentos-aval", "avales/1/ine.pdf", 600)
+    assert verify_storage_token(token) == ("documentos-aval", "avales/1/ine.pdf")
+
+    monkeypatch.setattr(get_settings(), "storage_token_window_seconds", 3600)
+    _freeze_clock(monkeypatch, 1_800_000_000)
+    first = create_storage_token("documentos-aval", "avales/1/ine.pdf", 7200)
+    _freeze_clock(monkeypatch, 1_800_000_300)
+    second = create_storage_token("documentos-aval", "/avales/1/ine.pdf", 7200)
+    assert first == second
+    # El vencimiento se alinea hacia abajo: nunca supera el ttl pedido.
+    assert datetime.fromisoformat(first[2]).timestamp() <= 1_800_000_000 + 7200
+    # Con un ttl menor que la ventana se respeta el mínimo desde ahora.
+    _, _, short = create_storage_token("documentos-aval", "avales/1/ine.pdf", 60)
+    assert datetime.fromisoformat(short).timestamp() == 1_800_000_300 + 60
+
+
+def test_token_signed_before_a_window_boundary_keeps_half_its_ttl(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "storage_token_window_seconds", 3600)
+    signed_at = 1_800_000_000 + 3600 - 1
+    _freeze_clock(monkeypatch, signed_at)
+    _, _, expires_at = create_storage_token("documentos-aval", "avales/1/ine.pdf", 3600)
+    remaining = datetime.fromisoformat(expires_at).timestamp() - signed_at
+    assert 1800 <= remaining <= 3600
+
+
+def test_proxy_honors_if_none_match(storage) -> None:
+    client, requests, url = storage
+    # Sin caché local la validación se delega a Storage.
+    upstream = client.get(url, headers={"If-None-Match": ETAG})
+    assert upstream.status_code == 304
+    assert upstream.headers["etag"] == ETAG
+
+    full = client.get(url)
+    assert full.headers["etag"] == ETAG
+    cached = client.get(url, headers={"If-None-Match": f"W/{ETAG}"})
+    assert cached.status_code == 304
+    assert cached.headers["x-cache"] == "HIT"
+    assert cached.content == b""
+    assert len(requests) == 2
@@ -2,7 +2,7 @@ import { Metadata } from "next";
 
 import { DocumentosPublicosClient } from "@/components/public/documentos-publicos-client";
 import { env } from "@/lib/env";
-import { PublicAval, PublicDocumento } from "@/lib/types";
+import { PublicEnTurno } from "@/lib/types";
 
 export const metadata: Metadata = {
   title: "Documentos públicos | Aval-manager",
@@ -19,10 +19,7 @@ async function fetchPublicResource<T>(path: string): Promise<T | null> {
 }
 
 export default async function DocumentosPublicosPage() {
-  const [aval, documentos] = await Promise.all([
-    fetchPublicResource<PublicAval | null>("public/avales/en-turno"),
-    fetchPublicResource<PublicDocumento[]>("public/documentos/en-turno"),
-  ]);
+  const enTurno = await fetchPublicResource<PublicEnTurno>("public/en-turno");
 
-  return <DocumentosPublicosClient initialAval={aval ?? null} initialDocuments={documentos ?? []} />;
+  return <DocumentosPublicosClient initialAval={enTurno?.aval ?? null} initialDocuments={enTurno?.documentos ?? []} />;
 }
@@ -30,10 +30,10 @@ export function AsesoresManager() {
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editing, setEditing] = useState<Asesor | null>(null);
 
-  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => api("asesores") });
+  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => api("asesores", { allPages: true }) });
   const { data: pagosComision } = useQuery({
     queryKey: ["pagos-comisiones"],
-    queryFn: () => pagosComisionApi("pagos-comisiones"),
+    queryFn: () => pagosComisionApi("pagos-comisiones", { allPages: true }),
   });
 
   const totalComisiones = useMemo(
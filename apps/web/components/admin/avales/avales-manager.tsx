@@ -25,8 +25,9 @@ import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Skeleton } from "@/components/ui/skeleton";
 import { DocumentGallery } from "@/components/documentos/document-gallery";
-import { useApi } from "@/hooks/use-api";
-import { useStorageProxy } from "@/hooks/use-storage-proxy";
+import { useApi, useDocumentUpload } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
+import { useStorageProxyBatch } from "@/hooks/use-storage-proxy";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { env } from "@/lib/env";
 import { avalSchema } from "@/lib/schemas";
@@ -187,9 +188,9 @@ const formatAvailabilityRange = (start: string, end: string) => {
 
 export function AvalesManager() {
   const queryClient = useQueryClient();
-  const { session, supabaseClient } = useSessionContext();
-  const api = useApi<Aval[]>();
+  const { session } = useSessionContext();
   const apiSingle = useApi<Aval>();
+  const uploadDocument = useDocumentUpload();
   const disponibilidadApi = useApi<Disponibilidad[]>();
 
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -210,9 +211,9 @@ export function AvalesManager() {
   const [documentGalleryItems, setDocumentGalleryItems] = useState<
     Array<{ id: string; tipo: string; archivo_path: string; created_at: string; notas: null; signed_url?: string | null }>
   >([]);
-  const getStorageUrl = useStorageProxy();
+  const getStorageUrls = useStorageProxyBatch();
 
-  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => api("avales") });
+  const { rows: avales, loadMore: avalesLoadMore } = usePagedList<Aval>(["avales"], "avales");
   const {
     data: availabilityData,
     isLoading: availabilityLoading,
@@ -374,18 +375,11 @@ export function AvalesManager() {
         return;
       }
 
-      const entries = await Promise.all(
-        documentFields.map(async (field) => {
-          const path = editing[field.name];
-          if (!path) return [field.name, null];
-          try {
-            const url = await getStorageUrl(path, BUCKET);
-            return [field.name, url];
-          } catch {
-            return [field.name, null];
-          }
-        })
+      const urls = await getStorageUrls(
+        documentFields.map((field) => editing[field.name]),
+        BUCKET
       );
+      const entries = documentFields.map((field, index) => [field.name, urls[index]]);
 
       if (active) {
         setExistingLinks(Object.fromEntries(entries) as Record<DocumentFieldName, string | null>);
@@ -401,7 +395,7 @@ export function AvalesManager() {
     return () => {
       active = false;
     };
-  }, [editing, getStorageUrl]);
+  }, [editing, getStorageUrls]);
 
   const handleDelete = async (aval: Aval) => {
     if (!confirm(`¿Eliminar el aval "${aval.nombre_completo}"?`)) return;
@@ -417,15 +411,6 @@ export function AvalesManager() {
     }
   };
 
-  const sanitizeFileName = (filename: string) => {
-    const lower = filename.toLowerCase().trim();
-    const normalized = lower.normalize("NFD").replace(/[\u0300-\u036f]/g, "");
-    const replaced = normalized.replace(/[^a-z0-9.]+/g, "-");
-    const collapsed = replaced.replace(/-+/g, "-");
-    const cleaned = collapsed.replace(/^-|-$/g, "");
-    return cleaned || `archivo-${Date.now()}`;
-  };
-
   const resetWeeklyAvailability = () => {
     setWeeklyAvailability(createEmptyWeeklyAvailability());
     setWeekReference(defaultWeekReference());
@@ -573,25 +558,17 @@ const addSlot = (day: DayKey) => {
   };
 
   const uploadDocuments = async (avalId: string) => {
-    if (!supabaseClient) {
-      throw new Error("Supabase no disponible para subir archivos");
-    }
     const updates: Partial<Record<DocumentFieldName, string>> = {};
     for (const field of documentFields) {
       if (field.name === "buro_credito_url") continue;
       const file = files[field.name];
       if (file) {
-        const timestamp = Date.now();
-        const sanitizedName = sanitizeFileName(file.name);
-        const path = `avales/${avalId}/${field.name}/${timestamp}-${sanitizedName}`;
-        const { error } = await supabaseClient.storage.from(BUCKET).upload(path, file, {
-          cacheControl: "3600",
-          upsert: true,
-        });
-        if (error) {
-          throw new Error(`Error subiendo ${field.label}: ${error.message}`);
+        try {
+          const { path } = await uploadDocument("avales", avalId, field.name, file);
+          updates[field.name] = path;
+        } catch (error) {
+          throw new Error(`Error subiendo ${field.label}: ${error instanceof Error ? error.message : error}`);
         }
-        updates[field.name] = path;
       }
     }
     return updates;
@@ -739,16 +716,16 @@ const addSlot = (day: DayKey) => {
         setDocumentGalleryItems(items);
       }
 
-      const enriched = await Promise.all(
-        items.map(async (item) => {
-          try {
-            const url = await getStorageUrl(item.archivo_path, BUCKET);
-            return { ...item, signed_url: url };
-          } catch {
-            return { ...item, signed_url: null };
-          }
-        })
-      );
+      let urls: Array<string | null>;
+      try {
+        urls = await getStorageUrls(
+          items.map((item) => item.archivo_path),
+          BUCKET
+        );
+      } catch {
+        urls = items.map(() => null);
+      }
+      const enriched = items.map((item, index) => ({ ...item, signed_url: urls[index] }));
 
       if (active) {
         setDocumentGalleryItems(enriched);
@@ -764,7 +741,7 @@ const addSlot = (day: DayKey) => {
     return () => {
       active = false;
     };
-  }, [selectedAval, getStorageUrl]);
+  }, [selectedAval, getStorageUrls]);
 
   return (
     <div className="space-y-6">
@@ -1108,6 +1085,7 @@ const addSlot = (day: DayKey) => {
           <DataTable
             columns={columns}
             data={avales ?? []}
+            loadMore={avalesLoadMore}
             searchKey="nombre_completo"
             searchPlaceholder="Buscar por nombre"
             onRowClick={(aval) => setSelectedAvalId(aval.id)}
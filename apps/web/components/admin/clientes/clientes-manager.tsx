@@ -3,7 +3,6 @@
 import { useEffect, useMemo, useState } from "react";
 import { ColumnDef } from "@tanstack/react-table";
 import { useMutation, useQueries, useQuery, useQueryClient } from "@tanstack/react-query";
-import { useSessionContext } from "@supabase/auth-helpers-react";
 import { z } from "zod";
 import { toast } from "sonner";
 
@@ -21,7 +20,8 @@ import {
   DialogTrigger,
 } from "@/components/ui/dialog";
 import { Input } from "@/components/ui/input";
-import { useApi } from "@/hooks/use-api";
+import { useApi, useDocumentUpload } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { useStorageProxy } from "@/hooks/use-storage-proxy";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { clienteSchema } from "@/lib/schemas";
@@ -72,20 +72,19 @@ const ensureConocidos = (refs?: z.infer<typeof schema>["referencias_conocidos"])
 
 export function ClientesManager() {
   const queryClient = useQueryClient();
-  const api = useApi<Cliente[]>();
   const apiSingle = useApi<Cliente>();
   const documentosApi = useApi<Documento[]>();
   const firmasApi = useApi<Firma[]>();
-  const { supabaseClient } = useSessionContext();
+  const uploadDocument = useDocumentUpload();
   const getStorageUrl = useStorageProxy();
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editing, setEditing] = useState<Cliente | null>(null);
   const [selectedClienteId, setSelectedClienteId] = useState<string | null>(null);
   const [identificacionFile, setIdentificacionFile] = useState<File | null>(null);
 
-  const { data: clientes } = useQuery({ queryKey: ["clientes"], queryFn: () => api("clientes") });
+  const { rows: clientes, loadMore: clientesLoadMore } = usePagedList<Cliente>(["clientes"], "clientes");
   const [{ data: firmas }] = useQueries({
-    queries: [{ queryKey: ["firmas"], queryFn: () => firmasApi("firmas") }],
+    queries: [{ queryKey: ["firmas"], queryFn: () => firmasApi("firmas", { allPages: true }) }],
   });
 
   const { data: documentosCliente, isFetching: docsLoading } = useQuery({
@@ -135,25 +134,13 @@ export function ClientesManager() {
       if (editing) {
         const updated = await apiSingle(`clientes/${editing.id}`, { method: "PUT", body: JSON.stringify(payload) });
         if (identificacionFile) {
-          const newPath = await uploadIdentificacion(editing.id);
-          if (newPath) {
-            await apiSingle(`clientes/${editing.id}`, {
-              method: "PUT",
-              body: JSON.stringify({ identificacion_oficial_url: newPath }),
-            });
-          }
+          await uploadIdentificacion(editing.id);
         }
         return updated;
       }
       const created = await apiSingle("clientes", { method: "POST", body: JSON.stringify(payload) });
       if (created?.id && identificacionFile) {
-        const newPath = await uploadIdentificacion(created.id);
-        if (newPath) {
-          await apiSingle(`clientes/${created.id}`, {
-            method: "PUT",
-            body: JSON.stringify({ identificacion_oficial_url: newPath }),
-          });
-        }
+        await uploadIdentificacion(created.id);
       }
       return created;
     },
@@ -212,24 +199,15 @@ export function ClientesManager() {
     }
   };
 
-  const sanitizeFileName = (filename: string) => {
-    const normalized = filename.normalize("NFD").replace(/[\u0300-\u036f]/g, "");
-    const cleaned = normalized.replace(/[^a-zA-Z0-9._-]+/g, "-").replace(/-+/g, "-");
-    return cleaned.toLowerCase();
-  };
-
+  // La API guarda el archivo y actualiza identificacion_oficial_url del cliente.
   const uploadIdentificacion = async (clienteId: string) => {
-    if (!identificacionFile || !supabaseClient) return null;
-    const sanitized = sanitizeFileName(identificacionFile.name);
-    const path = `clientes/${clienteId}/identificacion/${Date.now()}-${sanitized}`;
-    const { error } = await supabaseClient.storage.from(CLIENTES_BUCKET).upload(path, identificacionFile, {
-      cacheControl: "3600",
-      upsert: true,
-    });
-    if (error) {
-      throw new Error(`Error subiendo identificación: ${error.message}`);
+    if (!identificacionFile) return null;
+    try {
+      const { path } = await uploadDocument("clientes", clienteId, "identificacion_oficial_url", identificacionFile);
+      return path;
+    } catch (error) {
+      throw new Error(`Error subiendo identificación: ${error instanceof Error ? error.message : error}`);
     }
-    return path;
   };
 
   const openIdentificacion = async (path: string) => {
@@ -513,6 +491,7 @@ export function ClientesManager() {
         <DataTable
           columns={columns}
           data={clientes ?? []}
+          loadMore={clientesLoadMore}
           searchKey="nombre_completo"
           searchPlaceholder="Buscar por nombre"
           onRowClick={(cliente) => setSelectedClienteId(cliente.id)}
@@ -2,7 +2,7 @@
 
 import { useMemo, useState } from "react";
 import { ColumnDef } from "@tanstack/react-table";
-import { useMutation, useQueries, useQuery, useQueryClient } from "@tanstack/react-query";
+import { useMutation, useQueries, useQueryClient } from "@tanstack/react-query";
 import { z } from "zod";
 import { toast } from "sonner";
 
@@ -21,6 +21,7 @@ import {
 import { Input } from "@/components/ui/input";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { useApi } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { contratoSchema } from "@/lib/schemas";
 import { Cliente, Contrato, Aval, Propiedad } from "@/lib/types";
@@ -30,7 +31,6 @@ const schema = contratoSchema.omit({ id: true });
 
 export function ContratosManager() {
   const queryClient = useQueryClient();
-  const api = useApi<Contrato[]>();
   const apiSingle = useApi<Contrato>();
   const avalesApi = useApi<Aval[]>();
   const clientesApi = useApi<Cliente[]>();
@@ -39,13 +39,13 @@ export function ContratosManager() {
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editing, setEditing] = useState<Contrato | null>(null);
 
-  const { data: contratos } = useQuery({ queryKey: ["contratos"], queryFn: () => api("contratos") });
+  const { rows: contratos, loadMore: contratosLoadMore } = usePagedList<Contrato>(["contratos"], "contratos");
 
   const [{ data: avales }, { data: clientes }, { data: propiedades }] = useQueries({
     queries: [
-      { queryKey: ["avales"], queryFn: () => avalesApi("avales") },
-      { queryKey: ["clientes"], queryFn: () => clientesApi("clientes") },
-      { queryKey: ["propiedades"], queryFn: () => propiedadesApi("propiedades") },
+      { queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) },
+      { queryKey: ["clientes"], queryFn: () => clientesApi("clientes", { allPages: true }) },
+      { queryKey: ["propiedades"], queryFn: () => propiedadesApi("propiedades", { allPages: true }) },
     ],
   });
 
@@ -307,6 +307,7 @@ export function ContratosManager() {
       <DataTable
         columns={columns}
         data={contratos ?? []}
+        loadMore={contratosLoadMore}
         searchKey="estado"
         searchPlaceholder="Filtrar por estado"
       />
@@ -2,7 +2,7 @@
 
 import { useState } from "react";
 import { ColumnDef } from "@tanstack/react-table";
-import { useMutation, useQueries, useQuery, useQueryClient } from "@tanstack/react-query";
+import { useMutation, useQueries, useQueryClient } from "@tanstack/react-query";
 import { z } from "zod";
 import { toast } from "sonner";
 
@@ -23,6 +23,7 @@ import { Label } from "@/components/ui/label";
 import { Checkbox } from "@/components/ui/checkbox";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { useApi } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { disponibilidadSchema } from "@/lib/schemas";
 import { Aval, Disponibilidad } from "@/lib/types";
@@ -32,19 +33,18 @@ const schema = disponibilidadSchema.omit({ id: true });
 
 export function DisponibilidadesManager() {
   const queryClient = useQueryClient();
-  const api = useApi<Disponibilidad[]>();
   const apiSingle = useApi<Disponibilidad>();
   const avalesApi = useApi<Aval[]>();
 
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editing, setEditing] = useState<Disponibilidad | null>(null);
 
-  const { data: disponibilidades } = useQuery({
-    queryKey: ["disponibilidades"],
-    queryFn: () => api("disponibilidades"),
-  });
+  const { rows: disponibilidades, loadMore: disponibilidadesLoadMore } = usePagedList<Disponibilidad>(
+    ["disponibilidades"],
+    "disponibilidades"
+  );
   const [{ data: avales }] = useQueries({
-    queries: [{ queryKey: ["avales"], queryFn: () => avalesApi("avales") }],
+    queries: [{ queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) }],
   });
 
   const form = useZodForm(schema, {
@@ -214,6 +214,7 @@ export function DisponibilidadesManager() {
       <DataTable
         columns={columns}
         data={disponibilidades ?? []}
+        loadMore={disponibilidadesLoadMore}
         searchKey="recurrente"
         searchPlaceholder="Filtrar por aval o estado"
       />
@@ -25,7 +25,7 @@ import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { Textarea } from "@/components/ui/textarea";
-import { useApi } from "@/hooks/use-api";
+import { useApi, useDocumentUpload } from "@/hooks/use-api";
 import { useStorageProxy } from "@/hooks/use-storage-proxy";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { getRoleFromSession, isAdminRole, isAdvisorRole } from "@/lib/auth";
@@ -47,7 +47,6 @@ const asesorInlineSchema = z.object({
     .or(z.literal("")),
 });
 const BUCKET = "documentos-aval";
-const CLIENTE_BUCKET = "documentos-aval";
 const FILE_FIELDS = [
   { name: "solicitud_aval_url", label: "Solicitud de aval (PDF o imagen)", accept: "application/pdf,image/*" },
 ] as const;
@@ -111,7 +110,7 @@ function FormSection({ title, description, children }: FormSectionProps) {
 
 export function FirmasManager() {
   const queryClient = useQueryClient();
-  const { supabaseClient, session } = useSessionContext();
+  const { session } = useSessionContext();
   const router = useRouter();
   const api = useApi<Firma[]>();
   const apiSingle = useApi<Firma>();
@@ -122,6 +121,7 @@ export function FirmasManager() {
   const inmobiliariasApi = useApi<Inmobiliaria[]>();
   const inmobiliariaSingleApi = useApi<Inmobiliaria>();
   const clienteSingleApi = useApi<Cliente>();
+  const uploadDocument = useDocumentUpload();
   const getStorageUrl = useStorageProxy();
 
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -189,10 +189,10 @@ export function FirmasManager() {
   const role = getRoleFromSession(session);
   const isAdmin = isAdminRole(role);
   const isAdvisor = isAdvisorRole(role);
-  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => api("firmas") });
-  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales") });
-  const { data: clientes } = useQuery({ queryKey: ["clientes"], queryFn: () => clientesApi("clientes") });
-  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => asesoresApi("asesores") });
+  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => api("firmas", { allPages: true }) });
+  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) });
+  const { data: clientes } = useQuery({ queryKey: ["clientes"], queryFn: () => clientesApi("clientes", { allPages: true }) });
+  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => asesoresApi("asesores", { allPages: true }) });
   const { data: currentAsesor, isLoading: isLoadingCurrentAsesor } = useQuery({
     queryKey: ["asesores", "me"],
     queryFn: () => asesorSingleApi("asesores/me"),
@@ -202,7 +202,7 @@ export function FirmasManager() {
   });
   const { data: inmobiliarias } = useQuery({
     queryKey: ["inmobiliarias"],
-    queryFn: () => inmobiliariasApi("inmobiliarias"),
+    queryFn: () => inmobiliariasApi("inmobiliarias", { allPages: true }),
   });
   const avalesMap = useMemo(() => new Map((avales ?? []).map((aval) => [aval.id, aval])), [avales]);
   const asesoresMap = useMemo(() => new Map((asesores ?? []).map((asesor) => [asesor.id, asesor])), [asesores]);
@@ -300,22 +300,13 @@ export function FirmasManager() {
       };
       const created = await clienteSingleApi("clientes", { method: "POST", body: JSON.stringify(payload) });
 
-      if (created?.id && clienteFile && supabaseClient) {
-        const timestamp = Date.now();
-        const sanitized = sanitizeFileName(clienteFile.name);
-        const path = `clientes/${created.id}/identificacion/${timestamp}-${sanitized}`;
-        const { error } = await supabaseClient.storage.from(CLIENTE_BUCKET).upload(path, clienteFile, {
-          cacheControl: "3600",
-          upsert: true,
-        });
-        if (error) {
-          throw new Error(`Error subiendo identificación: ${error.message}`);
+      if (created?.id && clienteFile) {
+        try {
+          const { path } = await uploadDocument("clientes", created.id, "identificacion_oficial_url", clienteFile);
+          created.identificacion_oficial_url = path;
+        } catch (error) {
+          throw new Error(`Error subiendo identificación: ${error instanceof Error ? error.message : error}`);
         }
-        await clienteSingleApi(`clientes/${created.id}`, {
-          method: "PUT",
-          body: JSON.stringify({ identificacion_oficial_url: path }),
-        });
-        created.identificacion_oficial_url = path;
       }
 
       return created;
@@ -410,32 +401,17 @@ export function FirmasManager() {
     setSelectedAsesorId(advisorLocked && currentAsesor ? currentAsesor.id : "");
   };
 
-  const sanitizeFileName = (filename: string) => {
-    const lower = filename.toLowerCase().trim();
-    const normalized = lower.normalize("NFD").replace(/[\u0300-\u036f]/g, "");
-    const replaced = normalized.replace(/[^a-z0-9.]+/g, "-");
-    const collapsed = replaced.replace(/-+/g, "-");
-    const cleaned = collapsed.replace(/^-|-$/g, "");
-    return cleaned || `archivo-${Date.now()}`;
-  };
-
   const uploadFiles = async (firmaId: string) => {
-    if (!supabaseClient) throw new Error("Supabase no disponible para subir archivos");
     const updates: Partial<Record<FileFieldName, string>> = {};
     for (const field of FILE_FIELDS) {
       const file = files[field.name];
       if (!file) continue;
-      const timestamp = Date.now();
-      const sanitized = sanitizeFileName(file.name);
-      const path = `firmas/${firmaId}/${field.name}/${timestamp}-${sanitized}`;
-      const { error } = await supabaseClient.storage.from(BUCKET).upload(path, file, {
-        cacheControl: "3600",
-        upsert: true,
-      });
-      if (error) {
-        throw new Error(`Error subiendo ${field.label}: ${error.message}`);
+      try {
+        const { path } = await uploadDocument("firmas", firmaId, field.name, file);
+        updates[field.name] = path;
+      } catch (error) {
+        throw new Error(`Error subiendo ${field.label}: ${error instanceof Error ? error.message : error}`);
       }
-      updates[field.name] = path;
     }
     return updates;
   };
@@ -40,7 +40,7 @@ const dateFormatter = new Intl.DateTimeFormat("es-MX", { dateStyle: "medium", ti
 
 function useFirmasList() {
   const api = useApi<Firma[]>();
-  return useQuery({ queryKey: ["firmas"], queryFn: () => api("firmas") });
+  return useQuery({ queryKey: ["firmas"], queryFn: () => api("firmas", { allPages: true }) });
 }
 
 export function FirmasWorkspace() {
@@ -115,7 +115,7 @@ function ContractsFromFirmas() {
   const { data, isLoading } = useFirmasList();
   const firmas = data ?? [];
   const avalesApi = useApi<Aval[]>();
-  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales") });
+  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) });
   const avalesMap = useMemo(() => new Map((avales ?? []).map((aval) => [aval.id, aval])), [avales]);
 
   if (isLoading) {
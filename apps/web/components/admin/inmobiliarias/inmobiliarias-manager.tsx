@@ -21,6 +21,7 @@ import {
 import { Input } from "@/components/ui/input";
 import { Badge } from "@/components/ui/badge";
 import { useApi } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { inmobiliariaSchema } from "@/lib/schemas";
 import { Aval, Firma, Inmobiliaria } from "@/lib/types";
@@ -29,7 +30,6 @@ const schema = inmobiliariaSchema.omit({ id: true });
 
 export function InmobiliariasManager() {
   const queryClient = useQueryClient();
-  const api = useApi<Inmobiliaria[]>();
   const apiSingle = useApi<Inmobiliaria>();
   const firmasApi = useApi<Firma[]>();
   const avalesApi = useApi<Aval[]>();
@@ -37,9 +37,12 @@ export function InmobiliariasManager() {
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editing, setEditing] = useState<Inmobiliaria | null>(null);
 
-  const { data: inmobiliarias } = useQuery({ queryKey: ["inmobiliarias"], queryFn: () => api("inmobiliarias") });
-  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => firmasApi("firmas") });
-  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales") });
+  const { rows: inmobiliarias, loadMore: inmobiliariasLoadMore } = usePagedList<Inmobiliaria>(
+    ["inmobiliarias"],
+    "inmobiliarias"
+  );
+  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => firmasApi("firmas", { allPages: true }) });
+  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) });
 
   const avalesMap = useMemo(() => new Map((avales ?? []).map((aval) => [aval.id, aval])), [avales]);
 
@@ -218,6 +221,7 @@ export function InmobiliariasManager() {
         <DataTable
           columns={columns}
           data={inmobiliarias ?? []}
+          loadMore={inmobiliariasLoadMore}
           searchKey="nombre"
           searchPlaceholder="Buscar inmobiliaria"
         />
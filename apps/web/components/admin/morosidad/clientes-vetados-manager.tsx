@@ -55,13 +55,13 @@ export function ClientesVetadosManager() {
         params.append("estatus", estatusFilter);
       }
       const queryString = params.toString();
-      return api(queryString ? `clientes-morosidad?${queryString}` : "clientes-morosidad");
+      return api(queryString ? `clientes-morosidad?${queryString}` : "clientes-morosidad", { allPages: true });
     },
   });
 
   const { data: clientes } = useQuery({
     queryKey: ["clientes-simple"],
-    queryFn: () => clientesApi("clientes"),
+    queryFn: () => clientesApi("clientes", { allPages: true }),
   });
 
   const clientesMap = useMemo(() => new Map((clientes ?? []).map((cliente) => [cliente.id, cliente])), [clientes]);
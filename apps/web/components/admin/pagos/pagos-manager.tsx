@@ -26,10 +26,11 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { Badge } from "@/components/ui/badge";
 import { Label } from "@/components/ui/label";
 import { useApi } from "@/hooks/use-api";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { useStorageProxy } from "@/hooks/use-storage-proxy";
 import { useZodForm } from "@/hooks/use-zod-form";
 import { pagoComisionSchema, pagoServicioFormSchema } from "@/lib/schemas";
-import { Asesor, Aval, Firma, PagoCorte, PagoComision, PagoServicio } from "@/lib/types";
+import { Asesor, Aval, CorteJob, CortePreview, Firma, PagoCorte, PagoComision, PagoServicio } from "@/lib/types";
 import { toDateTimeLocal, toISOFromLocal } from "@/lib/utils";
 
 const servicioSchema = pagoServicioFormSchema;
@@ -39,6 +40,8 @@ const currencyFormatter = new Intl.NumberFormat("es-MX", { style: "currency", cu
 const dateFormatter = new Intl.DateTimeFormat("es-MX", { dateStyle: "medium", timeStyle: "short" });
 const STORAGE_BUCKET = "documentos-aval";
 const formatStatus = (value: string) => value.charAt(0).toUpperCase() + value.slice(1);
+const CORTE_POLL_INTERVAL_MS = 1500;
+const wait = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
 
 export function PagosManager() {
   const queryClient = useQueryClient();
@@ -55,25 +58,22 @@ export function PagosManager() {
   const pagoServicioSingle = useApi<PagoServicio>();
   const pagosComisionApi = useApi<PagoComision[]>();
   const pagoComisionSingle = useApi<PagoComision>();
-  const cortesApi = useApi<PagoCorte[]>();
-  const corteSingle = useApi<PagoCorte>();
+  const corteJobApi = useApi<CorteJob>();
+  const cortePreviewApi = useApi<CortePreview>();
   const getStorageUrl = useStorageProxy();
 
-  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => firmasApi("firmas") });
-  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales") });
-  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => asesoresApi("asesores") });
+  const { data: firmas } = useQuery({ queryKey: ["firmas"], queryFn: () => firmasApi("firmas", { allPages: true }) });
+  const { data: avales } = useQuery({ queryKey: ["avales"], queryFn: () => avalesApi("avales", { allPages: true }) });
+  const { data: asesores } = useQuery({ queryKey: ["asesores"], queryFn: () => asesoresApi("asesores", { allPages: true }) });
   const { data: pagosServicio } = useQuery({
     queryKey: ["pagos-servicio"],
-    queryFn: () => pagosServicioApi("pagos-servicio"),
+    queryFn: () => pagosServicioApi("pagos-servicio", { allPages: true }),
   });
   const { data: pagosComision } = useQuery({
     queryKey: ["pagos-comisiones"],
-    queryFn: () => pagosComisionApi("pagos-comisiones"),
-  });
-  const { data: cortes } = useQuery({
-    queryKey: ["pagos-cortes"],
-    queryFn: () => cortesApi("pagos/cortes"),
+    queryFn: () => pagosComisionApi("pagos-comisiones", { allPages: true }),
   });
+  const { rows: cortes, loadMore: cortesLoadMore } = usePagedList<PagoCorte>(["pagos-cortes"], "pagos/cortes");
 
   const [servicioDialogOpen, setServicioDialogOpen] = useState(false);
   const [servicioEditing, setServicioEditing] = useState<PagoServicio | null>(null);
@@ -273,6 +273,22 @@ export function PagosManager() {
       toast.error(error instanceof Error ? error.message : "Error guardando comisión"),
   });
 
+  const corteRangeReady =
+    Boolean(corteForm.fecha_inicio && corteForm.fecha_fin) && corteForm.fecha_inicio <= corteForm.fecha_fin;
+  const { data: cortePreview, isFetching: cortePreviewLoading } = useQuery({
+    queryKey: ["pagos-cortes-preview", corteForm],
+    queryFn: () =>
+      cortePreviewApi(
+        `pagos/cortes/preview?${new URLSearchParams({
+          fecha_inicio: corteForm.fecha_inicio,
+          fecha_fin: corteForm.fecha_fin,
+          incluir_servicios: String(corteForm.incluir_servicios),
+          incluir_comisiones: String(corteForm.incluir_comisiones),
+        })}`
+      ),
+    enabled: corteRangeReady,
+  });
+
   const corteMutation = useMutation({
     mutationFn: async () => {
       if (!corteForm.fecha_inicio || !corteForm.fecha_fin) {
@@ -284,19 +300,50 @@ export function PagosManager() {
         incluir_servicios: corteForm.incluir_servicios,
         incluir_comisiones: corteForm.incluir_comisiones,
       };
-      return corteSingle("pagos/cortes", { method: "POST", body: JSON.stringify(payload) });
+      // El corte se genera en segundo plano: se consulta el trabajo hasta que termine.
+      let job = await corteJobApi("pagos/cortes", { method: "POST", body: JSON.stringify(payload) });
+      while (job.status === "queued" || job.status === "running") {
+        await wait(CORTE_POLL_INTERVAL_MS);
+        job = await corteJobApi(`pagos/cortes/jobs/${job.id}`);
+      }
+      if (job.status === "failed" || !job.corte) {
+        throw new Error(job.error ?? "No se pudo generar el corte");
+      }
+      return job.corte;
     },
     onSuccess: (corte) => {
       toast.success("Corte generado");
       queryClient.invalidateQueries({ queryKey: ["pagos-servicio"] });
       queryClient.invalidateQueries({ queryKey: ["pagos-comisiones"] });
       queryClient.invalidateQueries({ queryKey: ["pagos-cortes"] });
+      queryClient.invalidateQueries({ queryKey: ["pagos-cortes-preview"] });
       if (corte.pdf_url) window.open(corte.pdf_url, "_blank", "noopener,noreferrer");
     },
     onError: (error: unknown) =>
       toast.error(error instanceof Error ? error.message : "No se pudo generar el corte"),
   });
 
+  const cortePdfMutation = useMutation({
+    mutationFn: async (corteId: string) => {
+      let job = await corteJobApi(`pagos/cortes/${corteId}/pdf`, { method: "POST" });
+      while (job.status === "queued" || job.status === "running") {
+        await wait(CORTE_POLL_INTERVAL_MS);
+        job = await corteJobApi(`pagos/cortes/jobs/${job.id}`);
+      }
+      if (job.status === "failed" || !job.corte) {
+        throw new Error(job.error ?? "No se pudo generar el PDF del corte");
+      }
+      return job.corte;
+    },
+    onSuccess: (corte) => {
+      toast.success("PDF del corte generado");
+      queryClient.invalidateQueries({ queryKey: ["pagos-cortes"] });
+      if (corte.pdf_url) window.open(corte.pdf_url, "_blank", "noopener,noreferrer");
+    },
+    onError: (error: unknown) =>
+      toast.error(error instanceof Error ? error.message : "No se pudo generar el PDF del corte"),
+  });
+
   const servicioData = useMemo(
     () => (firmaFilter ? (pagosServicio ?? []).filter((pago) => pago.firma_id === firmaFilter) : pagosServicio ?? []),
     [pagosServicio, firmaFilter]
@@ -710,6 +757,32 @@ export function PagosManager() {
                 Incluir comisiones
               </label>
             </div>
+            {corteRangeReady ? (
+              <div className="mt-3 rounded-xl border border-border/60 bg-muted/30 p-3 text-sm">
+                {cortePreviewLoading && !cortePreview ? (
+                  <p className="text-muted-foreground">Calculando totales...</p>
+                ) : cortePreview ? (
+                  <div className="space-y-1">
+                    <p>
+                      Servicio: {cortePreview.pagos_servicio} pagos ·{" "}
+                      {currencyFormatter.format(Number(cortePreview.total_servicio))}
+                    </p>
+                    <p>
+                      Comisiones: {cortePreview.pagos_comisiones} pagos ·{" "}
+                      {currencyFormatter.format(Number(cortePreview.total_comisiones))}
+                    </p>
+                    {cortePreview.grupos
+                      .filter((grupo) => grupo.tipo === "comision")
+                      .map((grupo) => (
+                        <p key={`${grupo.beneficiario_tipo}-${grupo.beneficiario_id}`} className="text-muted-foreground">
+                          {formatStatus(grupo.beneficiario_tipo ?? "")}: {grupo.beneficiario_nombre ?? "—"} ({grupo.pagos}) ·{" "}
+                          {currencyFormatter.format(Number(grupo.monto))}
+                        </p>
+                      ))}
+                  </div>
+                ) : null}
+              </div>
+            ) : null}
             <div className="mt-4 flex gap-2">
               <Button
                 onClick={() => corteMutation.mutate()}
@@ -751,13 +824,36 @@ export function PagosManager() {
                       >
                         Descargar PDF
                       </Button>
-                    ) : null}
+                    ) : (
+                      <Button
+                        size="sm"
+                        variant="link"
+                        className="px-0 text-xs"
+                        disabled={cortePdfMutation.isPending}
+                        onClick={() => cortePdfMutation.mutate(corte.id)}
+                      >
+                        {cortePdfMutation.isPending && cortePdfMutation.variables === corte.id
+                          ? "Generando PDF..."
+                          : "Generar PDF"}
+                      </Button>
+                    )}
                   </li>
                 ))}
               </ul>
             ) : (
               <p className="mt-3 text-sm text-muted-foreground">Aún no se han generado cortes.</p>
             )}
+            {cortesLoadMore.hasMore ? (
+              <Button
+                size="sm"
+                variant="ghost"
+                className="mt-2"
+                onClick={cortesLoadMore.onLoadMore}
+                disabled={cortesLoadMore.loading}
+              >
+                {cortesLoadMore.loading ? "Cargando..." : "Cargar más"}
+              </Button>
+            ) : null}
           </div>
         </div>
       </section>
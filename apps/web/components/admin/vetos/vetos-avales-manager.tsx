@@ -52,18 +52,18 @@ export function VetosAvalesManager() {
         params.append("estatus", estatusFilter);
       }
       const qs = params.toString();
-      return vetosApi(qs ? `vetos-avales?${qs}` : "vetos-avales");
+      return vetosApi(qs ? `vetos-avales?${qs}` : "vetos-avales", { allPages: true });
     },
   });
 
   const { data: avales } = useQuery({
     queryKey: ["avales-list"],
-    queryFn: () => avalesApi("avales"),
+    queryFn: () => avalesApi("avales", { allPages: true }),
   });
 
   const { data: inmobiliarias } = useQuery({
     queryKey: ["inmobiliarias"],
-    queryFn: () => inmobiliariasApi("inmobiliarias"),
+    queryFn: () => inmobiliariasApi("inmobiliarias", { allPages: true }),
   });
 
   const avalesMap = useMemo(() => new Map((avales ?? []).map((aval) => [aval.id, aval])), [avales]);
@@ -5,7 +5,7 @@ import { useMemo, useState } from "react";
 import { DocumentGallery } from "@/components/documentos/document-gallery";
 import { Button } from "@/components/ui/button";
 import { env } from "@/lib/env";
-import { PublicAval, PublicDocumento } from "@/lib/types";
+import { PublicAval, PublicDocumento, PublicEnTurno } from "@/lib/types";
 
 async function fetchPublicResource<T>(path: string): Promise<T | null> {
   try {
@@ -34,13 +34,10 @@ export function DocumentosPublicosClient({ initialAval, initialDocuments }: Docu
   const handleRefresh = async () => {
     setLoading(true);
     setError(null);
-    const [avalData, documentosData] = await Promise.all([
-      fetchPublicResource<PublicAval | null>("public/avales/en-turno"),
-      fetchPublicResource<PublicDocumento[]>("public/documentos/en-turno"),
-    ]);
-    setAval(avalData ?? null);
-    setDocumentos(documentosData ?? []);
-    if (!documentosData) {
+    const enTurno = await fetchPublicResource<PublicEnTurno>("public/en-turno");
+    setAval(enTurno?.aval ?? null);
+    setDocumentos(enTurno?.documentos ?? []);
+    if (!enTurno) {
       setError("No se pudo obtener la lista de documentos. Intenta nuevamente.");
     }
     setLoading(false);
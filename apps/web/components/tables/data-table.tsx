@@ -23,6 +23,12 @@ interface DataTableProps<TData, TValue> {
   onRowClick?: (row: TData) => void;
   getRowId?: (row: TData) => string;
   selectedRowId?: string | null;
+  // Pide al servidor la siguiente página del listado (ver usePagedList).
+  loadMore?: {
+    hasMore: boolean;
+    loading: boolean;
+    onLoadMore: () => void;
+  };
 }
 
 export function DataTable<TData, TValue>({
@@ -33,6 +39,7 @@ export function DataTable<TData, TValue>({
   onRowClick,
   getRowId,
   selectedRowId,
+  loadMore,
 }: DataTableProps<TData, TValue>) {
   const [globalFilter, setGlobalFilter] = useState("");
 
@@ -115,6 +122,11 @@ export function DataTable<TData, TValue>({
         </Table>
       </div>
       <div className="flex items-center justify-end gap-2">
+        {loadMore?.hasMore ? (
+          <Button variant="ghost" size="sm" className="mr-auto" onClick={loadMore.onLoadMore} disabled={loadMore.loading}>
+            {loadMore.loading ? "Cargando..." : "Cargar más"}
+          </Button>
+        ) : null}
         <Button variant="outline" size="sm" onClick={() => table.previousPage()} disabled={!table.getCanPreviousPage()}>
           Anterior
         </Button>
@@ -3,14 +3,14 @@
 import { useSessionContext } from "@supabase/auth-helpers-react";
 import { useCallback } from "react";
 
-import { apiFetch } from "@/lib/api";
+import { apiFetch, apiUploadDocument, RequestOptions } from "@/lib/api";
 
 export function useApi<T = unknown>() {
   const { session } = useSessionContext();
   const token = session?.access_token;
 
   return useCallback(
-    (path: string, options: RequestInit = {}) =>
+    (path: string, options: Omit<RequestOptions, "accessToken"> = {}) =>
       apiFetch<T>(path, {
         ...options,
         accessToken: token,
@@ -18,3 +18,14 @@ export function useApi<T = unknown>() {
     [token]
   );
 }
+
+export function useDocumentUpload() {
+  const { session } = useSessionContext();
+  const token = session?.access_token;
+
+  return useCallback(
+    (table: string, id: string, field: string, file: File) =>
+      apiUploadDocument(table, id, field, file, { accessToken: token }),
+    [token]
+  );
+}
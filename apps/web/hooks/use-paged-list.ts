@@ -0,0 +1,39 @@
+"use client";
+
+import { useSessionContext } from "@supabase/auth-helpers-react";
+import { QueryKey, useInfiniteQuery } from "@tanstack/react-query";
+import { useMemo } from "react";
+
+import { apiFetchPage } from "@/lib/api";
+
+// Filas por página en las tablas de administración (PAGINATION_DEFAULT_LIMIT de la API).
+export const PAGE_SIZE = 100;
+
+/**
+ * Listado paginado por cursor para las tablas: carga la primera página y expone
+ * `loadMore` para pedir la siguiente con el valor de X-Next-Cursor.
+ * La llave queda bajo `queryKey`, así que invalidar `queryKey` recarga la tabla.
+ */
+export function usePagedList<T>(queryKey: QueryKey, path: string, pageSize: number = PAGE_SIZE) {
+  const { session } = useSessionContext();
+  const token = session?.access_token;
+
+  const query = useInfiniteQuery({
+    queryKey: [...queryKey, "paginado", path, pageSize],
+    queryFn: ({ pageParam }) => apiFetchPage<T>(path, { cursor: pageParam, limit: pageSize, accessToken: token }),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
+  });
+
+  const rows = useMemo(() => query.data?.pages.flatMap((page) => page.rows), [query.data]);
+
+  return {
+    rows,
+    isLoading: query.isLoading,
+    loadMore: {
+      hasMore: query.hasNextPage,
+      loading: query.isFetchingNextPage,
+      onLoadMore: () => query.fetchNextPage(),
+    },
+  };
+}
@@ -12,6 +12,20 @@ type StorageSignResponse = {
   expires_at: string;
 };
 
+type StorageSignBatchResponse = {
+  items: Array<{
+    index: number;
+    path: string;
+    bucket: string;
+    url: string | null;
+    token: string | null;
+    expires_at: string | null;
+    error: string | null;
+  }>;
+};
+
+const MAX_SIGN_BATCH = 100;
+
 export function useStorageProxy() {
   const api = useApi<StorageSignResponse>();
 
@@ -33,3 +47,32 @@ export function useStorageProxy() {
     [api]
   );
 }
+
+/** Firma varias rutas con `/storage/sign-batch`; devuelve las URLs en el mismo orden (null si falló). */
+export function useStorageProxyBatch() {
+  const api = useApi<StorageSignBatchResponse>();
+
+  return useCallback(
+    async (paths: Array<string | null | undefined>, bucket?: string, expiresIn = 3600): Promise<Array<string | null>> => {
+      const urls: Array<string | null> = paths.map((path) => (path && /^https?:\/\//i.test(path) ? path : null));
+      const pending = paths
+        .map((path, index) => ({ path, index }))
+        .filter((entry): entry is { path: string; index: number } => Boolean(entry.path) && urls[entry.index] === null);
+
+      for (let start = 0; start < pending.length; start += MAX_SIGN_BATCH) {
+        const chunk = pending.slice(start, start + MAX_SIGN_BATCH);
+        const response = await api("storage/sign-batch", {
+          method: "POST",
+          body: JSON.stringify({
+            items: chunk.map((entry) => ({ path: entry.path, bucket, expires_in: expiresIn })),
+          }),
+        });
+        for (const item of response.items) {
+          urls[chunk[item.index].index] = item.url ?? null;
+        }
+      }
+      return urls;
+    },
+    [api]
+  );
+}
@@ -1,11 +1,42 @@
 import { env } from "@/lib/env";
 
-interface RequestOptions extends RequestInit {
+export interface RequestOptions extends RequestInit {
   accessToken?: string;
+  // Sigue X-Next-Cursor hasta reunir el listado completo. Solo para catálogos que
+  // se necesitan enteros (selects, mapas por id, totales); las tablas usan páginas.
+  allPages?: boolean;
 }
 
-export async function apiFetch<T>(path: string, options: RequestOptions = {}): Promise<T> {
-  const url = path.startsWith("http") ? path : `${env.apiBaseUrl.replace(/\/$/, "")}/${path.replace(/^\//, "")}`;
+export interface ApiPage<T> {
+  rows: T[];
+  nextCursor: string | null;
+}
+
+export interface DocumentoUpload {
+  path: string;
+  stored_bytes: number;
+  reused: boolean;
+}
+
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+// Filas por página al recorrer un listado completo (PAGINATION_MAX_LIMIT de la API).
+const ALL_PAGES_LIMIT = 500;
+
+function buildUrl(path: string): string {
+  return path.startsWith("http") ? path : `${env.apiBaseUrl.replace(/\/$/, "")}/${path.replace(/^\//, "")}`;
+}
+
+function withParams(url: string, params: Record<string, string | null | undefined>): string {
+  // NEXT_PUBLIC_API_BASE_URL puede ser relativa (p. ej. "/api"): URL necesita una base.
+  const base = typeof window !== "undefined" ? window.location.origin : "http://localhost";
+  const next = new URL(url, base);
+  Object.entries(params).forEach(([key, value]) => {
+    if (value) next.searchParams.set(key, value);
+  });
+  return /^https?:\/\//.test(url) ? next.toString() : `${next.pathname}${next.search}`;
+}
+
+async function request(url: string, options: RequestOptions): Promise<Response> {
   const headers = new Headers(options.headers);
   headers.set("Content-Type", "application/json");
   if (options.accessToken) {
@@ -17,8 +48,64 @@ export async function apiFetch<T>(path: string, options: RequestOptions = {}): P
     const detail = await response.text();
     throw new Error(detail || `Error ${response.status}`);
   }
+  return response;
+}
+
+export async function apiFetchPage<T>(
+  path: string,
+  { cursor, limit, ...options }: RequestOptions & { cursor?: string | null; limit: number }
+): Promise<ApiPage<T>> {
+  const url = withParams(buildUrl(path), { cursor, limit: String(limit) });
+  const response = await request(url, options);
+  return {
+    rows: (await response.json()) as T[],
+    nextCursor: response.headers.get(NEXT_CURSOR_HEADER),
+  };
+}
+
+export async function apiFetch<T>(path: string, options: RequestOptions = {}): Promise<T> {
+  if (options.allPages) {
+    const rows: unknown[] = [];
+    let cursor: string | null = null;
+    do {
+      const page: ApiPage<unknown> = await apiFetchPage<unknown>(path, { ...options, cursor, limit: ALL_PAGES_LIMIT });
+      rows.push(...page.rows);
+      cursor = page.nextCursor;
+    } while (cursor);
+    return rows as T;
+  }
+
+  const response = await request(buildUrl(path), options);
   if (response.status === 204) {
     return undefined as T;
   }
   return response.json() as Promise<T>;
 }
+
+// Sube un documento a `<tabla>/<id>/documentos/<campo>`: la API lo guarda sin duplicar
+// archivos idénticos, actualiza el campo del registro y libera el archivo anterior.
+export async function apiUploadDocument(
+  table: string,
+  id: string,
+  field: string,
+  file: File,
+  options: RequestOptions = {}
+): Promise<DocumentoUpload> {
+  const headers = new Headers(options.headers);
+  if (options.accessToken) {
+    headers.set("Authorization", `Bearer ${options.accessToken}`);
+  }
+  const formData = new FormData();
+  formData.append("file", file);
+  const response = await fetch(buildUrl(`${table}/${id}/documentos/${field}`), {
+    ...options,
+    method: "POST",
+    headers,
+    body: formData,
+  });
+  if (!response.ok) {
+    const detail = await response.text();
+    throw new Error(detail || `Error ${response.status}`);
+  }
+  return response.json() as Promise<DocumentoUpload>;
+}
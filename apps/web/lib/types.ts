@@ -218,6 +218,12 @@ export interface PublicAval {
   telefono?: string | null;
 }
 
+export interface PublicEnTurno {
+  aval: PublicAval | null;
+  documentos: PublicDocumento[];
+  disponibilidades: Disponibilidad[];
+}
+
 export interface Asesor {
   id: string;
   nombre: string;
@@ -282,3 +288,38 @@ export interface PagoCorte {
   pdf_url?: string | null;
   created_at: string;
 }
+
+export interface CortePreviewGrupo {
+  tipo: "servicio" | "comision";
+  beneficiario_tipo?: "aval" | "asesor" | null;
+  beneficiario_id?: string | null;
+  beneficiario_nombre?: string | null;
+  pagos: number;
+  monto_efectivo: number;
+  monto_transferencia: number;
+  monto: number;
+}
+
+export interface CortePreview {
+  fecha_inicio: string;
+  fecha_fin: string;
+  incluir_servicios: boolean;
+  incluir_comisiones: boolean;
+  total_servicio: number;
+  total_comisiones: number;
+  pagos_servicio: number;
+  pagos_comisiones: number;
+  grupos: CortePreviewGrupo[];
+}
+
+export interface CorteJob {
+  id: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  corte_id?: string | null;
+  error?: string | null;
+  attempts: number;
+  created_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  corte?: PagoCorte | null;
+}
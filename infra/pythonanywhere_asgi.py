@@ -22,7 +22,16 @@ if str(PROJECT_ROOT) not in sys.path:
 
 load_dotenv(API_ROOT / ".env")
 os.chdir(API_ROOT)
-
+# El adaptador acumula el cuerpo completo antes de responder; el proxy de Storage
+# usa su modo buffered salvo que el .env indique lo contrario.
+os.environ.setdefault("STORAGE_PROXY_STREAMING", "false")
+# Los workers de uWSGI no deben crear procesos hijos: los PDFs se procesan en el threadpool.
+os.environ.setdefault("PDF_PROCESS_WORKERS", "0")
+# Cada petición corre en su propio event loop: los trabajos en segundo plano no
+# sobrevivirían, así que los cortes se generan dentro de la petición.
+os.environ.setdefault("BACKGROUND_JOB_WORKERS", "0")
+
+from apps.api.db.async_client import close_async_client  # noqa: E402
 from apps.api.main import app  # noqa: E402
 
 
@@ -99,7 +108,14 @@ class _AsgiToWsgi:
             else:
                 raise RuntimeError(f"Mensaje ASGI no soportado: {message['type']}")
 
-        asyncio.run(self.asgi_app(scope, receive, send))
+        async def run_app():
+            try:
+                await self.asgi_app(scope, receive, send)
+            finally:
+                # Cada petición corre en un event loop nuevo; cerramos su pool HTTP.
+                await close_async_client()
+
+        asyncio.run(run_app())
         start_response(status_line, response_headers)
         return response_body
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark del PDF de cortes con filas sintéticas.
+
+    python scripts/bench_corte_pdf.py --rows 100000 --rows 10000
+
+Para cada tamaño reporta tiempo, pico de memoria de Python (tracemalloc, en una
+segunda pasada), páginas y tamaño del archivo. El pico debe mantenerse
+prácticamente igual entre tamaños: depende del lote, no del total de filas.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from apps.api.services.corte_report import CorteReport  # noqa: E402
+
+
+def _servicios(count: int) -> Iterator[Dict]:
+    for index in range(count):
+        yield {
+            "id": index,
+            "firma_id": f"firma-{index // 12}",
+            "cliente_nombre": f"Cliente de prueba número {index // 12}",
+            "fecha_pago": "2026-10-03T12:00:00+00:00",
+            "monto_efectivo": "1250.00",
+            "monto_transferencia": "830.50",
+        }
+
+
+def _comisiones(count: int) -> Iterator[Dict]:
+    for index in range(count):
+        yield {
+            "id": index,
+            "beneficiario_id": f"beneficiario-{index // 40}",
+            "beneficiario_tipo": "aval" if index // 40 % 2 else "asesor",
+            "beneficiario_nombre": f"Beneficiario {index // 40}",
+            "cliente_nombre": f"Cliente {index}",
+            "fecha_pago": "2026-10-04T09:30:00+00:00",
+            "monto": "350.00",
+        }
+
+
+def _batches(rows: Iterator[Dict], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _render(target: Path, rows: int, batch_size: int) -> int:
+    with open(target, "wb") as output:
+        # Igual que el trabajo de cortes: lotes de filas por sección.
+        report = CorteReport(output, date(2026, 10, 1), date(2026, 10, 31))
+        for kind, source in (("servicio", _servicios(rows // 2)), ("comision", _comisiones(rows - rows // 2))):
+            report.start_section(kind)
+            for batch in _batches(source, batch_size):
+                report.add_rows(batch)
+            report.end_section()
+        return report.close()
+
+
+def run(rows: int, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="bench-corte-") as directory:
+        target = Path(directory) / "corte.pdf"
+        started = time.perf_counter()
+        pages = _render(target, rows, batch_size)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(target)
+        # tracemalloc vuelve lento el render: la memoria se mide en una segunda pasada.
+        tracemalloc.start()
+        _render(target, rows, batch_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(
+        f"{rows:>9,} filas  {elapsed:7.2f} s  pico {peak / 1024 / 1024:6.2f} MB  "
+        f"{pages:>6,} páginas  {size / 1024 / 1024:6.2f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="Filas totales (se puede repetir)")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+    for rows in args.rows or [1_000, 10_000, 100_000]:
+        run(rows, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
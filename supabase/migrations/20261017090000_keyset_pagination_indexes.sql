@@ -0,0 +1,15 @@
+-- Índices para la paginación por cursor (columna de orden + id) de los listados.
+create index if not exists clientes_created_at_id_idx on public.clientes (created_at desc, id desc);
+create index if not exists avales_created_at_id_idx on public.avales (created_at desc, id desc);
+create index if not exists contratos_created_at_id_idx on public.contratos (created_at desc, id desc);
+create index if not exists propiedades_created_at_id_idx on public.propiedades (created_at desc, id desc);
+create index if not exists pagos_created_at_id_idx on public.pagos (created_at desc, id desc);
+create index if not exists pagos_cortes_created_at_id_idx on public.pagos_cortes (created_at desc, id desc);
+create index if not exists vetos_avales_created_at_id_idx on public.vetos_avales (created_at desc, id desc);
+create index if not exists clientes_morosidad_created_at_id_idx on public.clientes_morosidad (created_at desc, id desc);
+create index if not exists firmas_fecha_inicio_id_idx on public.firmas (fecha_inicio desc, id desc);
+create index if not exists disponibilidades_avales_fecha_inicio_id_idx on public.disponibilidades_avales (fecha_inicio desc, id desc);
+create index if not exists pagos_servicio_fecha_pago_id_idx on public.pagos_servicio (fecha_pago desc, id desc);
+create index if not exists pagos_comisiones_fecha_pago_id_idx on public.pagos_comisiones (fecha_pago desc nulls last, id desc);
+create index if not exists inmobiliarias_nombre_id_idx on public.inmobiliarias (nombre, id);
+create index if not exists asesores_nombre_id_idx on public.asesores (nombre, id);
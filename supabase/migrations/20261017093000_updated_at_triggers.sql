@@ -0,0 +1,53 @@
+-- Mantiene updated_at en cada UPDATE para que los ETag de los listados detecten cambios
+-- aunque el UPDATE no envíe la columna (firmas, pagos, ediciones directas en Supabase).
+create or replace function public.fn_set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+do $$
+declare
+  target text;
+begin
+  foreach target in array array[
+    'avales',
+    'clientes',
+    'asesores',
+    'propiedades',
+    'contratos',
+    'firmas',
+    'pagos_servicio',
+    'pagos_comisiones',
+    'vetos_avales',
+    'clientes_morosidad'
+  ]
+  loop
+    execute format('drop trigger if exists trg_%1$s_updated_at on public.%1$I', target);
+    execute format(
+      'create trigger trg_%1$s_updated_at before update on public.%1$I for each row execute function public.fn_set_updated_at()',
+      target
+    );
+  end loop;
+end;
+$$;
+
+-- La vista pública expone la última modificación de la firma o de su aval.
+create or replace view public.vw_firmas_publicas as
+select
+  f.id,
+  f.contrato_id,
+  f.aval_id,
+  a.nombre_completo as aval_nombre,
+  f.fecha_inicio,
+  f.fecha_fin,
+  f.ubicacion_maps_url,
+  f.estado,
+  greatest(f.updated_at, a.updated_at) as updated_at
+from public.firmas f
+join public.avales a on a.id = f.aval_id
+where a.activo = true;
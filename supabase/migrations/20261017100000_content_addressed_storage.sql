@@ -0,0 +1,31 @@
+-- Documentos direccionados por contenido: un objeto por archivo único (sha256) en
+-- cas/<aa>/<sha256>/<nombre> y una referencia por cada registro que lo usa. La API
+-- reutiliza el objeto al subir un archivo idéntico y lo borra al quedar sin referencias.
+create table if not exists public.storage_objects (
+  bucket text not null,
+  sha256 text not null check (sha256 ~ '^[0-9a-f]{64}$'),
+  path text not null,
+  size_bytes bigint not null check (size_bytes >= 0),
+  content_type text not null,
+  created_at timestamptz not null default now(),
+  primary key (bucket, sha256),
+  unique (bucket, path)
+);
+
+create table if not exists public.storage_object_refs (
+  owner_table text not null,
+  owner_id uuid not null,
+  owner_field text not null,
+  bucket text not null,
+  sha256 text not null,
+  created_at timestamptz not null default now(),
+  primary key (owner_table, owner_id, owner_field),
+  foreign key (bucket, sha256) references public.storage_objects (bucket, sha256) on delete cascade
+);
+
+create index if not exists idx_storage_object_refs_object
+  on public.storage_object_refs (bucket, sha256);
+
+-- Solo la API (service role) lee y escribe estas tablas.
+alter table public.storage_objects enable row level security;
+alter table public.storage_object_refs enable row level security;
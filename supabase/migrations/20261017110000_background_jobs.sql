@@ -0,0 +1,29 @@
+-- Trabajos en segundo plano de la API (p. ej. generación de cortes). El estado vive
+-- aquí para que un reinicio del proceso no pierda los trabajos: al arrancar, la API
+-- retoma los que quedaron en cola o cuya ejecución se interrumpió.
+create table if not exists public.background_jobs (
+  id uuid primary key default gen_random_uuid(),
+  kind text not null,
+  status text not null default 'queued' check (status in ('queued', 'running', 'succeeded', 'failed')),
+  payload jsonb not null default '{}'::jsonb,
+  result jsonb,
+  error text,
+  attempts integer not null default 0,
+  created_by uuid,
+  created_at timestamptz not null default now(),
+  started_at timestamptz,
+  finished_at timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists idx_background_jobs_pending
+  on public.background_jobs (kind, created_at)
+  where status in ('queued', 'running');
+
+drop trigger if exists trg_background_jobs_updated_at on public.background_jobs;
+create trigger trg_background_jobs_updated_at
+  before update on public.background_jobs
+  for each row execute function public.fn_set_updated_at();
+
+-- Solo la API (service role) lee y escribe esta tabla.
+alter table public.background_jobs enable row level security;
@@ -0,0 +1,106 @@
+-- Crea un corte en una sola transacción: registra el corte, asigna corte_id a los
+-- pagos abiertos del rango con UPDATE ... RETURNING (las filas quedan bloqueadas,
+-- así que dos cortes simultáneos no toman el mismo pago y un pago insertado a media
+-- operación queda abierto en lugar de perderse) y calcula los totales sobre esas
+-- mismas filas. Devuelve el corte y los pagos con los nombres que necesita el PDF.
+-- Repetir la llamada con el mismo p_corte_id devuelve el mismo conjunto de pagos.
+create or replace function public.fn_crear_corte(
+  p_corte_id uuid,
+  p_fecha_inicio date,
+  p_fecha_fin date,
+  p_incluir_servicios boolean default true,
+  p_incluir_comisiones boolean default true
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_desde timestamptz := p_fecha_inicio::timestamp;
+  v_hasta timestamptz := (p_fecha_fin + 1)::timestamp;
+  v_servicios jsonb := '[]'::jsonb;
+  v_comisiones jsonb := '[]'::jsonb;
+  v_total_servicio numeric(12,2) := 0;
+  v_total_comisiones numeric(12,2) := 0;
+  v_corte public.pagos_cortes;
+begin
+  if p_fecha_inicio > p_fecha_fin then
+    raise exception 'La fecha inicio no puede ser mayor a la fecha fin.' using errcode = '22023';
+  end if;
+
+  insert into public.pagos_cortes (id, fecha_inicio, fecha_fin)
+  values (p_corte_id, p_fecha_inicio, p_fecha_fin)
+  on conflict (id) do nothing;
+
+  if p_incluir_servicios then
+    with asignados as (
+      update public.pagos_servicio ps
+         set corte_id = p_corte_id
+       where (ps.corte_id is null or ps.corte_id = p_corte_id)
+         and ps.fecha_pago >= v_desde
+         and ps.fecha_pago < v_hasta
+      returning ps.*
+    )
+    select
+      coalesce(
+        jsonb_agg(
+          to_jsonb(a) || jsonb_build_object('cliente_nombre', f.cliente_nombre)
+          order by a.fecha_pago, a.id
+        ),
+        '[]'::jsonb
+      ),
+      coalesce(sum(a.monto_efectivo + a.monto_transferencia), 0)
+    into v_servicios, v_total_servicio
+    from asignados a
+    left join public.firmas f on f.id = a.firma_id;
+  end if;
+
+  if p_incluir_comisiones then
+    with asignados as (
+      update public.pagos_comisiones pc
+         set corte_id = p_corte_id
+       where (pc.corte_id is null or pc.corte_id = p_corte_id)
+         and pc.fecha_pago >= v_desde
+         and pc.fecha_pago < v_hasta
+      returning pc.*
+    )
+    select
+      coalesce(
+        jsonb_agg(
+          to_jsonb(a) || jsonb_build_object(
+            'cliente_nombre', f.cliente_nombre,
+            'beneficiario_nombre', case when a.beneficiario_tipo = 'aval' then av.nombre_completo else ase.nombre end
+          )
+          order by a.fecha_pago, a.id
+        ),
+        '[]'::jsonb
+      ),
+      coalesce(sum(a.monto), 0)
+    into v_comisiones, v_total_comisiones
+    from asignados a
+    left join public.firmas f on f.id = a.firma_id
+    left join public.avales av on a.beneficiario_tipo = 'aval' and av.id = a.beneficiario_id
+    left join public.asesores ase on a.beneficiario_tipo = 'asesor' and ase.id = a.beneficiario_id;
+  end if;
+
+  if jsonb_array_length(v_servicios) = 0 and jsonb_array_length(v_comisiones) = 0 then
+    -- Revierte también el insert del corte.
+    raise exception 'No hay pagos dentro del rango seleccionado.' using errcode = 'P0002';
+  end if;
+
+  update public.pagos_cortes
+     set total_servicio = v_total_servicio,
+         total_comisiones = v_total_comisiones
+   where id = p_corte_id
+  returning * into v_corte;
+
+  return jsonb_build_object(
+    'corte', to_jsonb(v_corte),
+    'servicios', v_servicios,
+    'comisiones', v_comisiones
+  );
+end;
+$$;
+
+-- Solo la API (service role) crea cortes.
+revoke execute on function public.fn_crear_corte(uuid, date, date, boolean, boolean) from public, anon, authenticated;
+grant execute on function public.fn_crear_corte(uuid, date, date, boolean, boolean) to service_role;
@@ -0,0 +1,75 @@
+-- Vista previa de un corte: cuenta y suma los pagos abiertos del rango sin
+-- transferir filas. Los pagos del servicio se devuelven en un solo renglón y las
+-- comisiones agrupadas por beneficiario (tipo, id y nombre).
+create or replace function public.fn_preview_corte(
+  p_fecha_inicio date,
+  p_fecha_fin date,
+  p_incluir_servicios boolean default true,
+  p_incluir_comisiones boolean default true
+)
+returns table (
+  tipo text,
+  beneficiario_tipo text,
+  beneficiario_id uuid,
+  beneficiario_nombre text,
+  pagos bigint,
+  monto_efectivo numeric,
+  monto_transferencia numeric,
+  monto numeric
+)
+language sql
+stable
+as $$
+  select
+    'servicio' as tipo,
+    null::text as beneficiario_tipo,
+    null::uuid as beneficiario_id,
+    null::text as beneficiario_nombre,
+    count(*) as pagos,
+    coalesce(sum(ps.monto_efectivo), 0) as monto_efectivo,
+    coalesce(sum(ps.monto_transferencia), 0) as monto_transferencia,
+    coalesce(sum(ps.monto_efectivo + ps.monto_transferencia), 0) as monto
+  from public.pagos_servicio ps
+  where p_incluir_servicios
+    and ps.corte_id is null
+    and ps.fecha_pago >= p_fecha_inicio::timestamp
+    and ps.fecha_pago < (p_fecha_fin + 1)::timestamp
+  having count(*) > 0
+  union all
+  select
+    'comision',
+    g.beneficiario_tipo,
+    g.beneficiario_id,
+    case when g.beneficiario_tipo = 'aval' then av.nombre_completo else ase.nombre end,
+    g.pagos,
+    0,
+    0,
+    g.monto
+  from (
+    select pc.beneficiario_tipo, pc.beneficiario_id, count(*) as pagos, sum(pc.monto) as monto
+    from public.pagos_comisiones pc
+    where p_incluir_comisiones
+      and pc.corte_id is null
+      and pc.fecha_pago >= p_fecha_inicio::timestamp
+      and pc.fecha_pago < (p_fecha_fin + 1)::timestamp
+    group by pc.beneficiario_tipo, pc.beneficiario_id
+  ) g
+  left join public.avales av on g.beneficiario_tipo = 'aval' and av.id = g.beneficiario_id
+  left join public.asesores ase on g.beneficiario_tipo = 'asesor' and ase.id = g.beneficiario_id
+  order by tipo desc, beneficiario_nombre;
+$$;
+
+revoke execute on function public.fn_preview_corte(date, date, boolean, boolean) from public, anon, authenticated;
+grant execute on function public.fn_preview_corte(date, date, boolean, boolean) to service_role;
+
+-- Índices parciales sobre los pagos abiertos: la vista previa y fn_crear_corte los
+-- leen por rango de fecha_pago sin tocar la tabla (index-only scan).
+create index if not exists pagos_servicio_abiertos_fecha_pago_idx
+  on public.pagos_servicio (fecha_pago)
+  include (monto_efectivo, monto_transferencia)
+  where corte_id is null;
+
+create index if not exists pagos_comisiones_abiertos_fecha_pago_idx
+  on public.pagos_comisiones (fecha_pago)
+  include (beneficiario_tipo, beneficiario_id, monto)
+  where corte_id is null;
@@ -0,0 +1,120 @@
+-- El PDF de un corte ya no se arma con las filas que devuelve fn_crear_corte: la
+-- API las lee por lotes (keyset por beneficiario) desde las vistas de abajo y
+-- escribe el PDF página por página. fn_crear_corte devuelve solo el corte y los
+-- conteos, sin construir un JSON con todos los pagos.
+create or replace function public.fn_crear_corte(
+  p_corte_id uuid,
+  p_fecha_inicio date,
+  p_fecha_fin date,
+  p_incluir_servicios boolean default true,
+  p_incluir_comisiones boolean default true
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_desde timestamptz := p_fecha_inicio::timestamp;
+  v_hasta timestamptz := (p_fecha_fin + 1)::timestamp;
+  v_pagos_servicio bigint := 0;
+  v_pagos_comisiones bigint := 0;
+  v_total_servicio numeric(12,2) := 0;
+  v_total_comisiones numeric(12,2) := 0;
+  v_corte public.pagos_cortes;
+begin
+  if p_fecha_inicio > p_fecha_fin then
+    raise exception 'La fecha inicio no puede ser mayor a la fecha fin.' using errcode = '22023';
+  end if;
+
+  insert into public.pagos_cortes (id, fecha_inicio, fecha_fin)
+  values (p_corte_id, p_fecha_inicio, p_fecha_fin)
+  on conflict (id) do nothing;
+
+  if p_incluir_servicios then
+    with asignados as (
+      update public.pagos_servicio ps
+         set corte_id = p_corte_id
+       where (ps.corte_id is null or ps.corte_id = p_corte_id)
+         and ps.fecha_pago >= v_desde
+         and ps.fecha_pago < v_hasta
+      returning ps.*
+    )
+    select count(*), coalesce(sum(a.monto_efectivo + a.monto_transferencia), 0)
+    into v_pagos_servicio, v_total_servicio
+    from asignados a;
+  end if;
+
+  if p_incluir_comisiones then
+    with asignados as (
+      update public.pagos_comisiones pc
+         set corte_id = p_corte_id
+       where (pc.corte_id is null or pc.corte_id = p_corte_id)
+         and pc.fecha_pago >= v_desde
+         and pc.fecha_pago < v_hasta
+      returning pc.*
+    )
+    select count(*), coalesce(sum(a.monto), 0)
+    into v_pagos_comisiones, v_total_comisiones
+    from asignados a;
+  end if;
+
+  if v_pagos_servicio = 0 and v_pagos_comisiones = 0 then
+    -- Revierte también el insert del corte.
+    raise exception 'No hay pagos dentro del rango seleccionado.' using errcode = 'P0002';
+  end if;
+
+  update public.pagos_cortes
+     set total_servicio = v_total_servicio,
+         total_comisiones = v_total_comisiones
+   where id = p_corte_id
+  returning * into v_corte;
+
+  return jsonb_build_object(
+    'corte', to_jsonb(v_corte),
+    'pagos_servicio', v_pagos_servicio,
+    'pagos_comisiones', v_pagos_comisiones
+  );
+end;
+$$;
+
+-- Pagos de un corte con los nombres que muestra el PDF, ordenables por beneficiario.
+create or replace view public.vw_corte_pagos_servicio
+with (security_invoker = true) as
+select
+  ps.id,
+  ps.corte_id,
+  ps.firma_id,
+  ps.fecha_pago,
+  ps.monto_efectivo,
+  ps.monto_transferencia,
+  f.cliente_nombre
+from public.pagos_servicio ps
+left join public.firmas f on f.id = ps.firma_id;
+
+create or replace view public.vw_corte_pagos_comisiones
+with (security_invoker = true) as
+select
+  pc.id,
+  pc.corte_id,
+  pc.firma_id,
+  pc.beneficiario_tipo,
+  pc.beneficiario_id,
+  case when pc.beneficiario_tipo = 'aval' then av.nombre_completo else ase.nombre end as beneficiario_nombre,
+  pc.fecha_pago,
+  pc.monto,
+  f.cliente_nombre
+from public.pagos_comisiones pc
+left join public.firmas f on f.id = pc.firma_id
+left join public.avales av on pc.beneficiario_tipo = 'aval' and av.id = pc.beneficiario_id
+left join public.asesores ase on pc.beneficiario_tipo = 'asesor' and ase.id = pc.beneficiario_id;
+
+revoke all on public.vw_corte_pagos_servicio from anon, authenticated;
+revoke all on public.vw_corte_pagos_comisiones from anon, authenticated;
+
+-- Recorrido por lotes de un corte: (corte_id, beneficiario, id).
+create index if not exists pagos_servicio_corte_firma_id_idx
+  on public.pagos_servicio (corte_id, firma_id, id)
+  where corte_id is not null;
+
+create index if not exists pagos_comisiones_corte_beneficiario_id_idx
+  on public.pagos_comisiones (corte_id, beneficiario_id, id)
+  where corte_id is not null;
@@ -0,0 +1,271 @@
+-- Ledger del periodo abierto: totales por día y beneficiario de los pagos que
+-- todavía no pertenecen a un corte. Lo mantienen triggers por sentencia sobre
+-- pagos_servicio y pagos_comisiones (una asignación masiva de corte_id actualiza
+-- el ledger con un solo upsert agrupado), así que la vista previa de un corte lee
+-- unas cuantas filas pre-agregadas en lugar de recorrer los pagos abiertos.
+--
+-- El día de cada pago es fecha_pago::date en la zona horaria de la sesión, la misma
+-- con la que fn_crear_corte compara el rango.
+create table if not exists public.pagos_ledger (
+  fecha date not null,
+  tipo text not null check (tipo in ('servicio', 'comision')),
+  beneficiario_tipo text check (beneficiario_tipo in ('aval', 'asesor')),
+  beneficiario_id uuid,
+  pagos integer not null default 0,
+  monto_efectivo numeric(14,2) not null default 0,
+  monto_transferencia numeric(14,2) not null default 0,
+  monto numeric(14,2) not null default 0,
+  updated_at timestamptz not null default now(),
+  -- Los pagos del servicio no tienen beneficiario: un renglón por día con NULLs.
+  constraint pagos_ledger_clave unique nulls not distinct (fecha, tipo, beneficiario_tipo, beneficiario_id)
+);
+
+-- Solo la API (service role) lee esta tabla; los triggers escriben como su dueño.
+alter table public.pagos_ledger enable row level security;
+
+create or replace function public.fn_pagos_servicio_ledger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into public.pagos_ledger as l (fecha, tipo, pagos, monto_efectivo, monto_transferencia, monto)
+    select
+      o.fecha_pago::date, 'servicio', -count(*), -sum(o.monto_efectivo), -sum(o.monto_transferencia),
+      -sum(o.monto_efectivo + o.monto_transferencia)
+    from old_rows o
+    where o.corte_id is null and o.fecha_pago is not null
+    group by o.fecha_pago::date
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto_efectivo = l.monto_efectivo + excluded.monto_efectivo,
+          monto_transferencia = l.monto_transferencia + excluded.monto_transferencia,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.pagos_ledger as l (fecha, tipo, pagos, monto_efectivo, monto_transferencia, monto)
+    select
+      n.fecha_pago::date, 'servicio', count(*), sum(n.monto_efectivo), sum(n.monto_transferencia),
+      sum(n.monto_efectivo + n.monto_transferencia)
+    from new_rows n
+    where n.corte_id is null and n.fecha_pago is not null
+    group by n.fecha_pago::date
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto_efectivo = l.monto_efectivo + excluded.monto_efectivo,
+          monto_transferencia = l.monto_transferencia + excluded.monto_transferencia,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  delete from public.pagos_ledger where tipo = 'servicio' and pagos = 0;
+  return null;
+end;
+$$;
+
+create or replace function public.fn_pagos_comisiones_ledger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into public.pagos_ledger as l (fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto)
+    select o.fecha_pago::date, 'comision', o.beneficiario_tipo, o.beneficiario_id, -count(*), -sum(o.monto)
+    from old_rows o
+    where o.corte_id is null and o.fecha_pago is not null
+    group by o.fecha_pago::date, o.beneficiario_tipo, o.beneficiario_id
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.pagos_ledger as l (fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto)
+    select n.fecha_pago::date, 'comision', n.beneficiario_tipo, n.beneficiario_id, count(*), sum(n.monto)
+    from new_rows n
+    where n.corte_id is null and n.fecha_pago is not null
+    group by n.fecha_pago::date, n.beneficiario_tipo, n.beneficiario_id
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  delete from public.pagos_ledger where tipo = 'comision' and pagos = 0;
+  return null;
+end;
+$$;
+
+-- Las tablas de transición no admiten triggers multi-evento: uno por evento.
+drop trigger if exists trg_pagos_servicio_ledger_ins on public.pagos_servicio;
+drop trigger if exists trg_pagos_servicio_ledger_upd on public.pagos_servicio;
+drop trigger if exists trg_pagos_servicio_ledger_del on public.pagos_servicio;
+create trigger trg_pagos_servicio_ledger_ins after insert on public.pagos_servicio
+  referencing new table as new_rows for each statement execute function public.fn_pagos_servicio_ledger();
+create trigger trg_pagos_servicio_ledger_upd after update on public.pagos_servicio
+  referencing old table as old_rows new table as new_rows for each statement execute function public.fn_pagos_servicio_ledger();
+create trigger trg_pagos_servicio_ledger_del after delete on public.pagos_servicio
+  referencing old table as old_rows for each statement execute function public.fn_pagos_servicio_ledger();
+
+drop trigger if exists trg_pagos_comisiones_ledger_ins on public.pagos_comisiones;
+drop trigger if exists trg_pagos_comisiones_ledger_upd on public.pagos_comisiones;
+drop trigger if exists trg_pagos_comisiones_ledger_del on public.pagos_comisiones;
+create trigger trg_pagos_comisiones_ledger_ins after insert on public.pagos_comisiones
+  referencing new table as new_rows for each statement execute function public.fn_pagos_comisiones_ledger();
+create trigger trg_pagos_comisiones_ledger_upd after update on public.pagos_comisiones
+  referencing old table as old_rows new table as new_rows for each statement execute function public.fn_pagos_comisiones_ledger();
+create trigger trg_pagos_comisiones_ledger_del after delete on public.pagos_comisiones
+  referencing old table as old_rows for each statement execute function public.fn_pagos_comisiones_ledger();
+
+-- Totales calculados directamente de los pagos abiertos, con la misma forma que el ledger.
+create or replace view public.vw_pagos_ledger_real
+with (security_invoker = true) as
+select
+  ps.fecha_pago::date as fecha,
+  'servicio'::text as tipo,
+  null::text as beneficiario_tipo,
+  null::uuid as beneficiario_id,
+  count(*)::integer as pagos,
+  sum(ps.monto_efectivo)::numeric(14,2) as monto_efectivo,
+  sum(ps.monto_transferencia)::numeric(14,2) as monto_transferencia,
+  sum(ps.monto_efectivo + ps.monto_transferencia)::numeric(14,2) as monto
+from public.pagos_servicio ps
+where ps.corte_id is null and ps.fecha_pago is not null
+group by ps.fecha_pago::date
+union all
+select
+  pc.fecha_pago::date,
+  'comision',
+  pc.beneficiario_tipo,
+  pc.beneficiario_id,
+  count(*)::integer,
+  0,
+  0,
+  sum(pc.monto)::numeric(14,2)
+from public.pagos_comisiones pc
+where pc.corte_id is null and pc.fecha_pago is not null
+group by pc.fecha_pago::date, pc.beneficiario_tipo, pc.beneficiario_id;
+
+revoke all on public.vw_pagos_ledger_real from anon, authenticated;
+
+-- Conciliación: renglones donde el ledger no coincide con los pagos abiertos.
+create or replace function public.fn_pagos_ledger_diferencias()
+returns table (
+  fecha date,
+  tipo text,
+  beneficiario_tipo text,
+  beneficiario_id uuid,
+  ledger_pagos integer,
+  real_pagos integer,
+  ledger_monto numeric,
+  real_monto numeric
+)
+language sql
+stable
+as $$
+  select
+    coalesce(l.fecha, r.fecha),
+    coalesce(l.tipo, r.tipo),
+    coalesce(l.beneficiario_tipo, r.beneficiario_tipo),
+    coalesce(l.beneficiario_id, r.beneficiario_id),
+    coalesce(l.pagos, 0),
+    coalesce(r.pagos, 0),
+    coalesce(l.monto, 0),
+    coalesce(r.monto, 0)
+  from public.pagos_ledger l
+  full join public.vw_pagos_ledger_real r
+    on r.fecha = l.fecha
+   and r.tipo = l.tipo
+   and r.beneficiario_tipo is not distinct from l.beneficiario_tipo
+   and r.beneficiario_id is not distinct from l.beneficiario_id
+  where coalesce(l.pagos, 0) <> coalesce(r.pagos, 0)
+     or coalesce(l.monto, 0) <> coalesce(r.monto, 0)
+     or coalesce(l.monto_efectivo, 0) <> coalesce(r.monto_efectivo, 0)
+     or coalesce(l.monto_transferencia, 0) <> coalesce(r.monto_transferencia, 0)
+  order by 1, 2, 3, 4;
+$$;
+
+-- Reconstruye el ledger desde los pagos. Bloquea escrituras en los pagos (no
+-- lecturas) mientras corre para no perder cambios concurrentes.
+create or replace function public.fn_pagos_ledger_reconstruir()
+returns integer
+language plpgsql
+as $$
+declare
+  v_filas integer;
+begin
+  lock table public.pagos_servicio, public.pagos_comisiones in share row exclusive mode;
+  delete from public.pagos_ledger;
+  insert into public.pagos_ledger (fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto_efectivo, monto_transferencia, monto)
+  select fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto_efectivo, monto_transferencia, monto
+  from public.vw_pagos_ledger_real;
+  get diagnostics v_filas = row_count;
+  return v_filas;
+end;
+$$;
+
+revoke execute on function public.fn_pagos_ledger_diferencias() from public, anon, authenticated;
+revoke execute on function public.fn_pagos_ledger_reconstruir() from public, anon, authenticated;
+grant execute on function public.fn_pagos_ledger_diferencias() to service_role;
+grant execute on function public.fn_pagos_ledger_reconstruir() to service_role;
+
+select public.fn_pagos_ledger_reconstruir();
+
+-- La vista previa lee el ledger: a lo más un renglón por día y beneficiario del rango.
+create or replace function public.fn_preview_corte(
+  p_fecha_inicio date,
+  p_fecha_fin date,
+  p_incluir_servicios boolean default true,
+  p_incluir_comisiones boolean default true
+)
+returns table (
+  tipo text,
+  beneficiario_tipo text,
+  beneficiario_id uuid,
+  beneficiario_nombre text,
+  pagos bigint,
+  monto_efectivo numeric,
+  monto_transferencia numeric,
+  monto numeric
+)
+language sql
+stable
+as $$
+  select
+    g.tipo,
+    g.beneficiario_tipo,
+    g.beneficiario_id,
+    case
+      when g.beneficiario_tipo = 'aval' then av.nombre_completo
+      when g.beneficiario_tipo = 'asesor' then ase.nombre
+    end as beneficiario_nombre,
+    g.pagos,
+    g.monto_efectivo,
+    g.monto_transferencia,
+    g.monto
+  from (
+    select
+      l.tipo,
+      l.beneficiario_tipo,
+      l.beneficiario_id,
+      sum(l.pagos)::bigint as pagos,
+      sum(l.monto_efectivo) as monto_efectivo,
+      sum(l.monto_transferencia) as monto_transferencia,
+      sum(l.monto) as monto
+    from public.pagos_ledger l
+    where l.fecha between p_fecha_inicio and p_fecha_fin
+      and ((l.tipo = 'servicio' and p_incluir_servicios) or (l.tipo = 'comision' and p_incluir_comisiones))
+    group by l.tipo, l.beneficiario_tipo, l.beneficiario_id
+    having sum(l.pagos) > 0
+  ) g
+  left join public.avales av on g.beneficiario_tipo = 'aval' and av.id = g.beneficiario_id
+  left join public.asesores ase on g.beneficiario_tipo = 'asesor' and ase.id = g.beneficiario_id
+  order by g.tipo desc, beneficiario_nombre;
+$$;
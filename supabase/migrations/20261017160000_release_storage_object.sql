@@ -0,0 +1,28 @@
+-- Liberar un objeto direccionado por contenido en una sola sentencia: el objeto se
+-- borra solo si no tiene referencias y la función devuelve la ruta a eliminar de
+-- Storage. La llave foránea pasa a "restrict": una referencia agregada por una
+-- subida concurrente hace fallar el borrado en lugar de desaparecer en cascada.
+alter table public.storage_object_refs
+  drop constraint if exists storage_object_refs_bucket_sha256_fkey;
+
+alter table public.storage_object_refs
+  add constraint storage_object_refs_bucket_sha256_fkey
+  foreign key (bucket, sha256) references public.storage_objects (bucket, sha256) on delete restrict;
+
+create or replace function public.fn_release_storage_object(p_bucket text, p_sha256 text)
+returns table (path text)
+language sql
+as $$
+  delete from public.storage_objects o
+   where o.bucket = p_bucket
+     and o.sha256 = p_sha256
+     and not exists (
+       select 1
+       from public.storage_object_refs r
+       where r.bucket = o.bucket and r.sha256 = o.sha256
+     )
+  returning o.path;
+$$;
+
+revoke execute on function public.fn_release_storage_object(text, text) from public, anon, authenticated;
+grant execute on function public.fn_release_storage_object(text, text) to service_role;
@@ -0,0 +1,55 @@
+-- Versión por tabla para los ETag de los listados: un trigger por sentencia incrementa
+-- el contador en cada INSERT/UPDATE/DELETE/TRUNCATE, así que la API obtiene la
+-- versión con una lectura por llave primaria en lugar de contar y ordenar la tabla
+-- filtrada. A diferencia de max(updated_at), también cambia con los borrados.
+create table if not exists public.table_versions (
+  table_name text primary key,
+  version bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+-- Solo la API (service role) lee esta tabla; los triggers escriben como su dueño.
+alter table public.table_versions enable row level security;
+
+create or replace function public.fn_bump_table_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.table_versions as v (table_name, version)
+  values (tg_table_name, 1)
+  on conflict (table_name) do update
+    set version = v.version + 1,
+        updated_at = now();
+  return null;
+end;
+$$;
+
+do $$
+declare
+  target text;
+begin
+  foreach target in array array[
+    'avales',
+    'clientes',
+    'clientes_morosidad',
+    'contratos',
+    'firmas',
+    'pagos_servicio',
+    'pagos_comisiones',
+    'propiedades',
+    'vetos_avales'
+  ]
+  loop
+    execute format('drop trigger if exists trg_%1$s_version on public.%1$I', target);
+    execute format(
+      'create trigger trg_%1$s_version after insert or update or delete or truncate on public.%1$I '
+      'for each statement execute function public.fn_bump_table_version()',
+      target
+    );
+    insert into public.table_versions (table_name) values (target) on conflict do nothing;
+  end loop;
+end;
+$$;
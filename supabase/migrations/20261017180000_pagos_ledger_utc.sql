@@ -0,0 +1,191 @@
+-- Los días del ledger y los límites del rango de un corte se calculan en UTC y no
+-- en la zona horaria de la sesión: una escritura desde el editor SQL o desde otro
+-- rol con un "timezone" distinto registraba (o restaba) el pago en otro día que la
+-- API, y el ledger dejaba de cuadrar con fn_crear_corte. fn_preview_corte lee el
+-- ledger por fecha, así que hereda el mismo día.
+create or replace function public.fn_pagos_servicio_ledger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into public.pagos_ledger as l (fecha, tipo, pagos, monto_efectivo, monto_transferencia, monto)
+    select
+      (o.fecha_pago at time zone 'UTC')::date, 'servicio', -count(*), -sum(o.monto_efectivo), -sum(o.monto_transferencia),
+      -sum(o.monto_efectivo + o.monto_transferencia)
+    from old_rows o
+    where o.corte_id is null and o.fecha_pago is not null
+    group by (o.fecha_pago at time zone 'UTC')::date
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto_efectivo = l.monto_efectivo + excluded.monto_efectivo,
+          monto_transferencia = l.monto_transferencia + excluded.monto_transferencia,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.pagos_ledger as l (fecha, tipo, pagos, monto_efectivo, monto_transferencia, monto)
+    select
+      (n.fecha_pago at time zone 'UTC')::date, 'servicio', count(*), sum(n.monto_efectivo), sum(n.monto_transferencia),
+      sum(n.monto_efectivo + n.monto_transferencia)
+    from new_rows n
+    where n.corte_id is null and n.fecha_pago is not null
+    group by (n.fecha_pago at time zone 'UTC')::date
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto_efectivo = l.monto_efectivo + excluded.monto_efectivo,
+          monto_transferencia = l.monto_transferencia + excluded.monto_transferencia,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  delete from public.pagos_ledger where tipo = 'servicio' and pagos = 0;
+  return null;
+end;
+$$;
+
+create or replace function public.fn_pagos_comisiones_ledger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into public.pagos_ledger as l (fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto)
+    select (o.fecha_pago at time zone 'UTC')::date, 'comision', o.beneficiario_tipo, o.beneficiario_id, -count(*), -sum(o.monto)
+    from old_rows o
+    where o.corte_id is null and o.fecha_pago is not null
+    group by (o.fecha_pago at time zone 'UTC')::date, o.beneficiario_tipo, o.beneficiario_id
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.pagos_ledger as l (fecha, tipo, beneficiario_tipo, beneficiario_id, pagos, monto)
+    select (n.fecha_pago at time zone 'UTC')::date, 'comision', n.beneficiario_tipo, n.beneficiario_id, count(*), sum(n.monto)
+    from new_rows n
+    where n.corte_id is null and n.fecha_pago is not null
+    group by (n.fecha_pago at time zone 'UTC')::date, n.beneficiario_tipo, n.beneficiario_id
+    on conflict on constraint pagos_ledger_clave do update
+      set pagos = l.pagos + excluded.pagos,
+          monto = l.monto + excluded.monto,
+          updated_at = now();
+  end if;
+
+  delete from public.pagos_ledger where tipo = 'comision' and pagos = 0;
+  return null;
+end;
+$$;
+
+create or replace view public.vw_pagos_ledger_real
+with (security_invoker = true) as
+select
+  (ps.fecha_pago at time zone 'UTC')::date as fecha,
+  'servicio'::text as tipo,
+  null::text as beneficiario_tipo,
+  null::uuid as beneficiario_id,
+  count(*)::integer as pagos,
+  sum(ps.monto_efectivo)::numeric(14,2) as monto_efectivo,
+  sum(ps.monto_transferencia)::numeric(14,2) as monto_transferencia,
+  sum(ps.monto_efectivo + ps.monto_transferencia)::numeric(14,2) as monto
+from public.pagos_servicio ps
+where ps.corte_id is null and ps.fecha_pago is not null
+group by (ps.fecha_pago at time zone 'UTC')::date
+union all
+select
+  (pc.fecha_pago at time zone 'UTC')::date,
+  'comision',
+  pc.beneficiario_tipo,
+  pc.beneficiario_id,
+  count(*)::integer,
+  0,
+  0,
+  sum(pc.monto)::numeric(14,2)
+from public.pagos_comisiones pc
+where pc.corte_id is null and pc.fecha_pago is not null
+group by (pc.fecha_pago at time zone 'UTC')::date, pc.beneficiario_tipo, pc.beneficiario_id;
+
+revoke all on public.vw_pagos_ledger_real from anon, authenticated;
+
+create or replace function public.fn_crear_corte(
+  p_corte_id uuid,
+  p_fecha_inicio date,
+  p_fecha_fin date,
+  p_incluir_servicios boolean default true,
+  p_incluir_comisiones boolean default true
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_desde timestamptz := p_fecha_inicio::timestamp at time zone 'UTC';
+  v_hasta timestamptz := (p_fecha_fin + 1)::timestamp at time zone 'UTC';
+  v_pagos_servicio bigint := 0;
+  v_pagos_comisiones bigint := 0;
+  v_total_servicio numeric(12,2) := 0;
+  v_total_comisiones numeric(12,2) := 0;
+  v_corte public.pagos_cortes;
+begin
+  if p_fecha_inicio > p_fecha_fin then
+    raise exception 'La fecha inicio no puede ser mayor a la fecha fin.' using errcode = '22023';
+  end if;
+
+  insert into public.pagos_cortes (id, fecha_inicio, fecha_fin)
+  values (p_corte_id, p_fecha_inicio, p_fecha_fin)
+  on conflict (id) do nothing;
+
+  if p_incluir_servicios then
+    with asignados as (
+      update public.pagos_servicio ps
+         set corte_id = p_corte_id
+       where (ps.corte_id is null or ps.corte_id = p_corte_id)
+         and ps.fecha_pago >= v_desde
+         and ps.fecha_pago < v_hasta
+      returning ps.*
+    )
+    select count(*), coalesce(sum(a.monto_efectivo + a.monto_transferencia), 0)
+    into v_pagos_servicio, v_total_servicio
+    from asignados a;
+  end if;
+
+  if p_incluir_comisiones then
+    with asignados as (
+      update public.pagos_comisiones pc
+         set corte_id = p_corte_id
+       where (pc.corte_id is null or pc.corte_id = p_corte_id)
+         and pc.fecha_pago >= v_desde
+         and pc.fecha_pago < v_hasta
+      returning pc.*
+    )
+    select count(*), coalesce(sum(a.monto), 0)
+    into v_pagos_comisiones, v_total_comisiones
+    from asignados a;
+  end if;
+
+  if v_pagos_servicio = 0 and v_pagos_comisiones = 0 then
+    -- Revierte también el insert del corte.
+    raise exception 'No hay pagos dentro del rango seleccionado.' using errcode = 'P0002';
+  end if;
+
+  update public.pagos_cortes
+     set total_servicio = v_total_servicio,
+         total_comisiones = v_total_comisiones
+   where id = p_corte_id
+  returning * into v_corte;
+
+  return jsonb_build_object(
+    'corte', to_jsonb(v_corte),
+    'pagos_servicio', v_pagos_servicio,
+    'pagos_comisiones', v_pagos_comisiones
+  );
+end;
+$$;
+
+-- Recalcula el ledger con los días en UTC.
+select public.fn_pagos_ledger_reconstruir();
@@ -0,0 +1,122 @@
+-- Liberar un objeto direccionado por contenido sin borrar un archivo recién subido.
+-- Antes la fila se borraba y después la API quitaba el archivo de Storage: una subida
+-- concurrente del mismo contenido volvía a escribir la misma ruta y el borrado tardío
+-- se llevaba el archivo nuevo. Ahora:
+--   1. fn_release_storage_object marca el objeto (released_at) si no tiene referencias;
+--   2. la API borra el archivo de Storage;
+--   3. fn_purge_storage_object borra la fila solo si sigue marcada con la misma ruta.
+-- Las referencias se agregan con fn_ref_storage_object, que no acepta objetos marcados,
+-- y cada subida escribe en una ruta propia (cas/<aa>/<sha256>/<generación>/<nombre>);
+-- fn_register_storage_object revive un objeto marcado apuntándolo a la ruta nueva, así
+-- que el paso 2 nunca alcanza a un archivo vivo.
+alter table public.storage_objects
+  add column if not exists released_at timestamptz;
+
+create or replace function public.fn_ref_storage_object(
+  p_bucket text,
+  p_sha256 text,
+  p_owner_table text,
+  p_owner_id uuid,
+  p_owner_field text
+)
+returns text
+language plpgsql
+as $$
+declare
+  v_path text;
+begin
+  -- for share: una liberación concurrente espera a que la referencia quede registrada.
+  select o.path into v_path
+    from public.storage_objects o
+   where o.bucket = p_bucket and o.sha256 = p_sha256 and o.released_at is null
+   for share;
+  if v_path is null then
+    return null;
+  end if;
+
+  insert into public.storage_object_refs (owner_table, owner_id, owner_field, bucket, sha256)
+  values (p_owner_table, p_owner_id, p_owner_field, p_bucket, p_sha256)
+  on conflict (owner_table, owner_id, owner_field) do update
+    set bucket = excluded.bucket,
+        sha256 = excluded.sha256,
+        created_at = now();
+  return v_path;
+end;
+$$;
+
+create or replace function public.fn_register_storage_object(
+  p_bucket text,
+  p_sha256 text,
+  p_path text,
+  p_size_bytes bigint,
+  p_content_type text
+)
+returns text
+language sql
+as $$
+  -- Un objeto vivo con el mismo contenido gana: no se devuelve nada y la copia sobra.
+  insert into public.storage_objects as o (bucket, sha256, path, size_bytes, content_type)
+  values (p_bucket, p_sha256, p_path, p_size_bytes, p_content_type)
+  on conflict (bucket, sha256) do update
+    set path = excluded.path,
+        size_bytes = excluded.size_bytes,
+        content_type = excluded.content_type,
+        released_at = null
+    where o.released_at is not null
+  returning o.path;
+$$;
+
+create or replace function public.fn_release_storage_object(p_bucket text, p_sha256 text)
+returns table (path text)
+language plpgsql
+as $$
+begin
+  -- Bloquea el objeto antes de revisar referencias: una fn_ref_storage_object en curso
+  -- termina primero y su referencia ya es visible para la siguiente sentencia.
+  perform 1
+    from public.storage_objects o
+   where o.bucket = p_bucket and o.sha256 = p_sha256 and o.released_at is null
+   for update;
+  if not found then
+    return;
+  end if;
+  if exists (
+    select 1 from public.storage_object_refs r where r.bucket = p_bucket and r.sha256 = p_sha256
+  ) then
+    return;
+  end if;
+
+  return query
+    update public.storage_objects o
+       set released_at = now()
+     where o.bucket = p_bucket and o.sha256 = p_sha256
+    returning o.path;
+end;
+$$;
+
+create or replace function public.fn_purge_storage_object(p_bucket text, p_sha256 text, p_path text)
+returns boolean
+language sql
+as $$
+  with borrado as (
+    delete from public.storage_objects o
+     where o.bucket = p_bucket
+       and o.sha256 = p_sha256
+       and o.path = p_path
+       and o.released_at is not null
+       and not exists (
+         select 1 from public.storage_object_refs r where r.bucket = o.bucket and r.sha256 = o.sha256
+       )
+    returning 1
+  )
+  select exists (select 1 from borrado);
+$$;
+
+revoke execute on function public.fn_ref_storage_object(text, text, text, uuid, text) from public, anon, authenticated;
+revoke execute on function public.fn_register_storage_object(text, text, text, bigint, text) from public, anon, authenticated;
+revoke execute on function public.fn_release_storage_object(text, text) from public, anon, authenticated;
+revoke execute on function public.fn_purge_storage_object(text, text, text) from public, anon, authenticated;
+grant execute on function public.fn_ref_storage_object(text, text, text, uuid, text) to service_role;
+grant execute on function public.fn_register_storage_object(text, text, text, bigint, text) to service_role;
+grant execute on function public.fn_release_storage_object(text, text) to service_role;
+grant execute on function public.fn_purge_storage_object(text, text, text) to service_role;